@@ -16,17 +16,43 @@
 
 __all__ = ['__version__']
 
-import pbr.version
+import sys
 
 from manilaclient import api_versions
 
-version_info = pbr.version.VersionInfo('python-manilaclient')
-# We have a circular import problem when we first run python setup.py sdist
-# It's harmless, so deflect it.
-try:
-    __version__ = version_info.version_string()
-except AttributeError:
-    __version__ = None
+
+def _get_version_info():
+    import pbr.version
+    return pbr.version.VersionInfo('python-manilaclient')
+
+
+def _get_version():
+    # We have a circular import problem when we first run python setup.py
+    # sdist. It's harmless, so deflect it.
+    try:
+        return _get_version_info().version_string()
+    except AttributeError:
+        return None
+
+
+# Looking the version up scans package metadata, so it is done on first
+# use of '__version__' instead of on every import.
+def __getattr__(name):
+    if name == '__version__':
+        value = _get_version()
+    elif name == 'version_info':
+        value = _get_version_info()
+    else:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+# Module level __getattr__ is not supported before Python 3.7
+if sys.version_info < (3, 7):
+    version_info = _get_version_info()
+    __version__ = _get_version()
 
 
 API_MAX_VERSION = api_versions.APIVersion(api_versions.MAX_VERSION)
@@ -0,0 +1,20 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Asyncio client for the Manila v2 API, requires Python 3.5 or newer."""
+
+import sys
+
+if sys.version_info < (3, 5):
+    raise ImportError("manilaclient.aio requires Python 3.5 or newer.")
+
+from manilaclient.aio.client import Client    # noqa
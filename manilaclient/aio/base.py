@@ -0,0 +1,92 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+Base classes of asyncio managers.
+
+Async managers subclass the v2 managers and only replace the methods that
+send requests with coroutines. Public manager methods mostly return the
+result of these methods as is, so they return awaitables without any
+changes, and microversion dispatch done by 'api_versions.wraps' works the
+same way. Methods that post-process responses are overridden by the
+managers in 'manilaclient.aio.managers'.
+
+Resources are always returned fully loaded, because attribute access can
+not wait for a lazy-loading request.
+"""
+
+
+class AsyncManagerMixin(object):
+    """Coroutine versions of :class:`manilaclient.base.Manager` helpers."""
+
+    async def _list(self, url, response_key, obj_class=None, body=None):
+        with self._operation('list'):
+            if body:
+                resp, body = await self.api.client.post(url, body=body)
+            else:
+                resp, body = await self.api.client.get(url)
+
+        return self._build_list(body, response_key, obj_class)
+
+    def _list_stream(self, url, response_key, obj_class=None, body=None):
+        # Responses are read at once, but they can still be iterated.
+        return self._list(url, response_key, obj_class=obj_class, body=body)
+
+    async def _get(self, url, response_key=None):
+        with self._operation('get'):
+            resp, body = await self.api.client.get(url)
+        return self._build_resource(body, response_key)
+
+    async def _get_with_base_url(self, url, response_key=None):
+        with self._operation('get'):
+            resp, body = await self.api.client.get_with_base_url(url)
+        if response_key:
+            return [self.resource_class(self, res, loaded=True)
+                    for res in body[response_key] if res]
+        else:
+            return self.resource_class(self, body, loaded=True)
+
+    async def _create(self, url, body, response_key, return_raw=False,
+                      **kwargs):
+        self.run_hooks('modify_body_for_create', body, **kwargs)
+        with self._operation('create'):
+            resp, body = await self.api.client.post(url, body=body)
+        return self._build_created(body, response_key, return_raw,
+                                   loaded=True)
+
+    async def _delete(self, url):
+        with self._operation('delete'):
+            resp, body = await self.api.client.delete(url)
+
+    async def _update(self, url, body, response_key=None, **kwargs):
+        self.run_hooks('modify_body_for_update', body, **kwargs)
+        with self._operation('update'):
+            resp, body = await self.api.client.put(url, body=body)
+        if body:
+            return self._build_resource(body, response_key)
+
+    async def _action(self, action, *args, **kwargs):
+        # Request of the blocking manager is only sent when awaited, which
+        # is outside of the operation it labels itself with.
+        with self._operation('_action:%s' % action):
+            return await super(AsyncManagerMixin, self)._action(
+                action, *args, **kwargs)
+
+
+class AsyncManagerWithFindMixin(AsyncManagerMixin):
+    """Coroutine versions of :class:`manilaclient.base.ManagerWithFind`."""
+
+    async def find(self, **kwargs):
+        return self._get_single_match(await self.findall(**kwargs), kwargs)
+
+    async def findall(self, **kwargs):
+        return self._filter_matches(await self.list(), kwargs)
@@ -0,0 +1,67 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from manilaclient.aio import httpclient
+from manilaclient.aio import managers
+from manilaclient.v2 import client
+
+
+class Client(client.Client):
+    """Asyncio counterpart of :class:`manilaclient.v2.client.Client`.
+
+    It takes the same arguments, but manager methods sending requests are
+    coroutines and have to be awaited::
+
+        >>> manila = Client(session=sess,
+                            api_version=manilaclient.API_MAX_VERSION)
+        >>> shares = await manila.shares.list()
+
+    Authentication is done in the constructor, using blocking calls, just
+    like the blocking client does, and so is renewing an expiring token.
+    Use 'async with' or call 'close()' to release pooled connections.
+    """
+
+    def _create_http_client(self, *args, **kwargs):
+        return httpclient.AsyncHTTPClient(*args, **kwargs)
+
+    def _create_managers(self):
+        self.limits = managers.LimitsManager(self)
+        self.services = managers.ServiceManager(self)
+        self.security_services = managers.SecurityServiceManager(self)
+        self.share_networks = managers.ShareNetworkManager(self)
+
+        self.quota_classes = managers.QuotaClassSetManager(self)
+        self.quotas = managers.QuotaSetManager(self)
+
+        self.shares = managers.ShareManager(self)
+        self.share_instances = managers.ShareInstanceManager(self)
+        self.share_snapshots = managers.ShareSnapshotManager(self)
+
+        self.share_types = managers.ShareTypeManager(self)
+        self.share_type_access = managers.ShareTypeAccessManager(self)
+        self.share_servers = managers.ShareServerManager(self)
+        self.pools = managers.PoolManager(self)
+        self.consistency_groups = managers.ConsistencyGroupManager(self)
+        self.cg_snapshots = managers.ConsistencyGroupSnapshotManager(self)
+
+    async def _load_rate_limits(self):
+        return list((await self.limits.get()).rate)
+
+    def close(self):
+        """Closes pooled connections of the client."""
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
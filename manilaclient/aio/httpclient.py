@@ -0,0 +1,220 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import time
+
+import requests
+import six
+
+from manilaclient.aio import singleflight
+from manilaclient.aio import transport
+from manilaclient.common import deadlines
+from manilaclient.common import httpclient
+from manilaclient.common import timings
+from manilaclient import exceptions
+
+
+class AsyncHTTPClient(httpclient.HTTPClient):
+    """HTTP client whose requests are coroutines.
+
+    Everything but sending requests is shared with the blocking client, so
+    headers, JSON codecs, compression, caching, retries and circuit
+    breakers behave the same on both. 'get()', 'post()', 'put()' and
+    'delete()' return awaitables of (response, body) tuples.
+    """
+
+    def _create_session(self, insecure, cacert, pool_connections,
+                        pool_maxsize):
+        return transport.AsyncTransport(
+            ssl_context=self._get_ssl_context(insecure, cacert),
+            pool_maxsize=pool_maxsize)
+
+    async def request(self, url, method, endpoint=None, **kwargs):
+        # Bodies are always read completely, there is no streaming
+        kwargs.pop('stream', None)
+        request = self._prepare_request(url, method, **kwargs)
+        resp = None
+        try:
+            with timings.collect_phases(request.phases):
+                resp = await self._send_request(
+                    method, self._get_endpoint_url(url, endpoint),
+                    request.headers, request.options)
+            return self._process_response(request, resp)
+        finally:
+            self._record_timing(request, resp)
+            self._record_metrics(request, resp)
+
+    async def _send_request(self, method, url, headers, options):
+        breaker = self._get_circuit_breaker(url)
+        start = time.time()
+        try:
+            resp = await self.http.request(method, url, headers=headers,
+                                           **options)
+        except Exception:
+            self._record_request_result(breaker, start)
+            raise
+        self._record_request_result(breaker, start, resp)
+        return resp
+
+    async def _request_with_failover(self, span, url, method, **kwargs):
+        if self.endpoints is None:
+            return await self.request(url, method, **kwargs)
+
+        failed = []
+        endpoint = self.endpoints.choose()
+        while True:
+            try:
+                result = await self.request(url, method, endpoint=endpoint,
+                                            **kwargs)
+            except (requests.exceptions.RequestException,
+                    exceptions.ClientException) as e:
+                endpoint = self._fail_over(span, method, e, endpoint, failed)
+                if endpoint is None:
+                    raise
+                continue
+            self.endpoints.release(endpoint)
+            return result
+
+    async def _request_with_hedging(self, span, url, method, **kwargs):
+        delay = self._get_hedge_delay(url, method, kwargs)
+        if delay is None:
+            return await self._send_attempt(span, url, method, kwargs)
+        return await self._send_hedged(span, url, method, delay, kwargs)
+
+    async def _send_attempt(self, span, url, method, kwargs):
+        """Sends the request, recording its latency for hedging."""
+        start = time.time()
+        try:
+            result = await self._request_with_failover(span, url, method,
+                                                       **kwargs)
+        except asyncio.CancelledError:
+            # Lost against its duplicate, the time it took so far is a
+            # lower bound of its latency
+            self._record_hedging_latency(url, method, start)
+            raise
+        self._record_hedging_latency(url, method, start)
+        return result
+
+    async def _request_with_reauth(self, span, url, method, **kwargs):
+        try:
+            return await self._request_with_hedging(span, url, method,
+                                                    **kwargs)
+        except exceptions.Unauthorized as e:
+            if not self._reauthenticate(span, e):
+                raise
+        return await self._request_with_hedging(span, url, method, **kwargs)
+
+    async def _send_hedged(self, span, url, method, delay, kwargs):
+        """Sends the request and its duplicate if it is slow.
+
+        The request still in progress when the other one succeeds is
+        cancelled. An error is raised only if both requests fail.
+        """
+        def send():
+            return asyncio.ensure_future(
+                self._send_attempt(span, url, method, kwargs))
+
+        tasks = [send()]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._start_hedge(span, url, delay):
+                tasks.append(send())
+
+            while True:
+                done, pending = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+                tasks = list(pending)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _create_single_flight(self):
+        return singleflight.AsyncSingleFlight(copy_result=self._copy_result)
+
+    async def _get_rate_limit_delay(self, method, url):
+        limiter = self.rate_limiter
+        if limiter is None:
+            return 0
+        if limiter.start_refresh():
+            rate_limits = None
+            try:
+                rate_limits = await limiter.loader()
+            except Exception as e:
+                self._logger.debug("Could not load rate limits: %s" % e)
+            finally:
+                limiter.finish_refresh(rate_limits)
+        return limiter.get_delay(method, self._get_relative_path(url),
+                                 max_delay=deadlines.get_remaining())
+
+    async def _cs_request_with_retries(self, url, method, **kwargs):
+        key = self._get_single_flight_key(url, method, kwargs)
+        if key is None:
+            return await self._send_with_retries(url, method, **kwargs)
+
+        result, shared = await self.single_flight.do(
+            key, lambda: self._send_with_retries(url, method, **kwargs))
+        if shared:
+            self._record_coalesced(url)
+        return result
+
+    async def _send_with_retries(self, url, method, **kwargs):
+        with deadlines.deadline(self.deadline):
+            with self._start_request_span(url, method) as span:
+                return await self._request_with_retries(span, url, method,
+                                                        **kwargs)
+
+    async def _request_with_retries(self, span, url, method, **kwargs):
+        attempts = 0
+        self.retry_policy.request_started()
+        while True:
+            attempts += 1
+            deadlines.check()
+            delay = await self._get_rate_limit_delay(method, url)
+            if delay:
+                self._check_rate_limit_delay(delay)
+                self._logger.debug("Rate limit reached, delaying request "
+                                   "for %.2f seconds" % delay)
+                span.add_event('rate_limited', {'delay': delay})
+                await asyncio.sleep(delay)
+            try:
+                resp, body = await self._request_with_reauth(
+                    span, url, method, **kwargs)
+                self._set_span_response(span, attempts, resp)
+                return resp, body
+            except (requests.exceptions.RequestException,
+                    exceptions.ClientException) as e:
+                self._set_span_response(span, attempts,
+                                        getattr(e, 'response', None))
+                delay = self._get_retry_delay(method, e, attempts)
+                if delay is None:
+                    raise
+
+                self._logger.debug("Request error: %s" % six.text_type(e))
+                span.add_event('retry', {'attempt': attempts,
+                                         'delay': delay,
+                                         'error': six.text_type(e)})
+
+            self._record_retry(url)
+            self._logger.debug(
+                "Failed attempt(%(current)s of %(total)s), "
+                " retrying in %(sec).2f seconds" % {
+                    'current': attempts,
+                    'total': self.retry_policy.retries,
+                    'sec': delay
+                })
+            await asyncio.sleep(delay)
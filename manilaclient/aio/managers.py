@@ -0,0 +1,146 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Asyncio versions of the v2 managers."""
+
+from manilaclient.aio import base
+from manilaclient.openstack.common.apiclient import base as common_base
+from manilaclient.v2 import consistency_group_snapshots as cg_snapshots
+from manilaclient.v2 import consistency_groups
+from manilaclient.v2 import limits
+from manilaclient.v2 import quota_classes
+from manilaclient.v2 import quotas
+from manilaclient.v2 import scheduler_stats
+from manilaclient.v2 import security_services
+from manilaclient.v2 import services
+from manilaclient.v2 import share_instances
+from manilaclient.v2 import share_networks
+from manilaclient.v2 import share_servers
+from manilaclient.v2 import share_snapshots
+from manilaclient.v2 import share_type_access
+from manilaclient.v2 import share_types
+from manilaclient.v2 import shares
+
+
+class LimitsManager(base.AsyncManagerMixin, limits.LimitsManager):
+    pass
+
+
+class ServiceManager(base.AsyncManagerMixin, services.ServiceManager):
+    pass
+
+
+class SecurityServiceManager(base.AsyncManagerWithFindMixin,
+                             security_services.SecurityServiceManager):
+    pass
+
+
+class ShareNetworkManager(base.AsyncManagerWithFindMixin,
+                          share_networks.ShareNetworkManager):
+    pass
+
+
+class QuotaClassSetManager(base.AsyncManagerWithFindMixin,
+                           quota_classes.QuotaClassSetManager):
+    pass
+
+
+class QuotaSetManager(base.AsyncManagerWithFindMixin,
+                      quotas.QuotaSetManager):
+    pass
+
+
+class ShareManager(base.AsyncManagerWithFindMixin, shares.ShareManager):
+
+    async def allow(self, share, access_type, access, access_level):
+        access_params = self._get_access_params(
+            access_type, access, access_level)
+        resp, body = await self._action('os-allow_access', share,
+                                        access_params)
+        return body["access"]
+
+    async def access_list(self, share):
+        resp, body = await self._action("os-access_list", share)
+        return self._build_access_list(body["access_list"])
+
+    async def delete_metadata(self, share, keys):
+        share_id = common_base.getid(share)
+        for key in keys:
+            await self._delete("/shares/%(share_id)s/metadata/%(key)s" % {
+                'share_id': share_id, 'key': key})
+
+
+class ShareInstanceManager(base.AsyncManagerWithFindMixin,
+                           share_instances.ShareInstanceManager):
+    pass
+
+
+class ShareSnapshotManager(base.AsyncManagerWithFindMixin,
+                           share_snapshots.ShareSnapshotManager):
+    pass
+
+
+class ShareType(share_types.ShareType):
+    """Share type whose methods sending requests are coroutines."""
+
+    async def get_keys(self, prefer_resource_data=True):
+        extra_specs = getattr(self, 'extra_specs', None)
+
+        if prefer_resource_data and extra_specs:
+            return extra_specs
+
+        _resp, body = await self.manager.api.client.get(
+            "/types/%s/extra_specs" % common_base.getid(self))
+
+        self.extra_specs = body["extra_specs"]
+
+        return body["extra_specs"]
+
+    async def unset_keys(self, keys):
+        for k in keys:
+            await self.manager._delete(
+                "/types/%s/extra_specs/%s" % (common_base.getid(self), k))
+
+
+class ShareTypeManager(base.AsyncManagerWithFindMixin,
+                       share_types.ShareTypeManager):
+    resource_class = ShareType
+
+
+class ShareTypeAccessManager(base.AsyncManagerWithFindMixin,
+                             share_type_access.ShareTypeAccessManager):
+    pass
+
+
+class ShareServerManager(base.AsyncManagerMixin,
+                         share_servers.ShareServerManager):
+
+    async def get(self, server_id):
+        server = await self._get(
+            "%s/%s" % (share_servers.RESOURCES_PATH, server_id),
+            share_servers.RESOURCE_NAME)
+        return self._add_backend_details(server)
+
+
+class PoolManager(base.AsyncManagerMixin, scheduler_stats.PoolManager):
+    pass
+
+
+class ConsistencyGroupManager(base.AsyncManagerWithFindMixin,
+                              consistency_groups.ConsistencyGroupManager):
+    pass
+
+
+class ConsistencyGroupSnapshotManager(
+        base.AsyncManagerWithFindMixin,
+        cg_snapshots.ConsistencyGroupSnapshotManager):
+    pass
@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+
+from manilaclient.common import deadlines
+from manilaclient.common import singleflight
+from manilaclient import exceptions
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared call whose leading task was cancelled."""
+
+
+class _AsyncCall(object):
+
+    def __init__(self):
+        self.future = asyncio.get_event_loop().create_future()
+        self.waiters = 0
+
+
+class AsyncSingleFlight(singleflight.SingleFlight):
+    """Coroutine version of :class:`manilaclient.common.singleflight`.
+
+    Tasks of one event loop are coalesced, 'do()' takes a function
+    returning an awaitable. When the task running the call is cancelled,
+    the first waiting task runs its own function instead and the others
+    wait for that one.
+    """
+
+    async def do(self, key, func):
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+        while call is not None:
+            call.waiters += 1
+            # Cancelling a waiting task must not cancel the shared call
+            try:
+                result = await asyncio.wait_for(asyncio.shield(call.future),
+                                                deadlines.get_remaining())
+            except asyncio.TimeoutError:
+                raise exceptions.DeadlineExceeded()
+            except _LeaderCancelled:
+                call = self._calls.get(key)
+                continue
+            return self._copy(result), True
+
+        call = self._calls[key] = _AsyncCall()
+        future = call.future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            # Waiting tasks retry, the first of them running its function
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the error as retrieved when no one waits for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+
+        if call.waiters:
+            return self._copy(result), False
+        return result, False
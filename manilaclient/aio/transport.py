@@ -0,0 +1,344 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""HTTP/1.1 transport built on asyncio streams.
+
+Only what the Manila API needs is implemented: keep-alive connections,
+'Content-Length' and chunked bodies and gzip/deflate response encoding.
+Proxies are taken from the environment, HTTP_PROXY and NO_PROXY, like the
+blocking client does. Plain HTTP is sent through them, HTTPS URLs to be
+proxied are refused with :class:`requests.exceptions.ProxyError`, as
+tunnelling is not implemented, and so are proxies reached over HTTPS.
+Method, URL and headers containing line breaks are rejected.
+
+Responses are returned as :class:`requests.Response` objects with the body
+already read, so they are handled exactly like the ones of the blocking
+client.
+"""
+
+import asyncio
+import base64
+import datetime
+import re
+import ssl
+import time
+
+import requests
+from requests import structures
+from six.moves.urllib import parse
+
+from manilaclient.common import timings
+from manilaclient.common import transports
+
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+NO_BODY_STATUSES = (204, 304)
+# Requests sent again when a reused connection turns out to be closed
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+# Characters that would end the request line or a header line early
+INVALID_CHARACTERS = re.compile(r'[\r\n\0]')
+
+
+class _ConnectionClosed(OSError):
+    """Connection was closed before any part of the response arrived."""
+
+
+class _Connection(object):
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncTransport(object):
+    """Sends HTTP requests over pooled asyncio connections.
+
+    :param ssl_context: SSL context used for all HTTPS connections, if None
+        it is built from the 'verify' argument of every request
+    :param pool_maxsize: max number of idle connections kept per host
+    """
+
+    def __init__(self, ssl_context=None, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        self.ssl_context = ssl_context
+        self.pool_maxsize = pool_maxsize
+        self._pools = {}
+
+    def close(self):
+        """Closes all idle connections."""
+        pools, self._pools = self._pools, {}
+        for connections in pools.values():
+            for connection in connections:
+                connection.close()
+
+    async def request(self, method, url, headers=None, data=None,
+                      timeout=None, verify=True):
+        """Sends a request and reads the whole response.
+
+        :param timeout: seconds the whole request may take, or tuple of
+            (connect, read) timeouts like requests takes, where the read
+            timeout bounds sending the request and reading the response
+        :raises: requests.exceptions.ConnectionError or
+            requests.exceptions.Timeout, so that callers can handle errors
+            of both transports the same way
+        """
+        self._check_request(method, url, headers or {})
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        connect_timeout = read_timeout = None
+        total_timeout = timeout
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            total_timeout = None
+        try:
+            return await asyncio.wait_for(
+                self._request(method, url, headers or {}, data, verify,
+                              connect_timeout, read_timeout),
+                total_timeout)
+        except requests.exceptions.RequestException:
+            raise
+        except asyncio.TimeoutError:
+            raise requests.exceptions.ReadTimeout(
+                "Request to %s timed out after %s seconds" % (url, timeout))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise requests.exceptions.ConnectionError(e)
+
+    @staticmethod
+    def _check_request(method, url, headers):
+        """Rejects requests that would be sent with injected lines."""
+        if INVALID_CHARACTERS.search(method) or ' ' in method:
+            raise ValueError("Invalid HTTP method %r" % method)
+        if INVALID_CHARACTERS.search(url) or ' ' in url:
+            raise requests.exceptions.InvalidURL(
+                "Invalid characters in URL %r" % url)
+        for name, value in headers.items():
+            if INVALID_CHARACTERS.search(name) or ':' in name:
+                raise requests.exceptions.InvalidHeader(
+                    "Invalid header name %r" % name)
+            if INVALID_CHARACTERS.search(str(value)):
+                raise requests.exceptions.InvalidHeader(
+                    "Invalid value of header %s: %r" % (name, value))
+
+    async def _request(self, method, url, headers, data, verify,
+                       connect_timeout=None, read_timeout=None):
+        parsed = parse.urlsplit(url)
+        key = (parsed.scheme, parsed.hostname,
+               parsed.port or DEFAULT_PORTS[parsed.scheme])
+        target = None
+        proxy = self._get_proxy(url)
+        if proxy is not None:
+            key, target, headers = self._use_proxy(proxy, parsed, headers)
+        connection = await self._get_connection(key, verify, connect_timeout)
+        try:
+            try:
+                resp, keep_alive = await asyncio.wait_for(self._exchange(
+                    connection, method, url, parsed, headers, data, target),
+                    read_timeout)
+            except _ConnectionClosed:
+                if not connection.reused:
+                    raise
+                # Server closed the idle connection meanwhile, or it closed
+                # it after processing the request. Only requests that may
+                # be processed twice are sent again on a new connection.
+                if method not in IDEMPOTENT_METHODS:
+                    raise requests.exceptions.ConnectionError(
+                        "Connection closed by server before a response to "
+                        "%s %s arrived, the request is not sent again" % (
+                            method, url))
+                connection.close()
+                connection = await self._get_connection(
+                    key, verify, connect_timeout, pooled=False)
+                resp, keep_alive = await asyncio.wait_for(self._exchange(
+                    connection, method, url, parsed, headers, data, target),
+                    read_timeout)
+        except BaseException:
+            connection.close()
+            raise
+
+        if keep_alive:
+            self._release_connection(key, connection)
+        else:
+            connection.close()
+        return resp
+
+    @staticmethod
+    def _get_proxy(url):
+        proxies = requests.utils.get_environ_proxies(url)
+        return requests.utils.select_proxy(url, proxies)
+
+    @staticmethod
+    def _use_proxy(proxy, parsed, headers):
+        """Returns pool key, request target and headers for the proxy."""
+        if parsed.scheme != 'http':
+            raise requests.exceptions.ProxyError(
+                "Sending HTTPS requests through proxy %s is not supported, "
+                "exclude the host with NO_PROXY or use the blocking "
+                "client" % proxy)
+        if '://' not in proxy:
+            proxy = 'http://' + proxy
+        proxy_parsed = parse.urlsplit(proxy)
+        if proxy_parsed.scheme != 'http':
+            raise requests.exceptions.ProxyError(
+                "Proxy %s is not supported, only plain HTTP proxies are" %
+                proxy)
+        key = ('http', proxy_parsed.hostname, proxy_parsed.port or 80)
+        username, password = requests.utils.get_auth_from_url(proxy)
+        if username:
+            headers = dict(headers)
+            credentials = ('%s:%s' % (username, password)).encode('utf-8')
+            headers['Proxy-Authorization'] = (
+                'Basic ' + base64.b64encode(credentials).decode('ascii'))
+        target = parse.urlunsplit(parsed[:4] + ('',))
+        return key, target, headers
+
+    async def _get_connection(self, key, verify, connect_timeout=None,
+                              pooled=True):
+        pool = self._pools.get(key)
+        while pooled and pool:
+            connection = pool.pop()
+            if not connection.reader.at_eof():
+                connection.reused = True
+                timings.record_connection(True)
+                return connection
+            connection.close()
+
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == 'https':
+            ssl_context = self.ssl_context or self._build_ssl_context(verify)
+        start = time.time()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                host, port, ssl=ssl_context,
+                server_hostname=host if ssl_context else None),
+                connect_timeout)
+        except asyncio.TimeoutError:
+            raise requests.exceptions.ConnectTimeout(
+                "Connection to %s:%s timed out after %s seconds" % (
+                    host, port, connect_timeout))
+        # asyncio does the TLS handshake as a part of connecting
+        timings.record_phase('connect', time.time() - start)
+        timings.record_connection(False)
+        return _Connection(reader, writer)
+
+    def _release_connection(self, key, connection):
+        pool = self._pools.setdefault(key, [])
+        if len(pool) < self.pool_maxsize:
+            pool.append(connection)
+        else:
+            connection.close()
+
+    @staticmethod
+    def _build_ssl_context(verify):
+        if verify is False:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            return context
+        if isinstance(verify, str):
+            return ssl.create_default_context(cafile=verify)
+        return ssl.create_default_context()
+
+    async def _exchange(self, connection, method, url, parsed, headers,
+                        data, target=None):
+        # Proxies get the absolute URL as target
+        path = target
+        if path is None:
+            path = parsed.path or '/'
+            if parsed.query:
+                path += '?' + parsed.query
+
+        lines = ['%s %s HTTP/1.1' % (method, path),
+                 'Host: %s' % parsed.netloc]
+        for name, value in headers.items():
+            lines.append('%s: %s' % (name, value))
+        if data is not None or method in ('POST', 'PUT', 'PATCH'):
+            lines.append('Content-Length: %d' % len(data or b''))
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        reader = connection.reader
+        start = time.time()
+        try:
+            connection.writer.write(request + (data or b''))
+            await connection.writer.drain()
+            status_line = await reader.readline()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            status_line = b''
+        if not status_line:
+            raise _ConnectionClosed("Connection closed by server")
+        version, status, reason = self._parse_status_line(status_line)
+
+        resp_headers = structures.CaseInsensitiveDict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _sep, value = line.decode('latin-1').partition(':')
+            name, value = name.strip(), value.strip()
+            if name in resp_headers:
+                value = '%s, %s' % (resp_headers[name], value)
+            resp_headers[name] = value
+
+        elapsed = datetime.timedelta(seconds=time.time() - start)
+        connection_header = resp_headers.get('Connection', '').lower()
+        keep_alive = (connection_header != 'close' if version == 'HTTP/1.1'
+                      else connection_header == 'keep-alive')
+
+        if (method == 'HEAD' or status in NO_BODY_STATUSES or
+                100 <= status < 200):
+            raw = b''
+        elif 'chunked' in resp_headers.get('Transfer-Encoding', '').lower():
+            raw = await self._read_chunked(reader)
+        elif 'Content-Length' in resp_headers:
+            raw = await reader.readexactly(
+                int(resp_headers['Content-Length']))
+        else:
+            raw = await reader.read()
+            keep_alive = False
+
+        resp = transports.build_response(
+            url, status, reason, resp_headers,
+            content=transports.decode_content(
+                raw, resp_headers.get('Content-Encoding')),
+            raw=transports.RawBody(len(raw)), elapsed=elapsed)
+        return resp, keep_alive
+
+    @staticmethod
+    def _parse_status_line(line):
+        parts = line.decode('latin-1').strip().split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise requests.exceptions.ConnectionError(
+                "Invalid HTTP status line: %r" % line)
+        reason = parts[2] if len(parts) > 2 else ''
+        return parts[0], int(parts[1]), reason
+
+    @staticmethod
+    async def _read_chunked(reader):
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            try:
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                # Also the end of a truncated body
+                raise requests.exceptions.ConnectionError(
+                    "Invalid chunk size line: %r" % size_line)
+            if size == 0:
+                # Skip trailer headers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
@@ -0,0 +1,49 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import functools
+
+from manilaclient.common import requestcontext
+from manilaclient.common import tracing
+from manilaclient.v2 import client as v2_client
+
+
+def experimental_api(f):
+    """Coroutine version of :func:`manilaclient.api_versions.experimental_api`.
+
+    The flag is set while the coroutine runs instead of while it is
+    created, in the context of the task awaiting it.
+    """
+
+    @functools.wraps(f)
+    async def _wrapper(*args, **kwargs):
+        client = args[0]
+        if isinstance(client, v2_client.Client):
+            with requestcontext.experimental_api.enabled():
+                return await f(*args, **kwargs)
+        return await f(*args, **kwargs)
+    return _wrapper
+
+
+async def trace_awaitable(span, awaitable):
+    """Awaits a traced manager call, ending its span afterwards.
+
+    See :func:`manilaclient.common.tracing.traced`.
+    """
+    try:
+        with tracing.use_span(span):
+            return await awaitable
+    except Exception as e:
+        span.record_exception(e)
+        raise
+    finally:
+        span.end()
@@ -14,17 +14,27 @@
 #    under the License.
 
 import functools
+import inspect
+import json
 import logging
+import os
 import re
+import threading
+import time
 import warnings
 
+import six
+
 import manilaclient
-from manilaclient.common import constants
+from manilaclient.common import requestcontext
 from manilaclient import exceptions
 from manilaclient.openstack.common._i18n import _
-from manilaclient.openstack.common import cliutils
 from manilaclient import utils
 
+# Imports prettytable and oslo_utils.strutils, only needed once commands
+# are defined
+cliutils = utils.LazyModule('manilaclient.openstack.common.cliutils')
+
 
 LOG = logging.getLogger(__name__)
 if not LOG.handlers:
@@ -34,6 +44,7 @@ if not LOG.handlers:
 MAX_VERSION = '2.6'
 MIN_VERSION = '2.0'
 DEPRECATED_VERSION = '1.0'
+DEFAULT_VERSION_CACHE_TTL = 3600
 _VERSIONED_METHOD_MAP = {}
 
 
@@ -221,8 +232,113 @@ def get_api_version(version_string):
     return api_version
 
 
-def _get_server_version_range(client):
-    """Obtain version range from server."""
+class VersionCache(object):
+    """Cache of version ranges supported by API endpoints.
+
+    Versions discovered with 'discover_version(..., cache=cache)' are
+    reused for 'ttl' seconds. Entries of endpoints failing requests with a
+    version error should be dropped with 'invalidate()', so that they are
+    discovered again, see 'is_version_error()'.
+
+    :param ttl: seconds a discovered version range is used for
+    :param path: JSON file keeping the ranges across processes, ranges are
+        only kept in memory if None
+    """
+
+    def __init__(self, ttl=DEFAULT_VERSION_CACHE_TTL, path=None):
+        self.ttl = ttl
+        self.path = os.path.expanduser(path) if path else None
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        entries = {}
+        if self.path is not None:
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+            except (IOError, OSError, ValueError):
+                pass
+        return entries if isinstance(entries, dict) else {}
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _update(self, endpoint, entry=None):
+        """Stores the entry of the endpoint, or drops it if None.
+
+        Entries saved by other processes meanwhile, e.g. for other
+        endpoints, are merged in before saving, so that they are kept.
+        """
+        entries = self._load()
+        if self.path is None:
+            return
+        entries.update(self._read())
+        if entry is None:
+            entries.pop(endpoint, None)
+        else:
+            entries[endpoint] = entry
+        try:
+            utils.write_private_json(self.path, entries)
+        except (IOError, OSError) as e:
+            LOG.debug("Could not save API versions: %s" % e)
+
+    def get(self, endpoint):
+        """Returns cached (min, max) APIVersion range or None."""
+        with self._lock:
+            entry = self._load().get(endpoint)
+        try:
+            min_version, max_version, stored_at = entry
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= time.time() - stored_at < self.ttl:
+            return None
+        return APIVersion(min_version), APIVersion(max_version)
+
+    def set(self, endpoint, min_version, max_version):
+        entry = [None if min_version.is_null() else min_version.get_string(),
+                 None if max_version.is_null() else max_version.get_string(),
+                 time.time()]
+        with self._lock:
+            self._load()[endpoint] = entry
+            self._update(endpoint, entry)
+
+    def invalidate(self, endpoint):
+        with self._lock:
+            self._load().pop(endpoint, None)
+            self._update(endpoint)
+
+
+def get_version_cache_key(client):
+    """Returns endpoint URL of the client, None if it is unknown."""
+    endpoint = getattr(getattr(client, 'client', None), 'endpoint_url', None)
+    return endpoint if isinstance(endpoint, six.string_types) else None
+
+
+def is_version_error(error):
+    """Whether the error may be caused by an outdated version range."""
+    return (isinstance(error, (exceptions.UnsupportedVersion,
+                               exceptions.VersionNotFoundForAPIMethod)) or
+            getattr(error, 'http_status', None) == 406)
+
+
+def _get_server_version_range(client, cache=None):
+    """Obtain version range from server, or from the cache."""
+    endpoint = get_version_cache_key(client) if cache is not None else None
+    if endpoint is not None:
+        version_range = cache.get(endpoint)
+        if version_range is not None:
+            return version_range
+
+    version_range = _fetch_server_version_range(client)
+    if endpoint is not None:
+        cache.set(endpoint, *version_range)
+    return version_range
+
+
+def _fetch_server_version_range(client):
     response = client.services.server_api_version('')
 
     server_version = None
@@ -241,7 +357,7 @@ def _get_server_version_range(client):
     return min_version, max_version
 
 
-def discover_version(client, requested_version):
+def discover_version(client, requested_version, cache=None):
     """Discovers the most recent version for client and API.
 
     Checks 'requested_version' and returns the most recent version
@@ -249,10 +365,12 @@ def discover_version(client, requested_version):
 
     :param client: client object
     :param requested_version: requested version represented by APIVersion obj
+    :param cache: VersionCache to take the version range of the server
+        from, instead of requesting it every time
     :returns: APIVersion
     """
     server_start_version, server_end_version = _get_server_version_range(
-        client)
+        client, cache)
 
     valid_version = requested_version
     if server_start_version.is_null() and server_end_version.is_null():
@@ -334,18 +452,32 @@ def get_versioned_methods(func_name, api_version=None):
 
 
 def experimental_api(f):
-    """Adds to HTTP Header to indicate this is an experimental API call."""
+    """Adds to HTTP Header to indicate this is an experimental API call.
+
+    The header is added only to requests sent while the decorated function
+    runs, and only in the thread (or asyncio task) running it, so a client
+    shared by several threads is not affected.
+    """
+    if _is_coroutine_function(f):
+        from manilaclient.aio import utils as aio_utils
+        return aio_utils.experimental_api(f)
 
     @functools.wraps(f)
     def _wrapper(*args, **kwargs):
         client = args[0]
         if isinstance(client, manilaclient.v2.client.Client):
-            dh = client.client.default_headers
-            dh[constants.EXPERIMENTAL_HTTP_HEADER] = 'true'
+            with requestcontext.experimental_api.enabled():
+                return f(*args, **kwargs)
         return f(*args, **kwargs)
     return _wrapper
 
 
+def _is_coroutine_function(f):
+    # Not available before Python 3.5
+    is_coroutine_function = getattr(inspect, 'iscoroutinefunction', None)
+    return bool(is_coroutine_function and is_coroutine_function(f))
+
+
 def wraps(start_version, end_version=MAX_VERSION):
     """Annotation used to return the correct method based on requested version.
 
@@ -21,12 +21,23 @@ Base utilities to build API operation managers and objects on top of.
 
 import contextlib
 import hashlib
+import inspect
 import os
+import threading
+import time
 
+import six
+
+from manilaclient.common import jsonstream
+from manilaclient.common import requestcontext
+from manilaclient.common import tracing
 from manilaclient import exceptions
-from manilaclient.openstack.common import cliutils
 from manilaclient import utils
 
+# Imports prettytable and oslo_utils.strutils, only needed for the
+# completion cache
+cliutils = utils.LazyModule('manilaclient.openstack.common.cliutils')
+
 
 # Python 2.4 compat
 try:
@@ -36,6 +47,60 @@ except NameError:
         return True not in (not x for x in iterable)
 
 
+class ManagerMeta(type):
+    """Wraps public methods of managers, so that calls of them are traced.
+
+    See :mod:`manilaclient.common.tracing`.
+    """
+
+    untraced_methods = ('completion_cache', 'write_to_completion_cache')
+
+    def __new__(mcs, name, bases, namespace):
+        for attr, value in list(namespace.items()):
+            if (not attr.startswith('_') and inspect.isfunction(value) and
+                    attr not in mcs.untraced_methods):
+                namespace[attr] = tracing.traced(value)
+        return super(ManagerMeta, mcs).__new__(mcs, name, bases, namespace)
+
+
+class _CompletionCaches(object):
+    """Open completion cache files and time spent on them."""
+
+
+class ResourceIterator(object):
+    """Iterator over resources of a streamed listing.
+
+    The response is closed once all resources are read, on errors and when
+    the iterator is closed or dropped, even if iterating never started.
+    """
+
+    def __init__(self, resources, on_close=None):
+        self._resources = resources
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._resources)
+        except Exception:
+            self.close()
+            raise
+
+    next = __next__
+
+    def close(self):
+        self._resources.close()
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def __del__(self):
+        self.close()
+
+
+@six.add_metaclass(ManagerMeta)
 class Manager(utils.HookableMixin):
     """Manager for CRUD operations.
 
@@ -46,18 +111,50 @@ class Manager(utils.HookableMixin):
 
     def __init__(self, api):
         self.api = api
+        # Open completion cache files, separately for every thread using
+        # the manager.
+        self._completion_caches = threading.local()
 
     @property
     def api_version(self):
         return self.api.api_version
 
+    def _get_name(self):
+        """Returns name of the client attribute the manager is set to."""
+        name = getattr(self, '_name', None)
+        if name is None:
+            name = next((attr for attr, value in vars(self.api).items()
+                         if value is self), type(self).__name__)
+            self._name = name
+        return name
+
+    def _operation(self, name):
+        """Labels requests sent in the 'with' block, e.g. 'shares.list'.
+
+        Labels are used by metrics and tracing of the HTTP client.
+        """
+        return requestcontext.operation.scoped(
+            '%s.%s' % (self._get_name(), name))
+
+    @property
+    def _metrics(self):
+        return getattr(getattr(self.api, 'client', None), 'metrics', None)
+
+    @property
+    def _tracer(self):
+        return getattr(getattr(self.api, 'client', None), 'tracer', None)
+
     def _list(self, url, response_key, obj_class=None, body=None):
         resp = None
-        if body:
-            resp, body = self.api.client.post(url, body=body)
-        else:
-            resp, body = self.api.client.get(url)
+        with self._operation('list'):
+            if body:
+                resp, body = self.api.client.post(url, body=body)
+            else:
+                resp, body = self.api.client.get(url)
+
+        return self._build_list(body, response_key, obj_class)
 
+    def _build_list(self, body, response_key, obj_class=None):
         if obj_class is None:
             obj_class = self.resource_class
 
@@ -75,8 +172,71 @@ class Manager(utils.HookableMixin):
                 return [obj_class(self, res, loaded=True)
                         for res in data if res]
 
+    def _list_stream(self, url, response_key, obj_class=None, body=None):
+        """Like _list(), but returns an iterator over the resources.
+
+        The request is sent right away, so errors are raised by this call,
+        but the response body is parsed incrementally while iterating and
+        each resource is built as soon as its JSON object is received. Peak
+        memory does not depend on the number of returned resources.
+
+        :returns: :class:`ResourceIterator`
+        """
+        with self._operation('list'):
+            if body:
+                resp, body = self.api.client.post(url, body=body,
+                                                  stream=True)
+            else:
+                resp, body = self.api.client.get(url, stream=True)
+
+        if obj_class is None:
+            obj_class = self.resource_class
+
+        if body is not None:
+            # Client did not stream the response (e.g. it was served from a
+            # cache), so resources are already decoded.
+            data = body[response_key]
+            if isinstance(data, dict):
+                data = data.get('values', data)
+            return ResourceIterator(self._iter_resources(data, obj_class))
+
+        data = jsonstream.iter_array_items(
+            resp.iter_content(jsonstream.DEFAULT_CHUNK_SIZE), response_key)
+        return ResourceIterator(self._iter_resources(data, obj_class),
+                                on_close=resp.close)
+
+    def _iter_resources(self, data, obj_class):
+        # Listings iterated at the same time in one thread must not write
+        # to each other's cache files, so every one keeps its own.
+        caches = _CompletionCaches()
+        with self.completion_cache('human_id', obj_class, mode="w",
+                                   caches=caches):
+            with self.completion_cache('uuid', obj_class, mode="w",
+                                       caches=caches):
+                for res in data:
+                    if res:
+                        with self._writing_completion_caches(caches):
+                            resource = obj_class(self, res, loaded=True)
+                        yield resource
+
+    def _get_completion_caches(self):
+        """Returns the open cache files resources are written to."""
+        local = self._completion_caches
+        return getattr(local, 'active', None) or local
+
     @contextlib.contextmanager
-    def completion_cache(self, cache_type, obj_class, mode):
+    def _writing_completion_caches(self, caches):
+        """Writes resources built in the 'with' block to the given caches."""
+        local = self._completion_caches
+        previous = getattr(local, 'active', None)
+        local.active = caches
+        try:
+            yield
+        finally:
+            local.active = previous
+
+    @contextlib.contextmanager
+    def completion_cache(self, cache_type, obj_class, mode, caches=None):
         """Bash autocompletion items storage.
 
         The completion cache store items that can be used for bash
@@ -88,7 +248,11 @@ class Manager(utils.HookableMixin):
 
         Delete is not handled because listings are assumed to be performed
         often enough to keep the cache reasonably up-to-date.
+
+        :param caches: object to keep the open file on, by default the one
+            of the current thread
         """
+        start = time.time()
         base_dir = cliutils.env('manilaclient_UUID_CACHE_DIR',
                                 default="~/.manilaclient")
 
@@ -114,63 +278,88 @@ class Manager(utils.HookableMixin):
         path = os.path.join(cache_dir, filename)
 
         cache_attr = "_%s_cache" % cache_type
+        time_attr = "_%s_cache_time" % cache_type
+        if caches is None:
+            caches = self._get_completion_caches()
 
         try:
-            setattr(self, cache_attr, open(path, mode))
+            setattr(caches, cache_attr, open(path, mode))
         except IOError:
             # NOTE(kiall): This is typically a permission denied while
             #              attempting to write the cache file.
             pass
+        setattr(caches, time_attr, time.time() - start)
 
         try:
             yield
         finally:
-            cache = getattr(self, cache_attr, None)
+            start = time.time()
+            cache = getattr(caches, cache_attr, None)
             if cache:
                 cache.close()
-                delattr(self, cache_attr)
+                delattr(caches, cache_attr)
+            spent = getattr(caches, time_attr) + time.time() - start
+            delattr(caches, time_attr)
+            metrics = self._metrics
+            if metrics is not None:
+                metrics.record_completion_cache_write(cache_type, spent)
 
     def write_to_completion_cache(self, cache_type, val):
-        cache = getattr(self, "_%s_cache" % cache_type, None)
+        caches = self._get_completion_caches()
+        cache = getattr(caches, "_%s_cache" % cache_type, None)
         if cache:
+            start = time.time()
             cache.write("%s\n" % val)
+            time_attr = "_%s_cache_time" % cache_type
+            setattr(caches, time_attr,
+                    getattr(caches, time_attr, 0) + time.time() - start)
 
     def _get(self, url, response_key=None):
-        resp, body = self.api.client.get(url)
-        if response_key:
-            return self.resource_class(self, body[response_key], loaded=True)
-        else:
-            return self.resource_class(self, body, loaded=True)
+        with self._operation('get'):
+            resp, body = self.api.client.get(url)
+        return self._build_resource(body, response_key)
 
     def _get_with_base_url(self, url, response_key=None):
-        resp, body = self.api.client.get_with_base_url(url)
+        with self._operation('get'):
+            resp, body = self.api.client.get_with_base_url(url)
         if response_key:
             return [self.resource_class(self, res, loaded=True)
                     for res in body[response_key] if res]
         else:
             return self.resource_class(self, body, loaded=True)
 
+    def _build_resource(self, body, response_key=None, loaded=True):
+        if response_key:
+            return self.resource_class(self, body[response_key], loaded=loaded)
+        else:
+            return self.resource_class(self, body, loaded=loaded)
+
     def _create(self, url, body, response_key, return_raw=False, **kwargs):
         self.run_hooks('modify_body_for_create', body, **kwargs)
-        resp, body = self.api.client.post(url, body=body)
+        with self._operation('create'):
+            resp, body = self.api.client.post(url, body=body)
+        return self._build_created(body, response_key, return_raw)
+
+    def _build_created(self, body, response_key, return_raw=False,
+                       loaded=False):
         if return_raw:
             return body[response_key]
 
         with self.completion_cache('human_id', self.resource_class, mode="a"):
             with self.completion_cache('uuid', self.resource_class, mode="a"):
-                return self.resource_class(self, body[response_key])
+                return self.resource_class(self, body[response_key],
+                                           loaded=loaded)
 
     def _delete(self, url):
-        resp, body = self.api.client.delete(url)
+        with self._operation('delete'):
+            resp, body = self.api.client.delete(url)
 
     def _update(self, url, body, response_key=None, **kwargs):
         self.run_hooks('modify_body_for_update', body, **kwargs)
-        resp, body = self.api.client.put(url, body=body)
+        with self._operation('update'):
+            resp, body = self.api.client.put(url, body=body)
         if body:
-            if response_key:
-                return self.resource_class(self, body[response_key])
-            else:
-                return self.resource_class(self, body)
+            return self._build_resource(body, response_key, loaded=False)
 
 
 class ManagerWithFind(Manager):
@@ -181,7 +370,9 @@ class ManagerWithFind(Manager):
         This isn't very efficient: it loads the entire list then filters on
         the Python side.
         """
-        matches = self.findall(**kwargs)
+        return self._get_single_match(self.findall(**kwargs), kwargs)
+
+    def _get_single_match(self, matches, kwargs):
         num_matches = len(matches)
         if num_matches == 0:
             msg = "No %s matching %s." % (self.resource_class.__name__, kwargs)
@@ -197,10 +388,13 @@ class ManagerWithFind(Manager):
         This isn't very efficient: it loads the entire list then filters on
         the Python side.
         """
+        return self._filter_matches(self.list(), kwargs)
+
+    def _filter_matches(self, objects, kwargs):
         found = []
         searches = list(kwargs.items())
 
-        for obj in self.list():
+        for obj in objects:
             try:
                 if all(getattr(obj, attr) == value
                        for (attr, value) in searches):
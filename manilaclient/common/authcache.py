@@ -0,0 +1,185 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""On-disk cache of auth tokens and share endpoints.
+
+Clients authenticating with credentials store the token, its expiry and
+the share endpoints found in the service catalog, so that processes
+started later, e.g. consecutive 'manila' commands, skip keystone until the
+token is about to expire::
+
+    >>> manila = client.Client(VERSION, username=USER, password=PASSWORD,
+                               project_name=PROJECT, auth_url=AUTH_URL,
+                               auth_cache=authcache.AuthCache())
+
+Entries are kept in files readable only by their owner. Entries are found
+by an HMAC of the credentials keyed by a random secret, which is stored in
+the cache directory, also readable only by its owner. Credentials are not
+written to disk, and the names of the entries cannot be used to guess them
+without the secret.
+"""
+
+import calendar
+import errno
+import hashlib
+import hmac
+import json
+import logging
+import os
+import tempfile
+import time
+
+from manilaclient import utils
+
+DEFAULT_DIRECTORY = os.path.join('~', '.cache', 'manilaclient', 'auth')
+SECRET_FILE = 'secret'
+SECRET_SIZE = 32
+
+LOG = logging.getLogger(__name__)
+
+
+def get_expiry(auth_ref):
+    """Returns expiry of a keystone token as seconds since the epoch."""
+    expires = getattr(auth_ref, 'expires', None)
+    if expires is None:
+        return None
+    return calendar.timegm(expires.utctimetuple())
+
+
+class AuthCache(object):
+    """Directory of cached auth entries.
+
+    :param directory: directory of the entries, created when needed
+    :param stale_duration: seconds before their expiry tokens are not
+        used anymore
+    """
+
+    def __init__(self, directory=None, stale_duration=300):
+        self.directory = os.path.expanduser(directory or DEFAULT_DIRECTORY)
+        self.stale_duration = stale_duration
+        self._secret = None
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _read_secret(self, path):
+        with open(path, 'rb') as f:
+            secret = f.read()
+        if len(secret) != SECRET_SIZE:
+            raise ValueError("Invalid auth cache secret %s" % path)
+        return secret
+
+    def _get_secret(self):
+        """Returns the secret keying entries, created on first use."""
+        if self._secret is not None:
+            return self._secret
+        path = os.path.join(self.directory, SECRET_FILE)
+        try:
+            self._secret = self._read_secret(path)
+            return self._secret
+        except ValueError:
+            # Entries keyed by the lost secret are not found anymore
+            LOG.warning("Auth cache secret %s is corrupt, replacing it.",
+                        path)
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+        except (IOError, OSError):
+            pass
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(SECRET_SIZE))
+            # Linking fails when another process created the secret first
+            os.link(tmp_path, path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        finally:
+            os.remove(tmp_path)
+        self._secret = self._read_secret(path)
+        return self._secret
+
+    def make_key(self, **attributes):
+        """Returns key of an entry for the given auth attributes.
+
+        All attributes affecting the token or the endpoints have to be
+        given, e.g. auth URL, user, password, project, region and
+        interface. Returns None when the secret cannot be read or created,
+        entries are not cached then.
+        """
+        try:
+            secret = self._get_secret()
+        except (IOError, OSError, ValueError):
+            return None
+        data = json.dumps(attributes, sort_keys=True)
+        return hmac.new(secret, data.encode('utf-8'),
+                        hashlib.sha256).hexdigest()
+
+    def get(self, key, service_type):
+        """Returns cached (token, expiry, endpoint) or None.
+
+        Only tokens that are not about to expire and that have an endpoint
+        of the service type are returned.
+        """
+        if key is None:
+            return None
+        try:
+            with open(self._get_path(key)) as f:
+                entry = json.load(f)
+            token = entry['token']
+            expires_at = entry['expires_at']
+            endpoint = entry['endpoints'][service_type]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_at - time.time() <= self.stale_duration:
+            return None
+        return token, expires_at, endpoint
+
+    def set(self, key, token, expires_at, service_type, endpoint):
+        """Stores token and endpoint of the service type.
+
+        Endpoints of other service types are kept as long as the token
+        does not change. Failures to write are ignored.
+        """
+        if key is None:
+            return
+        entry = {}
+        try:
+            with open(self._get_path(key)) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+        endpoints = {}
+        if isinstance(entry, dict) and entry.get('token') == token:
+            endpoints = entry.get('endpoints') or {}
+        endpoints[service_type] = endpoint
+        entry = {'token': token, 'expires_at': expires_at,
+                 'endpoints': endpoints}
+
+        try:
+            utils.write_private_json(self._get_path(key), entry)
+        except (IOError, OSError):
+            pass
+
+    def delete(self, key):
+        if key is None:
+            return
+        try:
+            os.remove(self._get_path(key))
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,170 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Circuit breakers that make requests to a failing endpoint fail fast."""
+
+import threading
+import time
+
+from manilaclient import exceptions
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# Weight of the latest request in the average latency
+LATENCY_SMOOTHING = 0.2
+
+
+class CircuitBreaker(object):
+    """Tracks health of a single endpoint.
+
+    The circuit is 'closed' while the endpoint works and all requests are
+    sent. After 'failure_threshold' consecutive failures it opens and every
+    request fails at once with :class:`exceptions.CircuitBreakerOpen` for
+    'reset_timeout' seconds. Then the circuit is 'half_open': at most
+    'half_open_probes' requests at a time are let through as probes, a
+    successful probe closes the circuit and a failed one opens it again.
+
+    :param endpoint: endpoint the breaker belongs to
+    :param failure_threshold: number of consecutive failures opening the
+        circuit
+    :param reset_timeout: number of seconds the circuit stays open
+    :param half_open_probes: number of concurrent probe requests
+    :param slow_call_threshold: optional number of seconds, a request taking
+        longer is counted as failure even if it succeeded
+    """
+
+    def __init__(self, endpoint, failure_threshold=5, reset_timeout=30,
+                 half_open_probes=1, slow_call_threshold=None):
+        if failure_threshold < 1:
+            raise ValueError("Failure threshold should be a positive number.")
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+        self.opened_at = None
+        self.last_latency = None
+        self.average_latency = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Checks if a request may be sent to the endpoint.
+
+        :raises: exceptions.CircuitBreakerOpen if the circuit is open
+        """
+        with self._lock:
+            if (self.state == STATE_OPEN and
+                    time.time() - self.opened_at >= self.reset_timeout):
+                self.state = STATE_HALF_OPEN
+                self._probes = 0
+
+            if self.state == STATE_CLOSED:
+                return
+            if (self.state == STATE_HALF_OPEN and
+                    self._probes < self.half_open_probes):
+                self._probes += 1
+                return
+
+            self.rejected += 1
+            retry_after = max(
+                0, self.opened_at + self.reset_timeout - time.time())
+        raise exceptions.CircuitBreakerOpen(self.endpoint, retry_after)
+
+    def record_success(self, latency):
+        if (self.slow_call_threshold is not None and
+                latency > self.slow_call_threshold):
+            self.record_failure(latency)
+            return
+        with self._lock:
+            self._record_latency(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            if self.state == STATE_HALF_OPEN:
+                self.state = STATE_CLOSED
+                self.opened_at = None
+                self._probes = 0
+
+    def record_failure(self, latency):
+        with self._lock:
+            self._record_latency(latency)
+            self.failures += 1
+            self.consecutive_failures += 1
+            if (self.state == STATE_HALF_OPEN or
+                    self.consecutive_failures >= self.failure_threshold):
+                self.state = STATE_OPEN
+                self.opened_at = time.time()
+                self._probes = 0
+
+    def _record_latency(self, latency):
+        self.last_latency = latency
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += (
+                LATENCY_SMOOTHING * (latency - self.average_latency))
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'endpoint': self.endpoint,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failures': self.failures,
+                'successes': self.successes,
+                'rejected': self.rejected,
+                'opened_at': self.opened_at,
+                'last_latency': self.last_latency,
+                'average_latency': self.average_latency,
+            }
+
+
+class CircuitBreakerRegistry(object):
+    """Creates and keeps one :class:`CircuitBreaker` per endpoint.
+
+    A registry may be shared by several clients talking to the same
+    endpoints, so that all of them stop sending requests to a failing one.
+    Arguments are passed to every breaker created.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30,
+                 half_open_probes=1, slow_call_threshold=None):
+        self.breaker_options = {
+            'failure_threshold': failure_threshold,
+            'reset_timeout': reset_timeout,
+            'half_open_probes': half_open_probes,
+            'slow_call_threshold': slow_call_threshold,
+        }
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint):
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, **self.breaker_options)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def get_states(self):
+        """Returns dict with state of every known endpoint."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return dict((b.endpoint, b.to_dict()) for b in breakers)
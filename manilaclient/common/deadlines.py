@@ -0,0 +1,99 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Deadlines bounding the total time of API calls.
+
+A deadline covers every request sent in its scope, including retries and
+the delays between them::
+
+    >>> with manila.deadline(5):
+    ...     manila.shares.list()
+
+Timeouts of requests are shortened to the time left, a request is not
+retried if the delay before it would pass the deadline, and
+:class:`manilaclient.exceptions.DeadlineExceeded` is raised once the
+deadline has passed.
+
+Bodies of responses are read in chunks, checking the deadline after every
+chunk, so a body trickling in can pass the deadline by the time a single
+chunk takes to arrive. Bodies read by the caller, e.g. of streamed
+listings, are not covered by the deadline.
+"""
+
+import contextlib
+import time
+
+from manilaclient.common import requestcontext
+from manilaclient import exceptions
+
+# Shortest timeout given to a request, a timeout of zero means no timeout
+# for some transports.
+MIN_TIMEOUT = 0.001
+
+_expires_at = requestcontext.ContextValue('manilaclient_deadline')
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """Sets deadline of calls made in the 'with' block.
+
+    Nested deadlines can only make the deadline earlier.
+
+    :param seconds: time the calls may take, None for no deadline
+    """
+    if seconds is None:
+        yield _expires_at.get()
+        return
+    expires_at = time.time() + seconds
+    current = _expires_at.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    with _expires_at.scoped(expires_at):
+        yield expires_at
+
+
+def get_remaining():
+    """Returns seconds left until the current deadline, None if not set."""
+    expires_at = _expires_at.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.time()
+
+
+def check():
+    """Raises DeadlineExceeded if the current deadline has passed."""
+    remaining = get_remaining()
+    if remaining is not None and remaining <= 0:
+        raise exceptions.DeadlineExceeded(_expires_at.get())
+
+
+def allows(delay):
+    """Whether waiting for the delay leaves time before the deadline."""
+    remaining = get_remaining()
+    return remaining is None or delay < remaining
+
+
+def clamp_timeout(timeout):
+    """Shortens request timeout to the time left until the deadline.
+
+    :param timeout: None, seconds or tuple of (connect, read) seconds
+    """
+    remaining = get_remaining()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, MIN_TIMEOUT)
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining)
+                     for t in timeout)
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
@@ -0,0 +1,161 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Load balancing and failover across several endpoints of the API.
+
+When the client is given more than one endpoint, e.g. several catalog
+entries of the share service, requests are spread across them and a
+request failing with a connection error or a 5xx status is sent again to
+another endpoint. An endpoint failing 'failure_threshold' times in a row is
+considered unhealthy and is only used again after 'recovery_time' seconds,
+or when no other endpoint is left.
+"""
+
+import errno
+import threading
+import time
+
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+
+from manilaclient import exceptions
+
+STRATEGY_ROUND_ROBIN = 'round-robin'
+STRATEGY_LEAST_OUTSTANDING = 'least-outstanding'
+STRATEGIES = (STRATEGY_ROUND_ROBIN, STRATEGY_LEAST_OUTSTANDING)
+
+
+def is_endpoint_failure(error):
+    """Whether the error means that the endpoint itself is failing."""
+    if isinstance(error, exceptions.HttpError):
+        return error.http_status >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout,
+                              exceptions.ConnectionError,
+                              exceptions.CircuitBreakerOpen))
+
+
+def is_connect_error(error):
+    """Whether the request surely did not reach the endpoint.
+
+    Such requests can be sent to another endpoint whatever their method is.
+    """
+    if isinstance(error, (requests.exceptions.ConnectTimeout,
+                          exceptions.CircuitBreakerOpen)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return (isinstance(reason, urllib3_exceptions.NewConnectionError) or
+                getattr(reason, 'errno', None) == errno.ECONNREFUSED)
+    return False
+
+
+class Endpoint(object):
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = None
+
+    def is_healthy(self, now):
+        return self.unhealthy_until is None or self.unhealthy_until <= now
+
+    def to_dict(self):
+        return {
+            'healthy': self.is_healthy(time.time()),
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+        }
+
+    def __repr__(self):
+        return '<Endpoint %s>' % self.url
+
+
+class EndpointPool(object):
+    """Chooses endpoint for every request and tracks health of endpoints.
+
+    :param urls: list of endpoint URLs
+    :param strategy: 'round-robin' or 'least-outstanding', the latter picks
+        the endpoint with the fewest requests in progress
+    :param failure_threshold: consecutive failures making endpoint unhealthy
+    :param recovery_time: seconds an unhealthy endpoint is not used for
+    """
+
+    def __init__(self, urls, strategy=STRATEGY_ROUND_ROBIN,
+                 failure_threshold=1, recovery_time=30):
+        if strategy not in STRATEGIES:
+            raise ValueError("Invalid endpoint strategy '%s', expected one "
+                             "of: %s." % (strategy, ', '.join(STRATEGIES)))
+        if not urls:
+            raise ValueError("At least one endpoint is required.")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self, exclude=()):
+        """Picks endpoint for a request, counting it as outstanding.
+
+        Every chosen endpoint must be passed to 'release()' afterwards.
+
+        :param exclude: endpoints that already failed for the request
+        :returns: an Endpoint or None if all endpoints are excluded
+        """
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+
+            now = time.time()
+            healthy = [e for e in candidates if e.is_healthy(now)]
+            if healthy:
+                # Rotate, so that ties are spread across endpoints as well
+                offset = self._next % len(healthy)
+                healthy = healthy[offset:] + healthy[:offset]
+                self._next += 1
+                if self.strategy == STRATEGY_LEAST_OUTSTANDING:
+                    endpoint = min(healthy, key=lambda e: e.outstanding)
+                else:
+                    endpoint = healthy[0]
+            else:
+                # Everything is failing, probe the endpoint that has been
+                # unhealthy for the longest time.
+                endpoint = min(candidates, key=lambda e: e.unhealthy_until)
+
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, success=True):
+        """Records result of a request sent to the endpoint."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if success:
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = None
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.unhealthy_until = time.time() + self.recovery_time
+
+    def get_states(self):
+        """Returns dict with the state of every endpoint by its URL."""
+        with self._lock:
+            return dict((e.url, e.to_dict()) for e in self.endpoints)
@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Hedged GET requests, cutting the latency tail caused by slow workers.
+
+When a GET request takes longer than most recent requests of the same
+operation, a duplicate is sent, to another endpoint if the client has
+several, and the response arriving first is used::
+
+    >>> manila = client.Client(VERSION, session=sess,
+                               hedging_policy=hedging.HedgingPolicy())
+"""
+
+import collections
+import threading
+
+from manilaclient.common import timings
+
+
+class HedgingPolicy(object):
+    """Decides when a duplicate of a slow GET request is sent.
+
+    :param percentile: percentile of recent latencies of the operation
+        after which the duplicate is sent
+    :param max_extra_load: max number of duplicates relative to the number
+        of hedgeable requests, e.g. 0.05 adds at most 5% of requests
+    :param min_samples: latencies of the operation recorded before its
+        requests are hedged
+    :param window: number of recent latencies kept per operation
+    :param min_delay: shortest delay before a duplicate is sent, in seconds
+    """
+
+    def __init__(self, percentile=95, max_extra_load=0.05, min_samples=20,
+                 window=200, min_delay=0.005):
+        self.percentile = percentile
+        self.max_extra_load = max_extra_load
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.requests = 0
+        self.hedged = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def get_delay(self, key):
+        """Counts a new request, returns delay before hedging it.
+
+        :param key: operation of the request, e.g. 'shares.get'
+        :returns: seconds or None if there are too few recorded latencies
+        """
+        with self._lock:
+            self.requests += 1
+            latencies = list(self._latencies.get(key, ()))
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay,
+                   timings.percentile(latencies, self.percentile))
+
+    def try_hedge(self):
+        """Returns True if a duplicate may be sent without exceeding the
+        allowed extra load.
+        """
+        with self._lock:
+            if self.hedged + 1 > self.max_extra_load * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def record_latency(self, key, seconds):
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = collections.deque(
+                    maxlen=self.window)
+            latencies.append(seconds)
@@ -0,0 +1,93 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Bounded cache of GET response bodies used for conditional requests."""
+
+import collections
+import threading
+
+
+class CacheEntry(object):
+    """Raw body of a cached response with its validators."""
+
+    def __init__(self, content, etag=None, last_modified=None):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """LRU cache of response bodies keyed by URL and request version.
+
+    Only raw bytes are stored, every hit is decoded again, so callers
+    never share (and can never modify) the cached objects.
+    """
+
+    def __init__(self, max_entries):
+        if max_entries < 1:
+            raise ValueError("Cache size should be a positive number.")
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # Re-insert to mark as most recently used
+                self._entries[key] = entry
+            return entry
+
+    def store(self, key, content, etag=None, last_modified=None):
+        if not (etag or last_modified):
+            # Response can not be revalidated, caching it is useless.
+            self.discard(key)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = CacheEntry(content, etag, last_modified)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, url_prefix):
+        """Drops entries of all URLs under the given resource path."""
+        with self._lock:
+            for key in list(self._entries):
+                url = key[0]
+                if (url == url_prefix or
+                        url.startswith(url_prefix.rstrip('/') + '/') or
+                        url.startswith(url_prefix + '?')):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
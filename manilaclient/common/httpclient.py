@@ -16,21 +16,250 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent import futures
 import copy
 import logging
+import ssl
+import threading
+import time
+import zlib
 
-from oslo_serialization import jsonutils
-from oslo_utils import strutils
 import requests
+from requests import adapters
+from requests.packages.urllib3 import connection as urllib3_connection
+from requests.packages.urllib3 import connectionpool as urllib3_connpool
+from requests.packages.urllib3.util import ssl_ as urllib3_ssl
 import six
+from six.moves.urllib import parse
 
+from manilaclient.common import constants
+from manilaclient.common import deadlines
+from manilaclient.common import endpoints
+from manilaclient.common import httpcache
+from manilaclient.common import jsoncodec
+from manilaclient.common import requestcontext
+from manilaclient.common import retry
+from manilaclient.common import singleflight
+from manilaclient.common import timings
+from manilaclient.common import tracing
 from manilaclient import exceptions
+from manilaclient import utils
+
+# Compiles lots of regular expressions, only used with http_log_debug
+strutils = utils.LazyModule('oslo_utils.strutils')
 
 try:
     from eventlet import sleep
 except ImportError:
     from time import sleep  # noqa
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+# Max number of hedgeable requests, duplicates included, in progress at once
+DEFAULT_HEDGE_WORKERS = 10
+# Seconds opening a connection ahead of requests may take when no connect
+# timeout is set
+DEFAULT_WARM_UP_TIMEOUT = 10
+# Bytes of the body read between checks of the deadline
+DEADLINE_READ_CHUNK_SIZE = 16 * 1024
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class TimedHTTPConnection(urllib3_connection.HTTPConnection):
+    """Connection reporting how long it took to connect."""
+
+    def _new_conn(self):
+        start = time.time()
+        try:
+            return super(TimedHTTPConnection, self)._new_conn()
+        finally:
+            timings.record_phase('connect', time.time() - start)
+
+
+class TimedHTTPSConnection(urllib3_connection.HTTPSConnection):
+    """Connection reporting how long it took to connect and to set up TLS."""
+
+    def _new_conn(self):
+        start = time.time()
+        try:
+            return super(TimedHTTPSConnection, self)._new_conn()
+        finally:
+            self._connect_time = time.time() - start
+            timings.record_phase('connect', self._connect_time)
+
+    def connect(self):
+        self._connect_time = 0
+        start = time.time()
+        super(TimedHTTPSConnection, self).connect()
+        # Everything but opening the socket is the TLS handshake
+        timings.record_phase('tls',
+                             time.time() - start - self._connect_time)
+
+
+class _ReuseReportingMixin(object):
+    """Connection pool reporting whether requests get an open connection."""
+
+    def _get_conn(self, timeout=None):
+        conn = super(_ReuseReportingMixin, self)._get_conn(timeout=timeout)
+        timings.record_connection(getattr(conn, 'sock', None) is not None)
+        return conn
+
+
+class TimedHTTPConnectionPool(_ReuseReportingMixin,
+                              urllib3_connpool.HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_ReuseReportingMixin,
+                               urllib3_connpool.HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def open_pooled_connection(pool, timeout=None):
+    """Connects a connection of the pool ahead of a request and returns it
+    to the pool, so that the request does not wait for TCP and TLS
+    handshakes.
+
+    :param pool: urllib3 connection pool
+    :param timeout: seconds to wait for the connection to be open
+    """
+    conn = pool._get_conn()
+    try:
+        if getattr(conn, 'sock', None) is None:
+            if timeout is not None:
+                conn.timeout = timeout
+            conn.connect()
+    except Exception:
+        conn.close()
+        # Free the slot of the connection
+        pool._put_conn(None)
+        raise
+    pool._put_conn(conn)
+
+
+def _close_response(future):
+    """Closes the response of a hedged request that was not used."""
+    if future.exception() is None:
+        resp, body = future.result()
+        resp.close()
+
+
+class PoolingHTTPAdapter(adapters.HTTPAdapter):
+    """Transport adapter that shares one SSL context across its pools.
+
+    Building an SSL context and loading the CA bundle is expensive, so the
+    context is created once per client and handed to every connection pool
+    the adapter creates. Its connections report connection phase timings,
+    see :mod:`manilaclient.common.timings`.
+    """
+
+    def __init__(self, ssl_context=None, **kwargs):
+        # HTTPAdapter.__init__ calls init_poolmanager(), so the
+        # context must be stored before calling the parent constructor.
+        self.ssl_context = ssl_context
+        super(PoolingHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs.setdefault('ssl_context', self.ssl_context)
+        super(PoolingHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def warm_up(self, url, verify=True, timeout=None, proxies=None):
+        """Opens a pooled connection to the host of the URL.
+
+        Nothing is done for URLs reached through a proxy.
+        """
+        if adapters.select_proxy(url, proxies):
+            return
+        if hasattr(self, 'get_connection_with_tls_context'):
+            pool = self.get_connection_with_tls_context(
+                requests.Request('GET', url).prepare(), verify)
+        else:
+            pool = self.get_connection(url)
+            self.cert_verify(pool, url, verify, None)
+        open_pooled_connection(pool, timeout)
+
+
+class TransferStats(object):
+    """Counts bytes sent and received by a client.
+
+    Sizes are tracked both for the bodies themselves and for what actually
+    went over the wire, so that the effect of compression can be seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.wire_bytes_sent = 0
+            self.responses = 0
+            self.bytes_received = 0
+            self.wire_bytes_received = 0
+
+    def add_sent(self, size, wire_size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+            self.wire_bytes_sent += wire_size
+
+    def add_received(self, size, wire_size):
+        with self._lock:
+            self.responses += 1
+            self.bytes_received += size
+            self.wire_bytes_received += wire_size
+
+    @staticmethod
+    def _ratio(size, wire_size):
+        if not wire_size:
+            return 1.0
+        return float(size) / wire_size
+
+    @property
+    def request_compression_ratio(self):
+        return self._ratio(self.bytes_sent, self.wire_bytes_sent)
+
+    @property
+    def response_compression_ratio(self):
+        return self._ratio(self.bytes_received, self.wire_bytes_received)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'bytes_sent': self.bytes_sent,
+            'wire_bytes_sent': self.wire_bytes_sent,
+            'request_compression_ratio': self.request_compression_ratio,
+            'responses': self.responses,
+            'bytes_received': self.bytes_received,
+            'wire_bytes_received': self.wire_bytes_received,
+            'response_compression_ratio': self.response_compression_ratio,
+        }
+
+
+class PreparedRequest(object):
+    """State of a request kept between sending it and decoding response."""
+
+    def __init__(self, url, method, headers, options, stream=False):
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.options = options
+        self.stream = stream
+        self.cache_key = None
+        self.cache_entry = None
+        self.size = 0
+        self.wire_size = 0
+        self.start = time.time()
+        self.phases = {}
+        self.decode_time = None
+
 
 class HTTPClient(object):
     """HTTP Client class used by multiple clients.
@@ -45,23 +274,94 @@ class HTTPClient(object):
 
     def __init__(self, endpoint_url, token, user_agent, api_version,
                  insecure=False, cacert=None, timeout=None, retries=None,
-                 http_log_debug=False):
-        self.endpoint_url = endpoint_url
-        self.base_url = self._get_base_url(self.endpoint_url)
+                 http_log_debug=False,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_idle_timeout=None, json_codec=None,
+                 request_compression_threshold=None, http_cache_size=None,
+                 retry_policy=None, circuit_breakers=None,
+                 timing_collector=None, metrics=None, tracer=None,
+                 coalesce_requests=False, rate_limiter=None,
+                 endpoint_strategy=endpoints.STRATEGY_ROUND_ROBIN,
+                 hedging_policy=None, connect_timeout=None,
+                 read_timeout=None, deadline=None, transport=None,
+                 token_provider=None):
+        self.endpoint_strategy = endpoint_strategy
+        self.set_endpoint_url(endpoint_url)
         self.retries = retries
+        self.retry_policy = retry_policy or retry.RetryPolicy(
+            retries=retries, budget=retry.RetryBudget())
+        self.circuit_breakers = circuit_breakers
+        self.timing_collector = timing_collector
+        self.metrics = metrics
+        self.tracer = tracer
+        self.rate_limiter = rate_limiter
+        self.hedging_policy = hedging_policy
+        # Workers sending hedgeable requests, created on first use
+        self._hedge_executor = None
+        self._hedge_slots = threading.BoundedSemaphore(DEFAULT_HEDGE_WORKERS)
+        self._hedge_lock = threading.Lock()
+        # Renews the token instead of sending 'token' forever
+        self.token_provider = token_provider
+        # Bound of every call, retries included
+        self.deadline = deadline
+        # Identical GET requests sent at the same time share one response
+        self.single_flight = (self._create_single_flight()
+                              if coalesce_requests else None)
         self.http_log_debug = http_log_debug
+        self.codec = jsoncodec.get_codec(json_codec)
+        self.request_compression_threshold = request_compression_threshold
+        self.transfer_stats = TransferStats()
+        self.response_cache = (
+            httpcache.ResponseCache(http_cache_size)
+            if http_cache_size else None)
 
         self.request_options = self._set_request_options(
-            insecure, cacert, timeout)
+            insecure, cacert, timeout, connect_timeout, read_timeout)
+
+        self._add_log_handlers(http_log_debug)
+
+        # Requests within the same session reuse TCP connections (and
+        # TLS sessions) from the pool instead of doing a new handshake for
+        # every API call. Any other transport, see
+        # manilaclient.common.transports, only sends requests, everything
+        # else is done here on top of it.
+        self.pool_idle_timeout = pool_idle_timeout
+        self._last_request_time = None
+        self._warm_up_threads = []
+        self._warm_up_lock = threading.Lock()
+        self.http = transport or self._create_session(
+            insecure, cacert, pool_connections, pool_maxsize)
 
         self.default_headers = {
             'X-Auth-Token': token,
             self.API_VERSION_HEADER: api_version.get_string(),
             'User-Agent': user_agent,
             'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING,
         }
 
-        self._add_log_handlers(http_log_debug)
+    def set_endpoint_url(self, endpoint_url):
+        """Sends later requests to another endpoint, or list of endpoints.
+
+        :param endpoint_url: URL of the endpoint, or list of URLs of
+            endpoints of the same API to balance requests across
+        """
+        # With several endpoints URLs are built with the first one and
+        # rewritten to the endpoint chosen for every request.
+        if isinstance(endpoint_url, six.string_types):
+            endpoint_url = [endpoint_url]
+        endpoint_urls = list(endpoint_url)
+        self.endpoint_url = endpoint_urls[0]
+        self.endpoints = (
+            endpoints.EndpointPool(endpoint_urls, self.endpoint_strategy)
+            if len(endpoint_urls) > 1 else None)
+        self.base_url = self._get_base_url(self.endpoint_url)
+
+    def set_api_version(self, api_version):
+        """Sends later requests with another API microversion."""
+        self.default_headers[self.API_VERSION_HEADER] = (
+            api_version.get_string())
 
     def _add_log_handlers(self, http_log_debug):
         self._logger = logging.getLogger(__name__)
@@ -82,7 +382,8 @@ class HTTPClient(object):
         base_url = '/'.join(url.split('/')[:3]) + '/'
         return base_url
 
-    def _set_request_options(self, insecure, cacert, timeout=None):
+    def _set_request_options(self, insecure, cacert, timeout=None,
+                             connect_timeout=None, read_timeout=None):
         options = {'verify': True}
 
         if insecure:
@@ -90,38 +391,642 @@ class HTTPClient(object):
         elif cacert:
             options['verify'] = cacert
 
-        if timeout:
+        if connect_timeout or read_timeout:
+            # 'timeout' is the default of the one not given
+            options['timeout'] = (connect_timeout or timeout,
+                                  read_timeout or timeout)
+        elif timeout:
             options['timeout'] = timeout
 
         return options
 
-    def request(self, url, method, **kwargs):
-        headers = copy.deepcopy(self.default_headers)
+    def _create_ssl_context(self, insecure, cacert):
+        if insecure:
+            return urllib3_ssl.create_urllib3_context(cert_reqs=ssl.CERT_NONE)
+
+        context = urllib3_ssl.create_urllib3_context(
+            cert_reqs=ssl.CERT_REQUIRED)
+        context.load_verify_locations(cacert or requests.certs.where())
+        return context
+
+    def _get_ssl_context(self, insecure, cacert):
+        try:
+            return self._create_ssl_context(insecure, cacert)
+        except (IOError, ssl.SSLError) as e:
+            # Fall back to letting the transport build the context per pool,
+            # it reports a bad CA bundle in a more helpful way.
+            self._logger.debug("Could not create SSL context: %s" % e)
+            return None
+
+    def _create_session(self, insecure, cacert, pool_connections,
+                        pool_maxsize):
+        """Creates the session that owns the client's connection pools.
+
+        :param pool_connections: number of hosts to keep connection pools for
+        :param pool_maxsize: max number of connections kept open per host
+        """
+        ssl_context = self._get_ssl_context(insecure, cacert)
+        adapter = PoolingHTTPAdapter(ssl_context=ssl_context,
+                                     pool_connections=pool_connections,
+                                     pool_maxsize=pool_maxsize)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _check_idle_connections(self):
+        """Drops pooled connections that stayed unused for too long.
+
+        Servers and load balancers close idle keep-alive connections on
+        their side, so reusing a connection after a long pause usually
+        ends in a reset. Dropping them up front avoids that failed attempt.
+        """
+        now = time.time()
+        if (self.pool_idle_timeout is not None and
+                self._last_request_time is not None and
+                now - self._last_request_time > self.pool_idle_timeout):
+            self._logger.debug("Connection pool idle for more than %s "
+                               "seconds, dropping pooled connections" %
+                               self.pool_idle_timeout)
+            self._drop_pooled_connections()
+        self._last_request_time = now
+
+    def _drop_pooled_connections(self):
+        if not isinstance(self.http, requests.Session):
+            self.http.close()
+            return
+        for adapter in set(self.http.adapters.values()):
+            adapter.close()
+
+    def close(self):
+        """Closes all pooled connections of the client."""
+        self.http.close()
+        with self._hedge_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _get_transport_warm_up(self):
+        if not isinstance(self.http, requests.Session):
+            return getattr(self.http, 'warm_up', None)
+
+        def warm_up(url, verify, timeout):
+            adapter = self.http.get_adapter(url)
+            if not hasattr(adapter, 'warm_up'):
+                return
+            # Pools are keyed by the settings the session applies to every
+            # request, e.g. the CA bundle from the environment.
+            settings = self.http.merge_environment_settings(
+                url, {}, None, verify, None)
+            adapter.warm_up(url, verify=settings['verify'], timeout=timeout,
+                            proxies=settings['proxies'])
+        return warm_up
+
+    def warm_up(self, connections=1):
+        """Opens pooled connections to the endpoints in the background.
+
+        TCP and TLS handshakes then overlap with whatever the caller does
+        before its first request, which waits for them to finish and
+        reuses the connections. Transports without a 'warm_up()' method
+        are not warmed up.
+
+        :param connections: connections to open per endpoint
+        """
+        warm_up = self._get_transport_warm_up()
+        if warm_up is None:
+            return
+        urls = ([endpoint.url for endpoint in self.endpoints.endpoints]
+                if self.endpoints is not None else [self.endpoint_url])
+        timeout = self._get_warm_up_timeout()
+
+        def open_connection(url):
+            try:
+                warm_up(url, verify=self.request_options['verify'],
+                        timeout=timeout)
+            except Exception as e:
+                self._logger.debug("Could not warm up connection to %s: "
+                                   "%s" % (url, e))
+
+        for url in urls:
+            for i in range(connections):
+                thread = threading.Thread(target=open_connection,
+                                          args=(url,),
+                                          name='manilaclient-warm-up')
+                thread.daemon = True
+                thread.start()
+                with self._warm_up_lock:
+                    self._warm_up_threads.append(thread)
+
+    def _get_warm_up_timeout(self):
+        timeout = self.request_options.get('timeout')
+        if isinstance(timeout, tuple):
+            timeout = timeout[0]
+        return DEFAULT_WARM_UP_TIMEOUT if timeout is None else timeout
+
+    def _wait_for_warm_up(self):
+        """Waits for connections being opened, at most the connect timeout.
+
+        Requests of other threads do not wait for the same connections
+        again, a connection not opened in time is left to the pool.
+        """
+        with self._warm_up_lock:
+            threads, self._warm_up_threads = self._warm_up_threads, []
+        if not threads:
+            return
+        timeout = self._get_warm_up_timeout()
+        remaining = deadlines.get_remaining()
+        if remaining is not None:
+            timeout = max(min(timeout, remaining), 0)
+        expires_at = time.time() + timeout
+        for thread in threads:
+            thread.join(max(expires_at - time.time(), 0))
+
+    def request(self, url, method, endpoint=None, **kwargs):
+        """Sends request and decodes its JSON response.
+
+        With 'stream=True' a successful response is returned with its body
+        left unread and None as body; the caller is responsible for reading
+        and closing the response.
+
+        :param endpoint: :class:`manilaclient.common.endpoints.Endpoint`
+            to send the request to instead of the one in the URL
+        """
+        request = self._prepare_request(url, method, **kwargs)
+        resp = None
+        try:
+            with timings.collect_phases(request.phases):
+                resp = self._send_request(
+                    method, self._get_endpoint_url(url, endpoint),
+                    request.headers, request.options)
+            return self._process_response(request, resp)
+        finally:
+            self._record_timing(request, resp)
+            self._record_metrics(request, resp)
+
+    def _prepare_request(self, url, method, **kwargs):
+        """Builds headers and options of a request to be sent.
+
+        Everything but the transfer itself is done here and in
+        _process_response(), so that other transports can reuse it.
+        """
+        start = time.time()
+        headers = dict(self.default_headers)
+        if self.token_provider is not None:
+            headers['X-Auth-Token'] = self.token_provider.get_token()
+        if requestcontext.experimental_api.get():
+            headers[constants.EXPERIMENTAL_HTTP_HEADER] = 'true'
         headers.update(kwargs.get('headers', {}))
 
-        options = copy.deepcopy(self.request_options)
+        options = dict(self.request_options)
+        timeout = deadlines.clamp_timeout(options.get('timeout'))
+        if timeout is not None:
+            options['timeout'] = timeout
+        stream = kwargs.get('stream', False)
 
         if 'body' in kwargs:
             headers['Content-Type'] = 'application/json'
-            options['data'] = jsonutils.dumps(kwargs['body'])
+            options['data'] = self.codec.dumps(kwargs['body'])
+        if stream:
+            options['stream'] = True
+
+        request = PreparedRequest(url, method, headers, options, stream)
+        request.start = start
+
+        if self.response_cache is not None and method == 'GET':
+            request.cache_key = self._get_cache_key(url, headers)
+            request.cache_entry = self.response_cache.get(request.cache_key)
+            if request.cache_entry is not None:
+                headers.update(request.cache_entry.conditional_headers())
 
         self.log_request(method, url, headers, options.get('data', None))
-        resp = requests.request(method, url, headers=headers, **options)
+        request.size, request.wire_size = self._compress_request_body(
+            headers, options)
+
+        self._check_idle_connections()
+        return request
+
+    def _process_response(self, request, resp):
+        """Decodes response, raising an exception for error statuses."""
+        method = request.method
+        url = request.url
+        cache_key = request.cache_key
+        self.transfer_stats.add_sent(request.size, request.wire_size)
+
+        if self.response_cache is not None:
+            if method != 'GET':
+                self.response_cache.invalidate(self._get_resource_path(url))
+            elif resp.status_code == 304 and request.cache_entry is not None:
+                self.log_response(resp)
+                self.response_cache.record_hit()
+                return resp, self._decode_body(request,
+                                               request.cache_entry.content)
+            elif request.stream:
+                # Streamed body is not kept, so entry can not be refreshed
+                self.response_cache.discard(cache_key)
+
+        if request.stream and resp.status_code < 400:
+            self.log_response(resp, log_body=False)
+            return resp, None
+
         self.log_response(resp)
+        self.transfer_stats.add_received(*self._get_response_sizes(resp))
 
         body = None
 
-        if resp.text:
+        # Decode raw bytes, accessing 'resp.text' would run charset
+        # detection over the whole body first.
+        if resp.content:
             try:
-                body = jsonutils.loads(resp.text)
+                body = self._decode_body(request, resp.content)
             except ValueError:
                 pass
 
         if resp.status_code >= 400:
-            raise exceptions.from_response(resp, method, url)
+            raise exceptions.from_response(resp, method, url, body=body)
+
+        if cache_key is not None and resp.status_code == 200:
+            self.response_cache.store(
+                cache_key, resp.content,
+                etag=resp.headers.get('ETag'),
+                last_modified=resp.headers.get('Last-Modified'))
 
         return resp, body
 
+    def _decode_body(self, request, content):
+        start = time.time()
+        try:
+            return self.codec.loads(content)
+        finally:
+            request.decode_time = time.time() - start
+
+    def _record_timing(self, request, resp):
+        if self.timing_collector is None:
+            return
+        timing = timings.RequestTiming(
+            request.method, timings.get_url_template(request.url),
+            bytes_sent=request.wire_size,
+            dns=request.phases.get('dns'),
+            connect=request.phases.get('connect'),
+            tls=request.phases.get('tls'),
+            decode=request.decode_time,
+            total=time.time() - request.start)
+        if resp is not None:
+            timing.status = resp.status_code
+            # 'elapsed' ends once response headers are parsed
+            elapsed = getattr(resp, 'elapsed', None)
+            if elapsed is not None:
+                timing.first_byte = elapsed.total_seconds()
+            if not (request.stream and resp.status_code < 400):
+                timing.bytes_received = self._get_response_sizes(resp)[1]
+        self.timing_collector.record(timing)
+
+    def _get_operation(self, url):
+        return (requestcontext.operation.get() or
+                timings.get_url_template(url.split('?', 1)[0]))
+
+    def _record_metrics(self, request, resp):
+        if self.metrics is None:
+            return
+        # Set by transports able to tell, e.g. not by the WSGI one
+        self.metrics.record_request(
+            self._get_operation(request.url), request.method,
+            resp.status_code if resp is not None else None,
+            time.time() - request.start,
+            reused=request.phases.get('reused'))
+
+    def _record_retry(self, url):
+        if self.metrics is not None:
+            self.metrics.record_retry(self._get_operation(url))
+
+    def get_timings(self):
+        """Returns list of :class:`timings.RequestTiming` recorded so far.
+
+        Timings are recorded only if a
+        :class:`manilaclient.common.timings.TimingCollector` is passed as
+        'timing_collector' argument, otherwise an empty list is returned.
+        """
+        if self.timing_collector is None:
+            return []
+        return self.timing_collector.get_timings()
+
+    def reset_timings(self):
+        if self.timing_collector is not None:
+            self.timing_collector.reset()
+
+    def get_timings_summary(self, percentiles=timings.DEFAULT_PERCENTILES):
+        """Returns timings grouped by method and URL template.
+
+        See :meth:`manilaclient.common.timings.TimingCollector.summary`.
+        """
+        if self.timing_collector is None:
+            return []
+        return self.timing_collector.summary(percentiles)
+
+    def _send_request(self, method, url, headers, options):
+        breaker = self._get_circuit_breaker(url)
+        self._wait_for_warm_up()
+        # Timeouts bound every socket read only, so with a deadline the
+        # body is read here, checking the deadline while it comes in.
+        read_body = (deadlines.get_remaining() is not None and
+                     not options.get('stream'))
+        if read_body:
+            options = dict(options, stream=True)
+        start = time.time()
+        try:
+            resp = self.http.request(method, url, headers=headers, **options)
+            if read_body:
+                self._read_body(resp)
+        except Exception:
+            self._record_request_result(breaker, start)
+            raise
+        self._record_request_result(breaker, start, resp)
+        return resp
+
+    @staticmethod
+    def _read_body(resp):
+        """Reads the body of the response before the deadline passes.
+
+        The deadline is checked after every chunk, so it may still be passed
+        by the time one chunk takes to arrive.
+
+        :raises: DeadlineExceeded, closing the response
+        """
+        # Transports are free to read the body anyway
+        if getattr(resp, '_content_consumed', True):
+            return
+        chunks = []
+        try:
+            for chunk in resp.iter_content(DEADLINE_READ_CHUNK_SIZE):
+                chunks.append(chunk)
+                deadlines.check()
+        except Exception:
+            resp.close()
+            raise
+        resp._content = b''.join(chunks)
+        resp._content_consumed = True
+
+    def _get_circuit_breaker(self, url):
+        """Returns breaker of the endpoint if the request may be sent.
+
+        :raises: exceptions.CircuitBreakerOpen if the circuit is open
+        """
+        if self.circuit_breakers is None:
+            return None
+        breaker = self.circuit_breakers.get(self._get_base_url(url))
+        breaker.before_request()
+        return breaker
+
+    def _record_request_result(self, breaker, start, resp=None):
+        if breaker is None:
+            return
+        latency = time.time() - start
+        # Client errors mean the endpoint itself is healthy
+        if resp is None or resp.status_code >= 500:
+            breaker.record_failure(latency)
+        else:
+            breaker.record_success(latency)
+
+    def _get_endpoint_url(self, url, endpoint):
+        """Rewrites URL built with the first endpoint to the given one."""
+        if endpoint is None or endpoint.url == self.endpoint_url:
+            return url
+        for prefix, target in (
+                (self.endpoint_url, endpoint.url),
+                (self.base_url, self._get_base_url(endpoint.url))):
+            if url.startswith(prefix):
+                return target + url[len(prefix):]
+        return url
+
+    def _fail_over(self, span, method, error, endpoint, failed):
+        """Releases endpoint of a failed request.
+
+        Requests failing because of the endpoint are sent to another
+        endpoint right away, without waiting for a retry. Only requests
+        that are safe to repeat or that surely did not reach the endpoint
+        fail over.
+
+        :param failed: endpoints the request already failed on
+        :returns: endpoint to send the request to next or None to give up
+        """
+        failure = endpoints.is_endpoint_failure(error)
+        self.endpoints.release(endpoint, success=not failure)
+        if not failure or not (method in self.retry_policy.methods or
+                               endpoints.is_connect_error(error)):
+            return None
+
+        failed.append(endpoint)
+        next_endpoint = self.endpoints.choose(exclude=failed)
+        if next_endpoint is not None:
+            self._logger.debug("Request to %(failed)s failed: %(error)s, "
+                               "failing over to %(next)s" % {
+                                   'failed': endpoint.url,
+                                   'error': six.text_type(error),
+                                   'next': next_endpoint.url})
+            span.add_event('failover', {'endpoint': endpoint.url,
+                                        'next_endpoint': next_endpoint.url,
+                                        'error': six.text_type(error)})
+        return next_endpoint
+
+    def _request_with_failover(self, span, url, method, **kwargs):
+        if self.endpoints is None:
+            return self.request(url, method, **kwargs)
+
+        failed = []
+        endpoint = self.endpoints.choose()
+        while True:
+            try:
+                result = self.request(url, method, endpoint=endpoint,
+                                      **kwargs)
+            except (requests.exceptions.RequestException,
+                    exceptions.ClientException) as e:
+                endpoint = self._fail_over(span, method, e, endpoint, failed)
+                if endpoint is None:
+                    raise
+                continue
+            self.endpoints.release(endpoint)
+            return result
+
+    def _reauthenticate(self, span, error):
+        """Drops token rejected by the API, returns True if the request
+        may be sent again with a new one.
+        """
+        if (self.token_provider is None or
+                not self.token_provider.invalidate()):
+            return False
+        self._logger.debug("Token was rejected: %s, authenticating "
+                           "again" % six.text_type(error))
+        span.add_event('reauthenticate', {})
+        return True
+
+    def _request_with_reauth(self, span, url, method, **kwargs):
+        try:
+            return self._request_with_hedging(span, url, method, **kwargs)
+        except exceptions.Unauthorized as e:
+            if not self._reauthenticate(span, e):
+                raise
+        return self._request_with_hedging(span, url, method, **kwargs)
+
+    def _get_hedge_delay(self, url, method, kwargs):
+        """Returns delay before a duplicate of the request is sent, if any.
+        """
+        if (self.hedging_policy is None or method != 'GET' or
+                kwargs.get('stream')):
+            return None
+        return self.hedging_policy.get_delay(self._get_operation(url))
+
+    def _start_hedge(self, span, url, delay):
+        """Returns True if a duplicate of the slow request may be sent."""
+        if not self.hedging_policy.try_hedge():
+            return False
+        self._logger.debug("No response in %.3f seconds, sending duplicate "
+                           "request" % delay)
+        span.add_event('hedge', {'delay': delay})
+        if self.metrics is not None:
+            self.metrics.record_hedge(self._get_operation(url))
+        return True
+
+    def _record_hedging_latency(self, url, method, start):
+        if self.hedging_policy is not None and method == 'GET':
+            self.hedging_policy.record_latency(self._get_operation(url),
+                                               time.time() - start)
+
+    def _request_with_hedging(self, span, url, method, **kwargs):
+        delay = self._get_hedge_delay(url, method, kwargs)
+        # Without a free worker the request is sent without hedging
+        if delay is not None and self._hedge_slots.acquire(False):
+            first = self._submit_attempt(span, url, method, kwargs)
+            return self._send_hedged(span, url, method, delay, first, kwargs)
+        return self._send_attempt(span, url, method, kwargs)
+
+    def _send_attempt(self, span, url, method, kwargs):
+        """Sends the request, recording its latency for hedging."""
+        start = time.time()
+        result = self._request_with_failover(span, url, method, **kwargs)
+        self._record_hedging_latency(url, method, start)
+        return result
+
+    def _get_hedge_executor(self):
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = futures.ThreadPoolExecutor(
+                    max_workers=DEFAULT_HEDGE_WORKERS)
+            return self._hedge_executor
+
+    def _submit_attempt(self, span, url, method, kwargs):
+        """Sends the request with a worker, returns its future.
+
+        The caller has to acquire one of the hedge slots before, it is
+        released once the request is done.
+        """
+        def attempt():
+            try:
+                return self._send_attempt(span, url, method, kwargs)
+            finally:
+                self._hedge_slots.release()
+
+        try:
+            return self._get_hedge_executor().submit(
+                requestcontext.wrap(attempt))
+        except Exception:
+            self._hedge_slots.release()
+            raise
+
+    def _send_hedged(self, span, url, method, delay, first, kwargs):
+        """Waits for the request and sends its duplicate if it is slow.
+
+        The response arriving first is returned, the other request is left
+        to finish in the background and its response is closed. An error
+        is raised only if both requests fail.
+        """
+        attempts = [first]
+        done, pending = futures.wait(attempts, timeout=delay)
+        if not done and self._hedge_slots.acquire(False):
+            if self._start_hedge(span, url, delay):
+                attempts.append(self._submit_attempt(span, url, method,
+                                                     kwargs))
+            else:
+                self._hedge_slots.release()
+
+        while True:
+            done, pending = futures.wait(
+                attempts, return_when=futures.FIRST_COMPLETED)
+            succeeded = [attempt for attempt in done
+                         if attempt.exception() is None]
+            if succeeded:
+                for attempt in attempts:
+                    if attempt is not succeeded[0]:
+                        attempt.add_done_callback(_close_response)
+                return succeeded[0].result()
+            if not pending:
+                return done.pop().result()
+            attempts = list(pending)
+
+    def get_endpoint_states(self):
+        """Returns dict with health and load of every endpoint by URL."""
+        if self.endpoints is None:
+            return {}
+        return self.endpoints.get_states()
+
+    def get_circuit_breaker_states(self):
+        """Returns dict with circuit breaker state of every endpoint used."""
+        if self.circuit_breakers is None:
+            return {}
+        return self.circuit_breakers.get_states()
+
+    def _get_cache_key(self, url, headers):
+        # Responses differ between microversions, so the version is a part
+        # of the key along with the experimental API flag.
+        return (url,
+                headers.get(self.API_VERSION_HEADER),
+                headers.get(constants.EXPERIMENTAL_HTTP_HEADER))
+
+    def _get_resource_path(self, url):
+        """Returns URL of the top-level collection the URL belongs to.
+
+        For example 'http://host/v2/tenant/shares/id/action' gives
+        'http://host/v2/tenant/shares'. Cached responses of the whole
+        collection are invalidated on any write to it.
+        """
+        url = url.split('?', 1)[0]
+        endpoint = self.endpoint_url.rstrip('/')
+        if not url.startswith(endpoint + '/'):
+            return url
+        collection = url[len(endpoint) + 1:].split('/', 1)[0]
+        return '%s/%s' % (endpoint, collection)
+
+    def _compress_request_body(self, headers, options):
+        """Gzips request body if it is larger than the configured threshold.
+
+        :returns: tuple of (body size, body size as sent)
+        """
+        data = options.get('data')
+        if not data:
+            return 0, 0
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+
+        size = len(data)
+        if (self.request_compression_threshold is None or
+                size < self.request_compression_threshold):
+            return size, size
+
+        # wbits=31 produces gzip framing, zlib is used because
+        # gzip.compress() is not available on Python 2.
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        options['data'] = compressor.compress(data) + compressor.flush()
+        headers['Content-Encoding'] = 'gzip'
+        return size, len(options['data'])
+
+    def _get_response_sizes(self, resp):
+        """Returns tuple of (decoded body size, body size on the wire)."""
+        size = len(resp.content or b'')
+        try:
+            # Number of (possibly compressed) bytes read from the socket
+            wire_size = int(resp.raw.tell())
+        except (AttributeError, TypeError, ValueError):
+            wire_size = size
+        return size, wire_size
+
     def _cs_request(self, url, method, **kwargs):
         return self._cs_request_with_retries(
             self.endpoint_url + url,
@@ -134,31 +1039,155 @@ class HTTPClient(object):
             method,
             **kwargs)
 
+    def _start_request_span(self, url, method):
+        return tracing.start_span(
+            self.tracer,
+            '%s %s' % (method, timings.get_url_template(url.split('?')[0])),
+            {'http.method': method, 'http.url': url})
+
+    @staticmethod
+    def _set_span_response(span, attempts, resp):
+        span.set_attribute('retry.attempts', attempts)
+        if resp is not None:
+            span.set_attribute('http.status_code', resp.status_code)
+            span.set_attribute('openstack.request_id',
+                               resp.headers.get('x-openstack-request-id'))
+
+    def _create_single_flight(self):
+        return singleflight.SingleFlight(copy_result=self._copy_result)
+
+    @staticmethod
+    def _copy_result(result):
+        resp, body = result
+        return resp, copy.deepcopy(body)
+
+    def _get_single_flight_key(self, url, method, kwargs):
+        """Returns key of requests that can share the response, if any."""
+        if (self.single_flight is None or method != 'GET' or
+                kwargs.get('stream')):
+            return None
+        headers = kwargs.get('headers') or {}
+        return (url, self.default_headers.get(self.API_VERSION_HEADER),
+                requestcontext.experimental_api.get(),
+                tuple(sorted(headers.items())))
+
+    @property
+    def coalesced_requests(self):
+        """Number of requests that waited for an identical one instead."""
+        if self.single_flight is None:
+            return 0
+        return self.single_flight.coalesced
+
+    def _record_coalesced(self, url):
+        if self.metrics is not None:
+            self.metrics.record_coalesced(self._get_operation(url))
+
+    def _get_rate_limit_delay(self, method, url):
+        limiter = self.rate_limiter
+        if limiter is None:
+            return 0
+        if limiter.start_refresh():
+            rate_limits = None
+            try:
+                rate_limits = limiter.loader()
+            except Exception as e:
+                self._logger.debug("Could not load rate limits: %s" % e)
+            finally:
+                limiter.finish_refresh(rate_limits)
+        return limiter.get_delay(method, self._get_relative_path(url),
+                                 max_delay=deadlines.get_remaining())
+
+    def _get_relative_path(self, url):
+        """Returns path of the URL relative to the endpoint."""
+        path = url.split('?', 1)[0]
+        endpoint = self.endpoint_url.rstrip('/')
+        if path.startswith(endpoint):
+            return path[len(endpoint):] or '/'
+        return parse.urlsplit(path).path
+
+    def _check_rate_limit_delay(self, delay):
+        if not deadlines.allows(delay):
+            self._logger.debug("Rate limit delay of %.2f seconds would pass "
+                               "the deadline" % delay)
+            raise exceptions.DeadlineExceeded()
+
+    def _wait_for_rate_limit(self, span, delay):
+        self._check_rate_limit_delay(delay)
+        self._logger.debug("Rate limit reached, delaying request for "
+                           "%.2f seconds" % delay)
+        span.add_event('rate_limited', {'delay': delay})
+        sleep(delay)
+
     def _cs_request_with_retries(self, url, method, **kwargs):
+        key = self._get_single_flight_key(url, method, kwargs)
+        if key is None:
+            return self._send_with_retries(url, method, **kwargs)
+
+        result, shared = self.single_flight.do(
+            key, lambda: self._send_with_retries(url, method, **kwargs))
+        if shared:
+            self._record_coalesced(url)
+        return result
+
+    def _send_with_retries(self, url, method, **kwargs):
+        with deadlines.deadline(self.deadline):
+            with self._start_request_span(url, method) as span:
+                return self._request_with_retries(span, url, method,
+                                                  **kwargs)
+
+    def _get_retry_delay(self, method, error, attempts):
+        """Returns delay before retrying the failed attempt, or None.
+
+        :raises: DeadlineExceeded if the attempt timed out because of the
+            deadline
+        """
+        remaining = deadlines.get_remaining()
+        if (remaining is not None and remaining <= 0 and
+                isinstance(error, requests.exceptions.RequestException)):
+            six.raise_from(exceptions.DeadlineExceeded(), error)
+        delay = self.retry_policy.get_retry_delay(method, error, attempts)
+        if delay is not None and not deadlines.allows(delay):
+            self._logger.debug("Retry in %.2f seconds would pass the "
+                               "deadline" % delay)
+            return None
+        return delay
+
+    def _request_with_retries(self, span, url, method, **kwargs):
         attempts = 0
-        timeout = 1
+        self.retry_policy.request_started()
         while True:
             attempts += 1
+            deadlines.check()
+            delay = self._get_rate_limit_delay(method, url)
+            if delay:
+                self._wait_for_rate_limit(span, delay)
             try:
-                resp, body = self.request(url, method, **kwargs)
+                resp, body = self._request_with_reauth(span, url, method,
+                                                       **kwargs)
+                self._set_span_response(span, attempts, resp)
                 return resp, body
-            except (exceptions.BadRequest,
-                    requests.exceptions.RequestException,
+            except (requests.exceptions.RequestException,
                     exceptions.ClientException) as e:
-                if attempts > self.retries:
+                self._set_span_response(span, attempts,
+                                        getattr(e, 'response', None))
+                delay = self._get_retry_delay(method, e, attempts)
+                if delay is None:
                     raise
 
                 self._logger.debug("Request error: %s" % six.text_type(e))
+                span.add_event('retry', {'attempt': attempts,
+                                         'delay': delay,
+                                         'error': six.text_type(e)})
 
+            self._record_retry(url)
             self._logger.debug(
                 "Failed attempt(%(current)s of %(total)s), "
-                " retrying in %(sec)s seconds" % {
+                " retrying in %(sec).2f seconds" % {
                     'current': attempts,
-                    'total': self.retries,
-                    'sec': timeout
+                    'total': self.retry_policy.retries,
+                    'sec': delay
                 })
-            sleep(timeout)
-            timeout *= 2
+            sleep(delay)
 
     def get_with_base_url(self, url, **kwargs):
         return self._cs_request_base_url(url, 'GET', **kwargs)
@@ -186,17 +1215,30 @@ class HTTPClient(object):
             string_parts.append(header)
 
         if data:
+            if isinstance(data, six.binary_type):
+                data = data.decode('utf-8')
             if "password" in data:
                 data = strutils.mask_password(data)
             string_parts.append(" -d '%s'" % data)
         self._logger.debug("\nREQ: %s\n" % "".join(string_parts))
 
-    def log_response(self, resp):
+    def log_response(self, resp, log_body=True):
         if not self.http_log_debug:
             return
         self._logger.debug(
             "RESP: [%(code)s] %(headers)s\nRESP BODY: %(body)s\n" % {
                 'code': resp.status_code,
                 'headers': resp.headers,
-                'body': resp.text
-            })
\ No newline at end of file
+                'body': resp.text if log_body else '<streamed>'
+            })
+        if log_body and resp.headers.get('Content-Encoding'):
+            size, wire_size = self._get_response_sizes(resp)
+            if wire_size:
+                self._logger.debug(
+                    "RESP COMPRESSION: %(enc)s, %(wire)s bytes received, "
+                    "%(size)s bytes decoded (ratio %(ratio).1f)" % {
+                        'enc': resp.headers['Content-Encoding'],
+                        'wire': wire_size,
+                        'size': size,
+                        'ratio': float(size) / wire_size,
+                    })
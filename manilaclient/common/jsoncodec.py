@@ -0,0 +1,159 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""JSON codecs used to encode request bodies and decode response bodies.
+
+A codec is selected per client with the 'json_codec' argument or globally
+with the 'MANILACLIENT_JSON_CODEC' environment variable. The default,
+'auto', picks the fastest backend that is installed and falls back to the
+standard library.
+"""
+
+import os
+
+from oslo_utils import importutils
+
+from manilaclient import utils
+
+# Only needed by the standard library codec and for objects other codecs
+# cannot serialize
+jsonutils = utils.LazyModule('oslo_serialization.jsonutils')
+
+CODEC_ENV_VAR = 'MANILACLIENT_JSON_CODEC'
+AUTO = 'auto'
+
+
+def _to_primitive(obj):
+    return jsonutils.to_primitive(obj)
+
+
+class JSONCodec(object):
+    """Base class for JSON codecs.
+
+    'dumps' returns either text or bytes, both are accepted as request body.
+    'loads' accepts the raw bytes of a response body, so that no charset
+    detection or intermediate text copy is needed for large responses.
+    """
+    name = None
+
+    def dumps(self, obj):
+        raise NotImplementedError()
+
+    def loads(self, data):
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return "<JSONCodec: %s>" % self.name
+
+
+class StdlibJSONCodec(JSONCodec):
+    """Standard library codec, always available."""
+    name = 'json'
+
+    def dumps(self, obj):
+        return jsonutils.dumps(obj)
+
+    def loads(self, data):
+        return jsonutils.loads(data)
+
+
+class SimpleJSONCodec(JSONCodec):
+    name = 'simplejson'
+
+    def __init__(self):
+        self._json = importutils.import_module('simplejson')
+
+    def dumps(self, obj):
+        return self._json.dumps(obj, default=_to_primitive)
+
+    def loads(self, data):
+        return self._json.loads(data)
+
+
+class UJSONCodec(JSONCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        self._json = importutils.import_module('ujson')
+        try:
+            self._json.dumps(None, default=_to_primitive)
+        except TypeError:
+            raise ImportError("ujson 5.4 or newer is required for the "
+                              "'default' argument of dumps()")
+
+    def dumps(self, obj):
+        return self._json.dumps(obj, default=_to_primitive)
+
+    def loads(self, data):
+        return self._json.loads(data)
+
+
+class ORJSONCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        self._json = importutils.import_module('orjson')
+        self._options = self._json.OPT_NON_STR_KEYS
+
+    def dumps(self, obj):
+        return self._json.dumps(obj, default=_to_primitive,
+                                option=self._options)
+
+    def loads(self, data):
+        return self._json.loads(data)
+
+
+CODECS = dict((codec.name, codec) for codec in (
+    ORJSONCodec, UJSONCodec, SimpleJSONCodec, StdlibJSONCodec))
+
+# Order in which backends are tried when codec is 'auto'
+AUTO_PREFERENCE = ('orjson', 'ujson', 'json')
+
+_codec_instances = {}
+
+
+def _load_codec(name):
+    if name not in _codec_instances:
+        _codec_instances[name] = CODECS[name]()
+    return _codec_instances[name]
+
+
+def get_codec(name=None):
+    """Returns JSON codec instance.
+
+    :param name: codec name, one of 'auto', 'orjson', 'ujson', 'simplejson'
+        or 'json'. If not set, value of env[MANILACLIENT_JSON_CODEC] is
+        used, 'auto' by default.
+    :raises: ValueError if codec is unknown or its backend is not installed
+    """
+    if isinstance(name, JSONCodec):
+        return name
+
+    name = (name or os.environ.get(CODEC_ENV_VAR) or AUTO).lower()
+
+    if name == AUTO:
+        for candidate in AUTO_PREFERENCE:
+            try:
+                return _load_codec(candidate)
+            except ImportError:
+                continue
+
+    if name not in CODECS:
+        raise ValueError("Unknown JSON codec '%(name)s'. Must be one of: "
+                         "%(codecs)s." % {
+                             'name': name,
+                             'codecs': ', '.join(
+                                 sorted(list(CODECS) + [AUTO]))})
+    try:
+        return _load_codec(name)
+    except ImportError:
+        raise ValueError("JSON codec '%s' is not installed." % name)
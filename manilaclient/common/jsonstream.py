@@ -0,0 +1,234 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Incremental parsing of JSON list responses.
+
+Manila list responses look like '{"shares": [{...}, {...}], ...}'. The
+functions below yield the elements of such an array one by one while the
+response body is still being received, so only the current chunk and the
+element being decoded have to be kept in memory.
+"""
+
+import codecs
+import json
+import re
+
+WHITESPACE = ' \t\n\r'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Characters changing the state of _ArrayStartFinder outside of strings
+_STRUCTURAL = re.compile(r'["{}\[\]:]')
+# Characters changing the state of _ContainerEndFinder outside of strings
+_BRACKETS = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NON_WHITESPACE = re.compile(r'\S')
+
+
+class _ArrayStartFinder(object):
+    """Finds the array stored under a key of the top-level JSON object.
+
+    The document is scanned once as it grows, keeping track of the
+    nesting depth and of strings, so that keys of nested objects and text
+    inside strings are not taken for the key.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.pos = 0
+        self.depth = 0
+        self.string_start = None
+        self.last_string = None
+        self.value_key = None
+
+    def find(self, buf):
+        """Returns position right after '"key": [' or None if not found yet.
+
+        :param buf: document received so far, always the same one, only
+            extended between calls
+        """
+        pos = self.pos
+        while True:
+            if self.string_start is not None:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    break
+                if match.group() == '\\':
+                    if match.end() == len(buf):
+                        # The escaped character is not received yet
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                if self.depth == 1:
+                    self.last_string = json.loads(
+                        buf[self.string_start:pos])
+                self.string_start = None
+                continue
+
+            if self.value_key is not None:
+                # First character of the value of a top-level key
+                match = _NON_WHITESPACE.search(buf, pos)
+                if match is None:
+                    break
+                if self.value_key == self.key:
+                    if match.group() != '[':
+                        raise ValueError("Value of '%s' is not a JSON array."
+                                         % self.key)
+                    return match.end()
+                self.value_key = None
+                pos = match.start()
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self.string_start = match.start()
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+            elif self.depth == 1:
+                self.value_key = self.last_string
+        self.pos = pos
+        return None
+
+
+class _ContainerEndFinder(object):
+    """Finds the end of a JSON object or array being received.
+
+    Like _ArrayStartFinder, the value is scanned once as it grows, so that
+    it is decoded only once it is complete.
+    """
+
+    def __init__(self, start):
+        self.pos = start
+        self.depth = 0
+        self.in_string = False
+
+    def find(self, buf):
+        """Returns position right after the value or None if not received.
+
+        :param buf: buffer holding the value from the start position on
+        """
+        pos = self.pos
+        while True:
+            if self.in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if match.group() == '\\':
+                    if match.end() == len(buf):
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self.in_string = False
+                continue
+
+            match = _BRACKETS.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+        self.pos = pos
+        return None
+
+
+def iter_array_items(chunks, key):
+    """Yields elements of the JSON array stored under top-level 'key'.
+
+    :param chunks: iterable of bytes (or text) chunks of a JSON document,
+        for example 'response.iter_content(chunk_size)'
+    :param key: name of the key holding the array, e.g. 'shares'
+    :raises: ValueError if the document is malformed or the key is missing
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf = ''
+    pos = None
+    exhausted = False
+
+    def read_more():
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return None
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk)
+        return chunk
+
+    end_finder = None
+    finder = _ArrayStartFinder(key)
+    while pos is None:
+        chunk = read_more()
+        if chunk is None:
+            raise ValueError("Key '%s' not found in response." % key)
+        buf += chunk
+        pos = finder.find(buf)
+
+    while True:
+        # Skip separators until next element or end of the array.
+        while pos < len(buf) and buf[pos] in WHITESPACE + ',':
+            pos += 1
+
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+        if pos < len(buf) and buf[pos] in '{[':
+            # Objects and arrays are decoded once their end is received
+            if end_finder is None:
+                end_finder = _ContainerEndFinder(pos)
+            if end_finder.find(buf) is not None:
+                item, pos = decoder.raw_decode(buf, pos)
+                end_finder = None
+                yield item
+                continue
+        elif pos < len(buf):
+            # Other values can only be taken once something follows them,
+            # otherwise a number like '12' could be a truncated '123'.
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                end = None
+            if end is not None and (end < len(buf) or exhausted):
+                yield item
+                # The buffer is trimmed once per chunk, not per element
+                pos = end
+                continue
+
+        if exhausted:
+            raise ValueError("Unexpected end of JSON array '%s'." % key)
+
+        chunk = read_more()
+        if chunk is None:
+            exhausted = True
+        else:
+            buf = buf[pos:] + chunk
+            if end_finder is not None:
+                end_finder.pos -= pos
+            pos = 0
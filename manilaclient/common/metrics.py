@@ -0,0 +1,326 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Metrics of API requests for processes embedding the client.
+
+Metrics are recorded when a :class:`MetricsRegistry` is passed as 'metrics'
+argument of the client. They can be scraped by Prometheus from a local
+HTTP server::
+
+    >>> registry = metrics.MetricsRegistry()
+    >>> manila = client.Client(VERSION, session=sess, metrics=registry)
+    >>> metrics.start_http_server(registry, port=9464)
+
+or pushed to statsd as they are recorded::
+
+    >>> registry.add_sink(metrics.StatsdSink('localhost', 8125))
+
+Requests are labelled by the manager and operation sending them, e.g.
+'shares.list' or 'shares._action:os-extend'.
+"""
+
+import collections
+import re
+import socket
+import threading
+
+from six.moves import BaseHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+DEFAULT_STATSD_PORT = 8125
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_STATSD_UNSAFE_RE = re.compile(r'[^A-Za-z0-9_\-]')
+
+
+def _escape_label_value(value):
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _format_float(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = collections.OrderedDict()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{%s}' % ','.join('%s="%s"' % (name, _escape_label_value(v))
+                                 for name, v in pairs)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation),
+                 '# TYPE %s %s' % (self.name, self.type)]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return ['%s%s %s' % (self.name, self._format_labels(key),
+                             _format_float(value))]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, value=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def get(self, **labels):
+        """Returns dict with bucket counts, sum and count of observations."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return None
+            return {'buckets': dict(zip(self.buckets, state['buckets'])),
+                    'sum': state['sum'], 'count': state['count']}
+
+    def _render_value(self, key, state):
+        lines = []
+        for bound, count in zip(self.buckets, state['buckets']):
+            lines.append('%s_bucket%s %s' % (
+                self.name,
+                self._format_labels(key, [('le', _format_float(bound))]),
+                count))
+        labels = self._format_labels(key)
+        lines.append('%s_sum%s %s' % (self.name, labels,
+                                      _format_float(state['sum'])))
+        lines.append('%s_count%s %s' % (self.name, labels, state['count']))
+        return lines
+
+
+class MetricsRegistry(object):
+    """Metrics of one or more clients.
+
+    :param buckets: upper bounds of latency histogram buckets, in seconds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._sinks = []
+        self.requests = Counter(
+            'manilaclient_requests_total',
+            'Number of API requests sent.',
+            ('operation', 'method', 'status'))
+        self.request_duration = Histogram(
+            'manilaclient_request_duration_seconds',
+            'Duration of API requests.', ('operation',), buckets)
+        self.retries = Counter(
+            'manilaclient_retries_total',
+            'Number of retried API requests.', ('operation',))
+        self.coalesced_requests = Counter(
+            'manilaclient_coalesced_requests_total',
+            'Number of GET requests that shared the response of an '
+            'identical request in progress.', ('operation',))
+        self.hedged_requests = Counter(
+            'manilaclient_hedged_requests_total',
+            'Number of duplicates sent for slow GET requests.',
+            ('operation',))
+        self.connections = Counter(
+            'manilaclient_connections_total',
+            'Number of API requests by whether a pooled connection was '
+            'reused.', ('reused',))
+        self.connection_reuse_ratio = Gauge(
+            'manilaclient_connection_reuse_ratio',
+            'Share of API requests sent over a reused connection.')
+        self.completion_cache_write = Histogram(
+            'manilaclient_completion_cache_write_seconds',
+            'Time spent writing completion cache files per listing.',
+            ('cache_type',), buckets)
+
+    @property
+    def metrics(self):
+        return [self.requests, self.request_duration, self.retries,
+                self.coalesced_requests, self.hedged_requests,
+                self.connections,
+                self.connection_reuse_ratio, self.completion_cache_write]
+
+    def add_sink(self, sink):
+        """Adds sink every recorded value is sent to, e.g. StatsdSink."""
+        self._sinks.append(sink)
+
+    def record_request(self, operation, method, status, duration, reused):
+        """Records a request sent by the client.
+
+        :param status: HTTP status or None if no response was received
+        :param reused: whether the request was sent over a pooled
+            connection, None if the transport does not tell
+        """
+        status = 'error' if status is None else str(status)
+        self.requests.inc(operation=operation, method=method, status=status)
+        self.request_duration.observe(duration, operation=operation)
+        if reused is not None:
+            self.connections.inc(reused=str(bool(reused)).lower())
+            reused_count = self.connections.get(reused='true')
+            total = reused_count + self.connections.get(reused='false')
+            self.connection_reuse_ratio.set(float(reused_count) / total)
+
+        for sink in self._sinks:
+            sink.increment('requests', [operation, method, status])
+            sink.timing('request_duration', duration, [operation])
+            if reused is not None:
+                sink.increment('connections',
+                               ['reused' if reused else 'new'])
+
+    def record_retry(self, operation):
+        self.retries.inc(operation=operation)
+        for sink in self._sinks:
+            sink.increment('retries', [operation])
+
+    def record_coalesced(self, operation):
+        self.coalesced_requests.inc(operation=operation)
+        for sink in self._sinks:
+            sink.increment('coalesced_requests', [operation])
+
+    def record_hedge(self, operation):
+        self.hedged_requests.inc(operation=operation)
+        for sink in self._sinks:
+            sink.increment('hedged_requests', [operation])
+
+    def record_completion_cache_write(self, cache_type, duration):
+        self.completion_cache_write.observe(duration, cache_type=cache_type)
+        for sink in self._sinks:
+            sink.timing('completion_cache_write', duration, [cache_type])
+
+    def render_prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdSink(object):
+    """Sends recorded values to a statsd daemon over UDP.
+
+    Plain statsd has no labels, so label values are appended to the metric
+    name, e.g. 'manilaclient.requests.shares.list.GET.200'. Sending errors
+    are ignored, metrics must never break API calls.
+    """
+
+    def __init__(self, host='localhost', port=DEFAULT_STATSD_PORT,
+                 prefix='manilaclient'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _name(self, name, labels):
+        parts = [self.prefix, name]
+        parts.extend(_STATSD_UNSAFE_RE.sub('_', str(label))
+                     for label in labels)
+        return '.'.join(part for part in parts if part)
+
+    def _send(self, data):
+        try:
+            self._socket.sendto(data.encode('utf-8'), self.address)
+        except (socket.error, socket.gaierror):
+            pass
+
+    def increment(self, name, labels=(), value=1):
+        self._send('%s:%s|c' % (self._name(name, labels), value))
+
+    def timing(self, name, seconds, labels=()):
+        self._send('%s:%.3f|ms' % (self._name(name, labels), seconds * 1000))
+
+    def close(self):
+        self._socket.close()
+
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        data = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(registry, port=0, addr='127.0.0.1'):
+    """Serves metrics in the Prometheus format from a daemon thread.
+
+    :param port: port to listen on, 0 picks a free one
+    :returns: the server, its 'server_port' attribute is the port listened
+        on and 'shutdown()' stops it
+    """
+    server = BaseHTTPServer.HTTPServer((addr, port), _MetricsHandler)
+    server.registry = registry
+    thread = threading.Thread(target=server.serve_forever,
+                              name='manilaclient-metrics')
+    thread.daemon = True
+    thread.start()
+    return server
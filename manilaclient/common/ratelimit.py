@@ -0,0 +1,171 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Client side rate limiting based on the rate limits of the server.
+
+Rate limits reported by the '/limits' API are turned into token buckets,
+and requests matching a limit are delayed until the bucket has a token,
+instead of being rejected by the server with 413 or 429 responses::
+
+    >>> manila = client.Client(VERSION, session=sess,
+                               rate_limiter=ratelimit.RateLimiter())
+"""
+
+import re
+import threading
+import time
+
+DEFAULT_REFRESH_INTERVAL = 300
+UNIT_SECONDS = {
+    'SECOND': 1,
+    'MINUTE': 60,
+    'HOUR': 60 * 60,
+    'DAY': 60 * 60 * 24,
+}
+
+
+class TokenBucket(object):
+    """Token bucket refilled at a constant rate.
+
+    :param rate: tokens added per second
+    :param capacity: max number of tokens, i.e. the allowed burst
+    :param tokens: tokens available right away, full bucket by default
+    """
+
+    def __init__(self, rate, capacity, tokens=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity if tokens is None else float(tokens)
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token, returns seconds to wait until it is available.
+
+        Tokens of delayed callers are taken up front, so that callers
+        waiting at the same time are spread out instead of all waking up
+        once a single token is available.
+        """
+        with self._lock:
+            now = time.time()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def release(self):
+        """Gives back a token taken by a caller which is not waiting."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class _Rule(object):
+
+    def __init__(self, verb, regex, bucket):
+        self.verb = verb.upper()
+        self.regex = re.compile(regex)
+        self.bucket = bucket
+
+    def matches(self, method, path):
+        return self.verb in ('*', method) and self.regex.search(path)
+
+
+class RateLimiter(object):
+    """Delays requests exceeding rate limits of the server.
+
+    Limits are loaded when the first request is sent and reloaded every
+    'refresh_interval' seconds. Until they are loaded, or if loading them
+    fails, requests are not delayed.
+
+    :param refresh_interval: seconds after which limits are reloaded
+    :param loader: function returning a list of
+        :class:`manilaclient.v2.limits.RateLimit`, set by the client when
+        not given
+    """
+
+    def __init__(self, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 loader=None):
+        self.refresh_interval = refresh_interval
+        self.loader = loader
+        self._rules = []
+        self._loaded_at = None
+        self._loading = False
+        self._lock = threading.Lock()
+
+    def start_refresh(self):
+        """Returns True if the caller should reload the limits now.
+
+        Only one caller reloads them at a time, others keep using the
+        current limits meanwhile. Every call returning True must be
+        followed by a call of 'finish_refresh()'.
+        """
+        with self._lock:
+            if self.loader is None or self._loading:
+                return False
+            if (self._loaded_at is not None and
+                    time.time() - self._loaded_at < self.refresh_interval):
+                return False
+            self._loading = True
+            return True
+
+    def finish_refresh(self, rate_limits=None):
+        """Replaces current limits with the ones loaded.
+
+        :param rate_limits: loaded limits, None if loading them failed
+        """
+        rules = None
+        if rate_limits is not None:
+            rules = [self._build_rule(limit) for limit in rate_limits]
+            rules = [rule for rule in rules if rule is not None]
+        with self._lock:
+            self._loading = False
+            self._loaded_at = time.time()
+            if rules is not None:
+                self._rules = rules
+
+    @staticmethod
+    def _build_rule(limit):
+        unit_seconds = UNIT_SECONDS.get(str(limit.unit).upper())
+        if not unit_seconds or not limit.value:
+            return None
+        bucket = TokenBucket(float(limit.value) / unit_seconds, limit.value,
+                             tokens=limit.remain)
+        try:
+            return _Rule(limit.verb, limit.regex, bucket)
+        except re.error:
+            return None
+
+    def get_delay(self, method, path, max_delay=None):
+        """Returns seconds the request has to wait for.
+
+        :param path: path of the request relative to the endpoint, e.g.
+            '/shares/detail', limit regexes are matched against it
+        :param max_delay: seconds the caller may wait for, e.g. until its
+            deadline; for longer delays no token is taken, as the request
+            is not going to be sent
+        """
+        with self._lock:
+            rules = self._rules
+        delay = 0
+        buckets = []
+        for rule in rules:
+            if rule.matches(method, path):
+                delay = max(delay, rule.bucket.reserve())
+                buckets.append(rule.bucket)
+        if max_delay is not None and delay >= max_delay:
+            for bucket in buckets:
+                bucket.release()
+        return delay
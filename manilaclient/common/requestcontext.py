@@ -0,0 +1,105 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Request options scoped to the current thread or asyncio task.
+
+A single client may be used by many threads (or tasks) at once, so options
+that apply only to some calls can not be stored on the client itself.
+"""
+
+import contextlib
+import functools
+import threading
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+# Every ContextValue, carried over by wrap() when 'contextvars' is missing
+_values = []
+
+
+class ContextValue(object):
+    """Value with a separate setting in every thread and asyncio task.
+
+    Uses 'contextvars' when available, so that concurrent tasks of one
+    event loop do not see each other's value, or a thread local otherwise.
+    """
+
+    def __init__(self, name, default=None):
+        self._default = default
+        _values.append(self)
+        if contextvars is not None:
+            self._var = contextvars.ContextVar(name, default=default)
+        else:
+            self._var = None
+            self._local = threading.local()
+
+    def get(self):
+        if self._var is not None:
+            return self._var.get()
+        return getattr(self._local, 'value', self._default)
+
+    @contextlib.contextmanager
+    def scoped(self, value):
+        """Sets the value for the duration of the 'with' block."""
+        if self._var is not None:
+            token = self._var.set(value)
+            try:
+                yield value
+            finally:
+                self._var.reset(token)
+        else:
+            previous = self.get()
+            self._local.value = value
+            try:
+                yield value
+            finally:
+                self._local.value = previous
+
+
+def wrap(func):
+    """Returns func bound to a copy of the values of the current context.
+
+    Used to run parts of a call in other threads. Without 'contextvars' the
+    current value of every ContextValue is set again around the call.
+    """
+    if contextvars is None:
+        values = [(value, value.get()) for value in _values]
+        return functools.partial(_run_with, values, func)
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def _run_with(values, func, *args, **kwargs):
+    if not values:
+        return func(*args, **kwargs)
+    value, current = values[0]
+    with value.scoped(current):
+        return _run_with(values[1:], func, *args, **kwargs)
+
+
+class ContextFlag(ContextValue):
+    """Boolean flag with a separate value in every thread and asyncio task."""
+
+    def __init__(self, name):
+        super(ContextFlag, self).__init__(name, default=False)
+
+    def enabled(self):
+        """Sets the flag for the duration of the 'with' block."""
+        return self.scoped(True)
+
+
+experimental_api = ContextFlag('manilaclient_experimental_api')
+
+# Manager operation sending the requests, e.g. 'shares.list'
+operation = ContextValue('manilaclient_operation')
@@ -0,0 +1,127 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Retry policy for API requests."""
+
+import random
+import threading
+
+import requests
+
+from manilaclient import exceptions
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = frozenset([413, 429, 500, 502, 503, 504])
+
+
+class RetryBudget(object):
+    """Limits retries to a fraction of the requests made by a client.
+
+    Every request deposits 'ratio' tokens and every retry withdraws one.
+    The balance never exceeds 'max_tokens', which is also the initial
+    balance, so a client that has been healthy can afford a short burst of
+    retries, while a failing API gets at most 'ratio' extra load.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Returns True if a retry is allowed and takes a token for it."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """Decides whether and when a failed request is retried.
+
+    :param retries: max number of retries of a single request
+    :param backoff_base: delay before the first retry, in seconds
+    :param backoff_max: upper bound of a single delay, in seconds
+    :param jitter: whether to randomize delays ('full jitter'), so that
+        many clients failing at once do not retry in lockstep
+    :param methods: HTTP methods that are safe to retry
+    :param statuses: HTTP statuses that are retried
+    :param retry_connection_errors: whether to retry on connection errors
+        and timeouts
+    :param max_retry_after: longest 'Retry-After' delay that is honored,
+        a request asking for a longer delay is not retried
+    :param budget: optional :class:`RetryBudget` shared by all requests of
+        a client
+    """
+
+    def __init__(self, retries=0, backoff_base=1, backoff_max=30,
+                 jitter=True, methods=IDEMPOTENT_METHODS,
+                 statuses=RETRY_STATUSES, retry_connection_errors=True,
+                 max_retry_after=60, budget=None):
+        self.retries = retries or 0
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.methods = frozenset(m.upper() for m in methods)
+        self.statuses = frozenset(statuses)
+        self.retry_connection_errors = retry_connection_errors
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+
+    def is_retryable(self, method, error):
+        if method.upper() not in self.methods:
+            return False
+        if isinstance(error, exceptions.HttpError):
+            return error.http_status in self.statuses
+        if isinstance(error, (requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout,
+                              exceptions.ConnectionError)):
+            return self.retry_connection_errors
+        return False
+
+    def get_backoff(self, attempt):
+        """Returns delay before retry number 'attempt' (counted from 1)."""
+        delay = min(self.backoff_max,
+                    self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def request_started(self):
+        """Called once for every request, but not for its retries."""
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def get_retry_delay(self, method, error, attempt):
+        """Returns delay in seconds before retrying, or None to give up.
+
+        :param method: HTTP method of failed request
+        :param error: exception raised by the failed attempt
+        :param attempt: number of the failed attempt, counted from 1
+        """
+        if attempt > self.retries or not self.is_retryable(method, error):
+            return None
+
+        retry_after = getattr(error, 'retry_after', 0)
+        if retry_after and retry_after > self.max_retry_after:
+            return None
+
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+
+        return retry_after or self.get_backoff(attempt)
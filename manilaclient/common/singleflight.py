@@ -0,0 +1,92 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Coalescing of identical calls made at the same time.
+
+Threads sharing a client often ask for the same resource at once, e.g. the
+default share type. Only the first of them sends the request, the others
+wait for its result instead of sending duplicates.
+"""
+
+import threading
+
+from manilaclient.common import deadlines
+from manilaclient import exceptions
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Runs at most one call per key at a time, sharing its result.
+
+    :param copy_result: function returning a copy of a result, every
+        caller gets its own copy when the result is shared, so that callers
+        modifying it do not affect each other
+    """
+
+    def __init__(self, copy_result=None):
+        self.copy_result = copy_result
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Calls func or waits for the call with the same key in progress.
+
+        Errors of the call are raised to all callers waiting for it.
+        Callers waiting for the call of another caller give up with
+        DeadlineExceeded once their deadline passed.
+
+        :returns: tuple of (result, whether the call of another caller was
+            waited for)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(deadlines.get_remaining()):
+                raise exceptions.DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return self._copy(call.result), True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        # No one can start waiting for the call anymore
+        if call.waiters:
+            return self._copy(call.result), False
+        return call.result, False
+
+    def _copy(self, result):
+        if self.copy_result is None:
+            return result
+        return self.copy_result(result)
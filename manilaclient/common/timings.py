@@ -0,0 +1,202 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Timings of HTTP requests sent by the client.
+
+Pass a :class:`TimingCollector` as 'timing_collector' argument of the client
+to record every request it sends::
+
+    >>> collector = timings.TimingCollector()
+    >>> manila = client.Client(VERSION, session=sess,
+                               timing_collector=collector)
+    >>> manila.shares.list()
+    >>> collector.summary()
+
+Durations are in seconds and are None when the transport can not measure
+them, e.g. connection phases of requests sent over a reused connection.
+"""
+
+import collections
+import contextlib
+import math
+import re
+import threading
+
+from six.moves.urllib import parse
+
+from manilaclient.common import requestcontext
+
+PHASES = ('dns', 'connect', 'tls', 'first_byte', 'decode', 'total')
+DEFAULT_PERCENTILES = (50, 90, 99)
+DEFAULT_MAX_TIMINGS = 10000
+
+# Numbers, UUIDs and 32 digit hex IDs (project IDs)
+_ID_RE = re.compile(
+    r'^(\d+|[0-9a-f]{32}|'
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$',
+    re.IGNORECASE)
+
+_phases = requestcontext.ContextValue('manilaclient_request_phases')
+
+
+def get_url_template(url):
+    """Returns path of the URL with resource IDs replaced by '{id}'.
+
+    Query values are dropped as well, so that all requests of one API call
+    are grouped together, e.g. 'http://host/v2/<project id>/shares/<id>'
+    gives '/v2/{id}/shares/{id}'.
+    """
+    parsed = parse.urlsplit(url)
+    path = '/'.join('{id}' if _ID_RE.match(segment) else segment
+                    for segment in parsed.path.split('/'))
+    if parsed.query:
+        keys = sorted(set(key for key, _value in parse.parse_qsl(
+            parsed.query, keep_blank_values=True)))
+        path += '?' + '&'.join(keys)
+    return path
+
+
+def percentile(values, percent):
+    """Returns the given percentile of values using the nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+@contextlib.contextmanager
+def collect_phases(phases):
+    """Records durations of connection phases in the given dict.
+
+    Connections are opened deep inside the transport, which knows nothing
+    about the request it sends, so the dict is bound to the current thread
+    or asyncio task for the duration of the 'with' block. Transports able to
+    tell whether the request got a pooled connection also set 'reused'.
+    """
+    with _phases.scoped(phases):
+        yield phases
+
+
+def record_phase(name, seconds):
+    """Adds duration of a phase to the request being sent, if any."""
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0) + seconds
+
+
+def record_connection(reused):
+    """Reports whether the request being sent got a pooled connection."""
+    phases = _phases.get()
+    if phases is not None:
+        phases['reused'] = reused
+
+
+class RequestTiming(object):
+    """Timing and size of a single HTTP request.
+
+    :param status: HTTP status of the response or None if none was received
+    :param bytes_sent: size of the request body as sent
+    :param bytes_received: size of the response body on the wire, None for
+        streamed responses
+    """
+
+    def __init__(self, method, url, status=None, bytes_sent=0,
+                 bytes_received=None, dns=None, connect=None, tls=None,
+                 first_byte=None, decode=None, total=None):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.dns = dns
+        self.connect = connect
+        self.tls = tls
+        self.first_byte = first_byte
+        self.decode = decode
+        self.total = total
+
+    @property
+    def failed(self):
+        return self.status is None or self.status >= 400
+
+    def to_dict(self):
+        result = {
+            'method': self.method,
+            'url': self.url,
+            'status': self.status,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+        }
+        for phase in PHASES:
+            result[phase] = getattr(self, phase)
+        return result
+
+    def __repr__(self):
+        return '<RequestTiming %s %s: %s>' % (self.method, self.url,
+                                              self.status)
+
+
+class TimingCollector(object):
+    """Keeps timings of the most recent requests of one or more clients.
+
+    :param max_timings: max number of timings kept, older ones are dropped
+    """
+
+    def __init__(self, max_timings=DEFAULT_MAX_TIMINGS):
+        self._lock = threading.Lock()
+        self._timings = collections.deque(maxlen=max_timings)
+
+    def record(self, timing):
+        with self._lock:
+            self._timings.append(timing)
+
+    def get_timings(self):
+        """Returns list of :class:`RequestTiming` in the order sent."""
+        with self._lock:
+            return list(self._timings)
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """Returns statistics of requests grouped by method and URL template.
+
+        Every item is a dict with the number of requests, failed ones, bytes
+        transferred, the given percentiles of total duration (as 'p50' etc.)
+        and its maximum, and the mean duration of every other phase.
+        """
+        groups = collections.OrderedDict()
+        for timing in self.get_timings():
+            groups.setdefault((timing.method, timing.url), []).append(timing)
+
+        result = []
+        for (method, url), group in groups.items():
+            totals = [t.total for t in group if t.total is not None]
+            item = {
+                'method': method,
+                'url': url,
+                'count': len(group),
+                'errors': sum(1 for t in group if t.failed),
+                'bytes_sent': sum(t.bytes_sent or 0 for t in group),
+                'bytes_received': sum(t.bytes_received or 0 for t in group),
+                'max': max(totals) if totals else None,
+            }
+            for percent in percentiles:
+                item['p%s' % percent] = percentile(totals, percent)
+            for phase in PHASES[:-1]:
+                values = [getattr(t, phase) for t in group
+                          if getattr(t, phase) is not None]
+                item[phase] = sum(values) / len(values) if values else None
+            result.append(item)
+        return result
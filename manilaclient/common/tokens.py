@@ -0,0 +1,139 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Auth tokens of clients authenticating themselves.
+
+A token passed as 'input_auth_token' is sent as is. When the client
+authenticates itself, with a keystone session or with credentials, the
+token of every request is taken from a provider, which renews it shortly
+before it expires. A request rejected with 401 is sent once more with a
+new token, so that a single client can outlive its tokens.
+"""
+
+import threading
+import time
+
+DEFAULT_STALE_DURATION = 300
+
+
+class TokenProvider(object):
+    """Base class of token providers."""
+
+    def get_token(self):
+        """Returns a token that is not about to expire."""
+        raise NotImplementedError()
+
+    def invalidate(self):
+        """Drops the current token, 'get_token()' returns a new one.
+
+        :returns: True if a new token can be obtained
+        """
+        raise NotImplementedError()
+
+
+class SessionTokenProvider(TokenProvider):
+    """Gets tokens from the auth plugin of a keystone session.
+
+    The plugin itself authenticates again when its token is about to
+    expire.
+
+    :param session: :class:`keystoneclient.session.Session`
+    :param auth: auth plugin, the one of the session if None
+    """
+
+    def __init__(self, session, auth=None):
+        self.session = session
+        self.auth = auth
+
+    def get_token(self):
+        return self.session.get_token(self.auth)
+
+    def invalidate(self):
+        return bool(self.session.invalidate(self.auth))
+
+
+class KeystoneClientTokenProvider(TokenProvider):
+    """Gets tokens of a keystone client authenticated with credentials.
+
+    :param keystone_client: authenticated
+        :class:`keystoneclient.httpclient.HTTPClient`
+    :param stale_duration: seconds before its expiry a token is renewed
+    """
+
+    def __init__(self, keystone_client,
+                 stale_duration=DEFAULT_STALE_DURATION):
+        self.keystone_client = keystone_client
+        self.stale_duration = stale_duration
+        self._invalid = False
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        with self._lock:
+            auth_ref = self.keystone_client.auth_ref
+            if (self._invalid or auth_ref is None or
+                    auth_ref.will_expire_soon(self.stale_duration)):
+                self._authenticate()
+                self._invalid = False
+            return self.keystone_client.auth_token
+
+    def _authenticate(self):
+        keystone_client = self.keystone_client
+        force_new_token = keystone_client.force_new_token
+        # The keyring would give back the same token otherwise
+        keystone_client.force_new_token = True
+        try:
+            keystone_client.authenticate()
+        finally:
+            keystone_client.force_new_token = force_new_token
+
+    def invalidate(self):
+        with self._lock:
+            self._invalid = True
+        return True
+
+
+class CachedTokenProvider(TokenProvider):
+    """Uses a token cached by an earlier process until it is about to
+    expire or is rejected, and authenticates only then.
+
+    :param token: cached token
+    :param expires_at: expiry of the token, in seconds since the epoch
+    :param authenticate: function authenticating and returning the
+        provider of later tokens
+    :param stale_duration: seconds before its expiry the token is renewed
+    """
+
+    def __init__(self, token, expires_at, authenticate,
+                 stale_duration=DEFAULT_STALE_DURATION):
+        self.token = token
+        self.expires_at = expires_at
+        self.authenticate = authenticate
+        self.stale_duration = stale_duration
+        self._provider = None
+        self._invalid = False
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        with self._lock:
+            if self._provider is None:
+                if (not self._invalid and
+                        self.expires_at - time.time() > self.stale_duration):
+                    return self.token
+                self._provider = self.authenticate()
+        return self._provider.get_token()
+
+    def invalidate(self):
+        with self._lock:
+            if self._provider is None:
+                self._invalid = True
+                return True
+        return self._provider.invalidate()
@@ -0,0 +1,249 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Tracing of manager calls and the HTTP requests they send.
+
+A tracer passed as 'tracer' argument of the client gets a span for every
+call of a public manager method, named like 'ShareManager.create', and a
+child span for every API request sent by it, including all its retries::
+
+    >>> tracer = tracing.OpenTelemetryTracer()
+    >>> manila = client.Client(VERSION, session=sess, tracer=tracer)
+
+Other tracing systems can be plugged in by subclassing :class:`Tracer` and
+:class:`Span`. :class:`InMemoryTracer` keeps spans in memory for tests.
+"""
+
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+from oslo_utils import importutils
+
+from manilaclient.common import requestcontext
+
+_current_span = requestcontext.ContextValue('manilaclient_current_span')
+
+
+class Span(object):
+    """Span that records nothing, base class of spans."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = Span()
+
+
+class Tracer(object):
+    """Tracer that records nothing, base class of tracers."""
+
+    def start_span(self, name, parent=None, attributes=None):
+        """Starts a new span, it is ended by calling its 'end()' method.
+
+        :param parent: span of the enclosing manager call or None
+        :param attributes: dict with initial attributes of the span
+        """
+        return _NOOP_SPAN
+
+
+class InMemorySpan(Span):
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self._tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.exception = None
+        self.start_time = time.time()
+        self.end_time = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        self.events.append((name, dict(attributes or {})))
+
+    def record_exception(self, exception):
+        self.exception = exception
+
+    def end(self):
+        self.end_time = time.time()
+        self._tracer._finish(self)
+
+    @property
+    def duration(self):
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def __repr__(self):
+        return '<InMemorySpan %s>' % self.name
+
+
+class InMemoryTracer(Tracer):
+    """Keeps finished spans in memory, in the order they ended."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def start_span(self, name, parent=None, attributes=None):
+        return InMemorySpan(self, name, parent, attributes)
+
+    def _finish(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def get_spans(self, name=None):
+        """Returns finished spans, optionally only those with given name."""
+        with self._lock:
+            spans = list(self._spans)
+        if name is not None:
+            spans = [span for span in spans if span.name == name]
+        return spans
+
+    def get_children(self, parent):
+        return [span for span in self.get_spans() if span.parent is parent]
+
+    def reset(self):
+        with self._lock:
+            self._spans = []
+
+
+class _OpenTelemetrySpan(Span):
+
+    def __init__(self, trace, span):
+        self._trace = trace
+        self.span = span
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.span.set_attribute(key, value)
+
+    def add_event(self, name, attributes=None):
+        self.span.add_event(name, attributes or {})
+
+    def record_exception(self, exception):
+        self.span.record_exception(exception)
+        self.span.set_status(self._trace.Status(
+            self._trace.StatusCode.ERROR, str(exception)))
+
+    def end(self):
+        self.span.end()
+
+
+class OpenTelemetryTracer(Tracer):
+    """Adapter creating spans with an OpenTelemetry tracer.
+
+    Spans without a parent manager call are children of the current
+    OpenTelemetry span of the application.
+
+    :param tracer: 'opentelemetry.trace.Tracer' to use, the 'manilaclient'
+        tracer of the global tracer provider by default
+    """
+
+    def __init__(self, tracer=None):
+        try:
+            self._trace = importutils.import_module('opentelemetry.trace')
+        except ImportError:
+            raise ValueError("OpenTelemetry is not installed.")
+        self._tracer = tracer or self._trace.get_tracer('manilaclient')
+
+    def start_span(self, name, parent=None, attributes=None):
+        context = None
+        if isinstance(parent, _OpenTelemetrySpan):
+            context = self._trace.set_span_in_context(parent.span)
+        attributes = dict((key, value)
+                          for key, value in (attributes or {}).items()
+                          if value is not None)
+        return _OpenTelemetrySpan(self._trace, self._tracer.start_span(
+            name, context=context, attributes=attributes))
+
+
+def get_current_span():
+    """Returns span of the innermost traced call in progress, if any."""
+    return _current_span.get()
+
+
+def use_span(span):
+    """Makes the span parent of spans started in the 'with' block."""
+    return _current_span.scoped(span)
+
+
+@contextlib.contextmanager
+def start_span(tracer, name, attributes=None):
+    """Runs the 'with' block in a new child of the current span.
+
+    :param tracer: tracer to use, if None nothing is recorded
+    """
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    span = tracer.start_span(name, parent=_current_span.get(),
+                             attributes=attributes)
+    try:
+        with _current_span.scoped(span):
+            yield span
+    except Exception as e:
+        span.record_exception(e)
+        raise
+    finally:
+        span.end()
+
+
+def _is_awaitable(obj):
+    isawaitable = getattr(inspect, 'isawaitable', None)
+    return isawaitable is not None and isawaitable(obj)
+
+
+def traced(f):
+    """Runs manager method in a span named like 'ShareManager.create'.
+
+    The tracer is taken from the HTTP client of the manager, nothing is
+    done when it has none. Spans of coroutines end once they are awaited.
+    """
+
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        tracer = self._tracer
+        if tracer is None:
+            return f(self, *args, **kwargs)
+
+        span = tracer.start_span('%s.%s' % (type(self).__name__, f.__name__),
+                                 parent=_current_span.get())
+        try:
+            with _current_span.scoped(span):
+                result = f(self, *args, **kwargs)
+        except Exception as e:
+            span.record_exception(e)
+            span.end()
+            raise
+
+        if _is_awaitable(result):
+            from manilaclient.aio import utils as aio_utils
+            return aio_utils.trace_awaitable(span, result)
+        span.end()
+        return result
+    return wrapper
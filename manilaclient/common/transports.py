@@ -0,0 +1,298 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Transports sending the HTTP requests of the client.
+
+A transport only sends a single request and returns its response; retries,
+logging, caching and instrumentation are done by the client on top of it.
+By default a :class:`requests.Session` is used, another transport is passed
+as 'transport' argument of the client::
+
+    >>> manila = client.Client(VERSION, session=sess,
+                               transport=transports.Urllib3Transport())
+
+:class:`WSGITransport` calls a WSGI application in the same process, with
+no sockets involved, e.g. for tests and simulators::
+
+    >>> manila = client.Client(VERSION, input_auth_token='token',
+                               service_catalog_url='http://manila/v2/1234',
+                               transport=transports.WSGITransport(app))
+"""
+
+import datetime
+import io
+import sys
+import time
+import zlib
+
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+from requests.packages.urllib3 import poolmanager
+from requests.packages.urllib3.util import timeout as urllib3_timeout
+from requests.packages.urllib3.util import url as urllib3_url
+from requests import structures
+from requests import utils as requests_utils
+import six
+from six.moves.urllib import parse
+
+from manilaclient.common import httpclient
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def decode_content(raw, encoding):
+    """Decodes body sent with the given 'Content-Encoding'."""
+    if not raw or not encoding:
+        return raw
+    encoding = encoding.strip().lower()
+    if encoding not in ('gzip', 'deflate'):
+        return raw
+    try:
+        # wbits=47 accepts both gzip and zlib framing
+        return zlib.decompressobj(47).decompress(raw)
+    except zlib.error:
+        # Some servers send raw deflate data without zlib header
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(raw)
+
+
+def build_response(url, status, reason, headers, content=None, raw=None,
+                   elapsed=None):
+    """Returns :class:`requests.Response` the client can process.
+
+    :param headers: mapping of response headers
+    :param content: decoded body, None if it is left to be read from 'raw'
+    :param raw: file-like object of the body, its 'tell()' reports the
+        number of bytes received
+    :param elapsed: time until the response headers were parsed
+    """
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = reason
+    resp.headers = structures.CaseInsensitiveDict(headers)
+    resp.url = url
+    resp.elapsed = elapsed or datetime.timedelta(0)
+    resp.encoding = requests_utils.get_encoding_from_headers(resp.headers)
+    resp.raw = raw
+    if content is not None:
+        resp._content = content
+        resp._content_consumed = True
+    return resp
+
+
+class Transport(object):
+    """Base class of transports.
+
+    :class:`requests.Session` is a transport too, the asyncio client uses
+    :class:`manilaclient.aio.transport.AsyncTransport` whose 'request()'
+    is a coroutine.
+    """
+
+    def request(self, method, url, headers=None, data=None, timeout=None,
+                verify=True, stream=False):
+        """Sends a request.
+
+        :param data: request body as bytes or text
+        :param timeout: seconds or tuple of (connect, read) seconds
+        :param verify: whether to verify certificates of the server, or
+            path of the CA bundle to verify them with
+        :param stream: whether the body may be left to be read by the
+            caller, transports are free to read it anyway
+        :returns: :class:`requests.Response`, see :func:`build_response`
+        :raises: requests.exceptions.ConnectionError or
+            requests.exceptions.Timeout
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Closes pooled connections, if any."""
+
+    def warm_up(self, url, verify=True, timeout=None):
+        """Opens a pooled connection to the host of the URL, if any."""
+
+
+class Urllib3Transport(Transport):
+    """Sends requests straight with urllib3, skipping requests' overhead.
+
+    :param ssl_context: SSL context of all HTTPS connections, if None it is
+        built from the 'verify' argument of every request
+    :param pool_connections: number of hosts to keep connection pools for
+    :param pool_maxsize: max number of connections kept open per host
+    """
+
+    def __init__(self, ssl_context=None,
+                 pool_connections=httpclient.DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=httpclient.DEFAULT_POOL_MAXSIZE):
+        kwargs = {}
+        if ssl_context is not None:
+            kwargs['ssl_context'] = ssl_context
+        self.ssl_context = ssl_context
+        self.pool_manager = poolmanager.PoolManager(
+            num_pools=pool_connections, maxsize=pool_maxsize, **kwargs)
+        # Connections report connection phase timings like the ones of
+        # the requests transport.
+        self.pool_manager.pool_classes_by_scheme = {
+            'http': httpclient.TimedHTTPConnectionPool,
+            'https': httpclient.TimedHTTPSConnectionPool,
+        }
+
+    def _get_pool(self, url, verify):
+        pool_kwargs = None
+        if self.ssl_context is None and url.startswith('https'):
+            if verify is False:
+                pool_kwargs = {'cert_reqs': 'CERT_NONE'}
+            else:
+                pool_kwargs = {
+                    'cert_reqs': 'CERT_REQUIRED',
+                    'ca_certs': (verify if isinstance(verify, six.string_types)
+                                 else requests_utils.DEFAULT_CA_BUNDLE_PATH),
+                }
+        return self.pool_manager.connection_from_url(url,
+                                                     pool_kwargs=pool_kwargs)
+
+    @staticmethod
+    def _get_timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        return urllib3_timeout.Timeout(connect=connect, read=read)
+
+    def request(self, method, url, headers=None, data=None, timeout=None,
+                verify=True, stream=False):
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        start = time.time()
+        try:
+            pool = self._get_pool(url, verify)
+            raw = pool.urlopen(
+                method, urllib3_url.parse_url(url).request_uri, body=data,
+                headers=headers, timeout=self._get_timeout(timeout),
+                retries=False, redirect=False, assert_same_host=False,
+                preload_content=False, decode_content=True)
+            elapsed = datetime.timedelta(seconds=time.time() - start)
+            content = None if stream else raw.read()
+        except urllib3_exceptions.NewConnectionError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except urllib3_exceptions.ConnectTimeoutError as e:
+            raise requests.exceptions.ConnectTimeout(e)
+        except urllib3_exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except urllib3_exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e)
+        except urllib3_exceptions.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e)
+
+        if content is not None:
+            raw.release_conn()
+        return build_response(url, raw.status, raw.reason, raw.headers,
+                              content=content, raw=raw, elapsed=elapsed)
+
+    def close(self):
+        self.pool_manager.clear()
+
+    def warm_up(self, url, verify=True, timeout=None):
+        httpclient.open_pooled_connection(self._get_pool(url, verify),
+                                          timeout)
+
+
+class RawBody(object):
+    """Stand-in for 'response.raw' reporting the body size on the wire."""
+
+    def __init__(self, wire_size):
+        self.wire_size = wire_size
+
+    def tell(self):
+        return self.wire_size
+
+
+class WSGITransport(Transport):
+    """Calls a WSGI application in the same process instead of sending
+    requests over the network.
+
+    Timeouts and certificate verification do not apply. Errors raised by
+    the application are raised to the caller.
+
+    :param app: WSGI application, e.g. the Manila API pipeline or a fake
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _build_environ(self, method, url, headers, data):
+        parsed = parse.urlsplit(url)
+        path = parse.unquote(parsed.path) or '/'
+        if six.PY3:
+            # PEP 3333 'bytes as latin-1' native strings
+            path = path.encode('utf-8').decode('latin-1')
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': parsed.query,
+            'SERVER_NAME': parsed.hostname or 'localhost',
+            'SERVER_PORT': str(parsed.port or
+                               DEFAULT_PORTS.get(parsed.scheme, 80)),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(data)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': parsed.scheme or 'http',
+            'wsgi.input': io.BytesIO(data),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'HTTP_HOST': parsed.netloc,
+        }
+        for name, value in (headers or {}).items():
+            key = name.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = 'HTTP_' + key
+            environ[key] = value
+        return environ
+
+    def request(self, method, url, headers=None, data=None, timeout=None,
+                verify=True, stream=False):
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        data = data or b''
+        start = time.time()
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            if exc_info is not None and response:
+                six.reraise(*exc_info)
+            response['status'] = status
+            response['headers'] = response_headers
+            return chunks.append
+
+        chunks = []
+        result = self.app(self._build_environ(method, url, headers, data),
+                          start_response)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        elapsed = datetime.timedelta(seconds=time.time() - start)
+        status, _sep, reason = response['status'].partition(' ')
+        resp_headers = structures.CaseInsensitiveDict()
+        for name, value in response['headers']:
+            if name in resp_headers:
+                value = '%s, %s' % (resp_headers[name], value)
+            resp_headers[name] = value
+        body = b''.join(chunks)
+        return build_response(
+            url, int(status), reason, resp_headers,
+            content=decode_content(body, resp_headers.get('Content-Encoding')),
+            raw=RawBody(len(body)), elapsed=elapsed)
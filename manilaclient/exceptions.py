@@ -17,6 +17,10 @@
 Exception definitions.
 """
 
+import six
+
+from manilaclient.openstack.common.apiclient import exceptions as \
+    apiclient_exceptions
 from manilaclient.openstack.common.apiclient.exceptions import *  # noqa
 
 
@@ -38,3 +42,96 @@ class VersionNotFoundForAPIMethod(Exception):
 
     def __str__(self):
         return self.msg_fmt % {"vers": self.version, "method": self.method}
+
+
+class CircuitBreakerOpen(ClientException):
+    """Request was not sent because its endpoint is failing.
+
+    :param endpoint: endpoint with the open circuit
+    :param retry_after: seconds until the endpoint is probed again
+    """
+
+    def __init__(self, endpoint, retry_after=0):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super(CircuitBreakerOpen, self).__init__(
+            "Circuit breaker for %(endpoint)s is open, retry in "
+            "%(sec).0f seconds." % {'endpoint': endpoint, 'sec': retry_after})
+
+
+class DeadlineExceeded(ClientException):
+    """Call did not finish before the deadline set for it.
+
+    :param deadline: time the deadline expired at, as returned by time.time()
+    """
+
+    def __init__(self, deadline=None):
+        self.deadline = deadline
+        super(DeadlineExceeded, self).__init__(
+            "Deadline of the call was exceeded.")
+
+
+def get_retry_after(response):
+    """Returns seconds to wait given by the 'Retry-After' header, or 0.
+
+    The header may also be an HTTP date, which is ignored.
+    """
+    try:
+        return int(response.headers.get('retry-after', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def from_response(response, method, url, body=None):
+    """Returns an instance of :class:`HttpError` or subclass based on response.
+
+    Same as the one of apiclient, except that the body is not decoded
+    again if already done by the caller and that 'retry_after' is set for
+    all errors, not only 413 ones.
+
+    :param response: instance of `requests.Response` class
+    :param method: HTTP method used for request
+    :param url: URL used for request
+    :param body: already decoded JSON body of response, if available
+    """
+    req_id = response.headers.get("x-openstack-request-id")
+    # NOTE(hdd) true for older versions of nova and cinder
+    if not req_id:
+        req_id = response.headers.get("x-compute-request-id")
+    kwargs = {
+        "http_status": response.status_code,
+        "response": response,
+        "method": method,
+        "url": url,
+        "request_id": req_id,
+    }
+
+    content_type = response.headers.get("Content-Type", "")
+    if content_type.startswith("application/json"):
+        if body is None:
+            try:
+                body = response.json()
+            except ValueError:
+                pass
+        if isinstance(body, dict) and body:
+            error = body.get(list(body)[0])
+            if isinstance(error, dict):
+                kwargs["message"] = (error.get("message") or
+                                     error.get("faultstring"))
+                kwargs["details"] = (error.get("details") or
+                                     six.text_type(body))
+    elif content_type.startswith("text/"):
+        kwargs["details"] = response.text
+
+    try:
+        cls = apiclient_exceptions._code_map[response.status_code]
+    except KeyError:
+        if 500 <= response.status_code < 600:
+            cls = HttpServerError
+        elif 400 <= response.status_code < 500:
+            cls = HTTPClientError
+        else:
+            cls = HttpError
+    error = cls(**kwargs)
+    error.retry_after = get_retry_after(response)
+    return error
@@ -21,6 +21,7 @@ Command-line interface to the OpenStack Manila API.
 from __future__ import print_function
 
 import argparse
+import functools
 import glob
 import imp
 import itertools
@@ -34,14 +35,26 @@ import six
 
 from manilaclient import api_versions
 from manilaclient import client
+from manilaclient.common import authcache
 from manilaclient.common import constants
+from manilaclient.common import deadlines
+from manilaclient.common import timings
 from manilaclient import exceptions as exc
 import manilaclient.extension
-from manilaclient.openstack.common import cliutils
-from manilaclient.v2 import shell as shell_v2
+from manilaclient import utils
+
+# Imports prettytable and oslo_utils.strutils, only needed once the shell
+# runs
+cliutils = utils.LazyModule('manilaclient.openstack.common.cliutils')
+
+# Commands are imported when the parser of subcommands is built
+shell_v2 = utils.LazyModule('manilaclient.v2.shell')
 
 DEFAULT_OS_SHARE_API_VERSION = api_versions.MAX_VERSION
 DEFAULT_MANILA_ENDPOINT_TYPE = 'publicURL'
+DEFAULT_VERSION_CACHE_TTL = api_versions.DEFAULT_VERSION_CACHE_TTL
+DEFAULT_VERSION_CACHE_PATH = os.path.join(
+    '~', '.cache', 'manilaclient', 'versions.json')
 V1_MAJOR_VERSION = '1'
 V2_MAJOR_VERSION = '2'
 
@@ -61,6 +74,73 @@ class AllowOnlyOneAliasAtATimeAction(argparse.Action):
         setattr(namespace, self.dest, values)
 
 
+class VersionAction(argparse._VersionAction):
+    """Prints the version, which is looked up only when it is asked for."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        self.version = manilaclient.__version__
+        super(VersionAction, self).__call__(parser, namespace, values,
+                                            option_string)
+
+
+class LazyParserMap(dict):
+    """Parsers of subcommands by their names, built on first access."""
+
+    def __init__(self):
+        super(LazyParserMap, self).__init__()
+        self.factories = {}
+
+    def add(self, name, factory):
+        self.factories[name] = factory
+
+    def __missing__(self, name):
+        parser = self[name] = self.factories.pop(name)()
+        return parser
+
+    def __contains__(self, name):
+        return (super(LazyParserMap, self).__contains__(name) or
+                name in self.factories)
+
+    def __iter__(self):
+        return itertools.chain(super(LazyParserMap, self).__iter__(),
+                               iter(list(self.factories)))
+
+    def __len__(self):
+        return super(LazyParserMap, self).__len__() + len(self.factories)
+
+
+class LazySubParsersAction(argparse._SubParsersAction):
+    """Subcommands whose parsers are built only when they are used.
+
+    Only names and help strings of subcommands are registered up front,
+    the parser of a subcommand is built once it is parsed or its help is
+    printed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LazySubParsersAction, self).__init__(*args, **kwargs)
+        self._name_parser_map = self.choices = LazyParserMap()
+
+    def add_lazy_parser(self, name, build, **kwargs):
+        """Registers a subcommand.
+
+        :param name: name of the subcommand
+        :param build: function adding arguments to the new parser
+        :param kwargs: arguments of 'add_parser()'
+        """
+        if 'help' in kwargs:
+            self._choices_actions.append(argparse.Action(
+                option_strings=[], dest=name, help=kwargs.pop('help'),
+                metavar=name))
+        kwargs.setdefault('prog', '%s %s' % (self._prog_prefix, name))
+
+        def factory():
+            parser = self._parser_class(**kwargs)
+            build(parser)
+            return parser
+        self._name_parser_map.add(name, factory)
+
+
 class ManilaClientArgumentParser(argparse.ArgumentParser):
 
     def __init__(self, *args, **kwargs):
@@ -106,6 +186,9 @@ class ManilaClientArgumentParser(argparse.ArgumentParser):
 
 class OpenStackManilaShell(object):
 
+    # Version ranges of share endpoints discovered by earlier commands
+    version_cache = None
+
     def get_base_parser(self):
         parser = ManilaClientArgumentParser(
             prog='manila',
@@ -122,8 +205,7 @@ class OpenStackManilaShell(object):
                             help=argparse.SUPPRESS)
 
         parser.add_argument('--version',
-                            action='version',
-                            version=manilaclient.__version__)
+                            action=VersionAction)
 
         parser.add_argument('-d', '--debug',
                             action='store_true',
@@ -134,8 +216,9 @@ class OpenStackManilaShell(object):
         parser.add_argument('--os-cache',
                             default=cliutils.env('OS_CACHE', default=False),
                             action='store_true',
-                            help='Use the auth token cache. '
-                                 'Defaults to env[OS_CACHE].')
+                            help='Use the auth token cache, later commands '
+                                 'skip authentication until the token '
+                                 'expires. Defaults to env[OS_CACHE].')
 
         parser.add_argument('--os-reset-cache',
                             default=False,
@@ -306,6 +389,38 @@ class OpenStackManilaShell(object):
                             default=0,
                             help='Number of retries.')
 
+        parser.add_argument('--timings',
+                            default=False,
+                            action='store_true',
+                            help='Print timings of HTTP requests sent.')
+
+        parser.add_argument('--deadline',
+                            metavar='<seconds>',
+                            type=float,
+                            default=cliutils.env('MANILACLIENT_DEADLINE',
+                                                 default=None),
+                            help='Seconds the command may spend sending '
+                                 'API requests, including retries. '
+                                 'Defaults to env[MANILACLIENT_DEADLINE].')
+
+        parser.add_argument('--warm-up',
+                            default=False,
+                            action='store_true',
+                            help='Open the connection to the share API '
+                                 'while the client is being set up.')
+
+        parser.add_argument('--version-cache-ttl',
+                            metavar='<seconds>',
+                            type=float,
+                            default=cliutils.env(
+                                'MANILACLIENT_VERSION_CACHE_TTL',
+                                default=DEFAULT_VERSION_CACHE_TTL),
+                            help='Seconds the API versions supported by '
+                                 'the share endpoint are reused by later '
+                                 'commands, 0 disables caching. Defaults '
+                                 'to env[MANILACLIENT_VERSION_CACHE_TTL] '
+                                 'or %d.' % DEFAULT_VERSION_CACHE_TTL)
+
         parser.add_argument('--os-cert',
                             metavar='<certificate>',
                             default=cliutils.env('OS_CERT'),
@@ -315,11 +430,17 @@ class OpenStackManilaShell(object):
 
         return parser
 
-    def get_subcommand_parser(self, version):
+    def get_subcommand_parser(self, version, api_version=None):
         parser = self.get_base_parser()
 
-        self.subcommands = {}
-        subparsers = parser.add_subparsers(metavar='<subcommand>')
+        # Command names and help are indexed up front, parsers of commands
+        # are built when they are used, with the arguments supported by
+        # 'api_version'.
+        self.api_version = api_version
+        self.commands = {}
+        subparsers = parser.add_subparsers(metavar='<subcommand>',
+                                           action=LazySubParsersAction)
+        self.subcommands = subparsers.choices
 
         try:
             actions_module = {
@@ -328,11 +449,11 @@ class OpenStackManilaShell(object):
         except KeyError:
             actions_module = shell_v2
 
-        self._find_actions(subparsers, actions_module)
-        self._find_actions(subparsers, self)
+        self._find_actions(subparsers, actions_module, api_version)
+        self._find_actions(subparsers, self, api_version)
 
         for extension in self.extensions:
-            self._find_actions(subparsers, extension.module)
+            self._find_actions(subparsers, extension.module, api_version)
 
         self._add_bash_completion_subparser(subparsers)
 
@@ -347,6 +468,9 @@ class OpenStackManilaShell(object):
             extension = manilaclient.extension.Extension(name, module)
             extensions.append(extension)
 
+        # Extensions are the last to register hooks, commands may run them
+        # from many threads.
+        manilaclient.extension.Extension.freeze_hooks()
         return extensions
 
     def _discover_via_python_path(self):
@@ -375,38 +499,66 @@ class OpenStackManilaShell(object):
             yield name, module
 
     def _add_bash_completion_subparser(self, subparsers):
-        subparser = subparsers.add_parser(
+        subparsers.add_lazy_parser(
             'bash_completion',
+            lambda subparser: subparser.set_defaults(
+                func=self.do_bash_completion),
             add_help=False,
             formatter_class=OpenStackHelpFormatter)
 
-        self.subcommands['bash_completion'] = subparser
-        subparser.set_defaults(func=self.do_bash_completion)
-
-    def _find_actions(self, subparsers, actions_module):
+    def _find_actions(self, subparsers, actions_module, api_version=None):
         for attr in (a for a in dir(actions_module) if a.startswith('do_')):
             # I prefer to be hypen-separated instead of underscores.
             command = attr[3:].replace('_', '-')
             callback = getattr(actions_module, attr)
             desc = callback.__doc__ or ''
             help = desc.strip()
-            arguments = getattr(callback, 'arguments', [])
 
-            subparser = subparsers.add_parser(
+            self.commands[command] = callback
+            subparsers.add_lazy_parser(
                 command,
+                functools.partial(self._add_arguments, callback=callback,
+                                  api_version=api_version),
                 help=help,
                 description=desc,
                 add_help=False,
                 formatter_class=OpenStackHelpFormatter)
 
-            subparser.add_argument('-h', '--help',
-                                   action='help',
-                                   help=argparse.SUPPRESS,)
-
-            self.subcommands[command] = subparser
-            for (args, kwargs) in arguments:
-                subparser.add_argument(*args, **kwargs)
-            subparser.set_defaults(func=callback)
+    def _add_arguments(self, subparser, callback, api_version=None):
+        subparser.add_argument('-h', '--help',
+                               action='help',
+                               help=argparse.SUPPRESS,)
+
+        arguments = self._get_arguments(callback, api_version)
+        for (args, kwargs) in arguments:
+            subparser.add_argument(*args, **kwargs)
+        # Arguments left out for the API version keep their default, so
+        # that commands can read them anyway.
+        for (args, kwargs) in self._get_arguments(callback):
+            if (args, kwargs) not in arguments and args[0].startswith('-'):
+                dest = subparser._get_optional_kwargs(*args, **kwargs)['dest']
+                subparser.set_defaults(**{dest: kwargs.get('default')})
+        subparser.set_defaults(func=callback)
+
+    @staticmethod
+    def _get_arguments(callback, api_version=None):
+        """Returns arguments of a command supported by the API version.
+
+        Arguments given 'start_version' and/or 'end_version' are left out
+        if 'api_version' is not in their range.
+        """
+        arguments = []
+        for (args, kwargs) in getattr(callback, 'arguments', []):
+            kwargs = dict(kwargs)
+            start_version = api_versions.APIVersion(
+                kwargs.pop('start_version', None))
+            end_version = api_versions.APIVersion(
+                kwargs.pop('end_version', None))
+            if (api_version is not None and not api_version.is_null() and
+                    not api_version.matches(start_version, end_version)):
+                continue
+            arguments.append((args, kwargs))
+        return arguments
 
     def setup_debugging(self, debug):
         if not debug:
@@ -427,7 +579,7 @@ class OpenStackManilaShell(object):
         self._run_extension_hooks('__pre_parse_args__')
 
         self.parser = self.get_subcommand_parser(
-            os_api_version.get_major_version())
+            os_api_version.get_major_version(), os_api_version)
 
         if options.help or not argv:
             self.parser.print_help()
@@ -489,6 +641,23 @@ class OpenStackManilaShell(object):
             cert=args.os_cert,
         )
 
+        # Collector is shared by the version discovery and the final client
+        timing_collector = None
+        if args.timings:
+            timing_collector = timings.TimingCollector()
+            client_args['timing_collector'] = timing_collector
+
+        if args.warm_up:
+            client_args['warm_up_connections'] = 1
+
+        # Tokens and endpoints are reused by later commands
+        if args.os_cache:
+            client_args['auth_cache'] = authcache.AuthCache()
+
+        if args.version_cache_ttl > 0:
+            self.version_cache = api_versions.VersionCache(
+                args.version_cache_ttl, DEFAULT_VERSION_CACHE_PATH)
+
         # Handle deprecated parameters
         if args.share_service_name:
             client_args['share_service_name'] = args.share_service_name
@@ -499,21 +668,65 @@ class OpenStackManilaShell(object):
                                         args.os_project_id,
                                         client_args['auth_url'])
 
-        # This client is needed to discover the server api version.
-        temp_client = client.Client(manilaclient.API_MAX_VERSION,
-                                    **client_args)
-
-        self.cs, discovered_version = self._discover_client(temp_client,
-                                                            os_api_version,
-                                                            os_endpoint_type,
-                                                            os_service_type,
-                                                            client_args)
-
-        args = self._build_subcommands_and_extensions(discovered_version,
-                                                      argv,
-                                                      options)
-
-        args.func(self.cs, args)
+        try:
+            with deadlines.deadline(args.deadline):
+                # This client is needed to discover the server api version.
+                temp_client = client.Client(manilaclient.API_MAX_VERSION,
+                                            **client_args)
+                # The client is retargeted at the discovered version below
+                version_cache_key = api_versions.get_version_cache_key(
+                    temp_client)
+
+                self.cs, discovered_version = self._discover_client(
+                    temp_client, os_api_version, os_endpoint_type,
+                    os_service_type, client_args)
+
+                args = self._build_subcommands_and_extensions(
+                    discovered_version, argv, options)
+
+                try:
+                    args.func(self.cs, args)
+                except Exception as e:
+                    # The cached versions may be outdated, e.g. after an
+                    # upgrade of the server, so they are discovered again
+                    # by the next command.
+                    if (self.version_cache is not None and
+                            version_cache_key is not None and
+                            api_versions.is_version_error(e)):
+                        self.version_cache.invalidate(version_cache_key)
+                    raise
+        finally:
+            if timing_collector is not None:
+                self._print_timings(timing_collector)
+
+    @staticmethod
+    def _format_seconds(value):
+        return '' if value is None else '%.3f' % value
+
+    def _print_timings(self, collector):
+        seconds_fields = ('Connect', 'TLS', 'First byte', 'Decode', 'Total')
+        formatters = dict(
+            (field, lambda o, attr=field.lower().replace(' ', '_'):
+                self._format_seconds(getattr(o, attr)))
+            for field in seconds_fields)
+        formatters['Bytes received'] = (
+            lambda o: '' if o.bytes_received is None else o.bytes_received)
+        cliutils.print_list(
+            collector.get_timings(),
+            ['Method', 'URL', 'Status', 'Bytes sent', 'Bytes received'] +
+            list(seconds_fields),
+            formatters=formatters, sortby_index=None)
+
+        summary_fields = ['Method', 'URL', 'Count', 'Errors', 'p50', 'p90',
+                          'p99', 'Max']
+        summary_formatters = dict(
+            (field, lambda o, key=field.lower(): o[key])
+            for field in summary_fields[:4])
+        summary_formatters.update(dict(
+            (field, lambda o, key=field.lower(): self._format_seconds(o[key]))
+            for field in summary_fields[4:]))
+        cliutils.print_list(collector.summary(), summary_fields,
+                            formatters=summary_formatters, sortby_index=None)
 
     def _discover_client(self,
                          current_client,
@@ -528,7 +741,8 @@ class OpenStackManilaShell(object):
         else:
             discovered_version = api_versions.discover_version(
                 current_client,
-                os_api_version
+                os_api_version,
+                cache=self.version_cache
             )
 
         if not os_endpoint_type:
@@ -544,10 +758,18 @@ class OpenStackManilaShell(object):
             client_args['service_type'] = os_service_type
             client_args['endpoint_type'] = os_endpoint_type
 
-            return (client.Client(discovered_version, **client_args),
-                    discovered_version)
-        else:
-            return current_client, discovered_version
+            if (discovered_version.get_major_version() !=
+                    current_client.api_version.get_major_version()):
+                return (client.Client(discovered_version, **client_args),
+                        discovered_version)
+
+            # Token and endpoints of the client are reused, instead of
+            # authenticating once more for a new client.
+            current_client.retarget(discovered_version,
+                                    service_type=os_service_type,
+                                    endpoint_type=os_endpoint_type)
+
+        return current_client, discovered_version
 
     def _discover_service_type(self, discovered_version):
         major_version = discovered_version.get_major_version()
@@ -599,19 +821,17 @@ class OpenStackManilaShell(object):
         Prints all of the commands and options to stdout so that the
         manila.bash_completion script doesn't have to hard code them.
         """
-        commands = set()
-        options = set()
-        for sc_str, sc in list(self.subcommands.items()):
-            commands.add(sc_str)
-            for option in sc._optionals._option_string_actions:
-                options.add(option)
+        commands = set(self.subcommands)
+        options = set(['-h', '--help'])
+        for callback in self.commands.values():
+            for (args, kwargs) in self._get_arguments(
+                    callback, self.api_version):
+                options.update(a for a in args if a.startswith('-'))
 
         commands.remove('bash-completion')
         commands.remove('bash_completion')
         print(' '.join(commands | options))
 
-    @cliutils.arg('command', metavar='<subcommand>', nargs='?',
-                  help='Display help for <subcommand>')
     def do_help(self, args):
         """Display help about this program or one of its subcommands."""
         if args.command:
@@ -623,6 +843,13 @@ class OpenStackManilaShell(object):
         else:
             self.parser.print_help()
 
+    # Same as decorating it with cliutils.arg(), which would import
+    # cliutils along with this module
+    do_help.arguments = [
+        (('command',), {'metavar': '<subcommand>', 'nargs': '?',
+                        'help': 'Display help for <subcommand>'}),
+    ]
+
 
 # I'm picky about my shell help.
 class OpenStackHelpFormatter(argparse.HelpFormatter):
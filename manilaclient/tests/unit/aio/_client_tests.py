@@ -0,0 +1,325 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import json
+
+import mock
+
+import manilaclient
+from manilaclient import api_versions
+from manilaclient.aio import client
+from manilaclient.aio import transport
+from manilaclient.common import constants
+from manilaclient.common import hedging
+from manilaclient.common import metrics
+from manilaclient.common import tokens
+from manilaclient.common import tracing
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+from manilaclient.v2 import consistency_groups
+from manilaclient.v2 import share_servers
+from manilaclient.v2 import shares
+
+ENDPOINT = 'http://manila.example.com/v2/project'
+
+
+class AsyncClientTest(utils.TestCase):
+
+    def setUp(self):
+        super(AsyncClientTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.responses = []
+        self.requests = []
+        self.mock_object(transport.AsyncTransport, 'request',
+                         mock.Mock(side_effect=self._request))
+        self.mock_object(asyncio, 'sleep',
+                         mock.Mock(side_effect=self._sleep))
+        self.cs = self._get_client(manilaclient.API_MAX_VERSION)
+
+    def _get_client(self, api_version):
+        return client.Client(input_auth_token='token',
+                             service_catalog_url=ENDPOINT,
+                             api_version=api_version, retries=1)
+
+    async def _request(self, method, url, headers=None, **kwargs):
+        self.requests.append((method, url, headers, kwargs.get('data')))
+        status, body = self.responses.pop(0)
+        return utils.TestResponse({
+            'status_code': status,
+            'text': json.dumps(body) if body is not None else '',
+        })
+
+    async def _sleep(self, delay):
+        pass
+
+    def run_coroutine(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_list(self):
+        self.responses = [(200, {'shares': [{'id': '1'}, {'id': '2'}]})]
+
+        result = self.run_coroutine(self.cs.shares.list(detailed=False))
+
+        self.assertEqual(['1', '2'], [s.id for s in result])
+        self.assertIsInstance(result[0], shares.Share)
+        self.assertEqual(('GET', ENDPOINT + '/shares?is_public=True'),
+                         self.requests[0][:2])
+
+    def test_get(self):
+        self.responses = [(200, {'share': {'id': '1', 'size': 1}})]
+
+        share = self.run_coroutine(self.cs.shares.get('1'))
+
+        self.assertEqual(1, share.size)
+        self.assertEqual(ENDPOINT + '/shares/1', self.requests[0][1])
+
+    def test_create_returns_loaded_resource(self):
+        self.responses = [(200, {'share': {'id': '1'}})]
+
+        share = self.run_coroutine(self.cs.shares.create('nfs', 1))
+
+        self.assertTrue(share.is_loaded())
+        self.assertRaises(AttributeError, getattr, share, 'missing')
+        self.assertEqual('POST', self.requests[0][0])
+
+    def test_delete_is_sent(self):
+        self.responses = [(202, None), (202, None)]
+        share = shares.Share(self.cs.shares, {'id': '1'}, loaded=True)
+
+        self.run_coroutine(self.cs.shares.delete(share))
+        self.run_coroutine(share.delete())
+
+        self.assertEqual([('DELETE', ENDPOINT + '/shares/1')] * 2,
+                         [r[:2] for r in self.requests])
+
+    def test_allow_and_access_list(self):
+        self.responses = [
+            (200, {'access': {'id': 'a1'}}),
+            (200, {'access_list': [{'id': 'a1', 'access_to': '1.1.1.1'}]}),
+        ]
+
+        access = self.run_coroutine(
+            self.cs.shares.allow('1', 'ip', '1.1.1.1', 'rw'))
+        access_list = self.run_coroutine(self.cs.shares.access_list('1'))
+
+        self.assertEqual({'id': 'a1'}, access)
+        self.assertEqual('1.1.1.1', access_list[0].access_to)
+
+    def test_operation_labels(self):
+        registry = metrics.MetricsRegistry()
+        self.cs.client.metrics = registry
+        self.responses = [(202, None), (200, {'share': {'id': '1'}})]
+
+        self.run_coroutine(self.cs.shares.extend('1', 2))
+        self.run_coroutine(self.cs.shares.get('1'))
+
+        self.assertEqual(1, registry.requests.get(
+            operation='shares._action:os-extend', method='POST',
+            status='202'))
+        self.assertEqual(1, registry.requests.get(
+            operation='shares.get', method='GET', status='200'))
+
+    def test_tracing(self):
+        tracer = tracing.InMemoryTracer()
+        self.cs.client.tracer = tracer
+        self.responses = [(200, {'access': {'id': 'a1'}})]
+
+        self.run_coroutine(self.cs.shares.allow('1', 'ip', '1.1.1.1', 'rw'))
+
+        manager_span = tracer.get_spans('ShareManager.allow')[0]
+        self.assertEqual(['POST /v2/project/shares/{id}/action'],
+                         [span.name for span in
+                          tracer.get_children(manager_span)])
+
+    def test_coalesced_requests(self):
+        cs = client.Client(input_auth_token='token',
+                           service_catalog_url=ENDPOINT,
+                           api_version=manilaclient.API_MAX_VERSION,
+                           coalesce_requests=True)
+        self.responses = [(200, {'share': {'id': '1', 'size': 1}})]
+
+        async def slow_request(*args, **kwargs):
+            # Let the other task join the request in progress
+            future = self.loop.create_future()
+            self.loop.call_soon(future.set_result, None)
+            await future
+            return await self._request(*args, **kwargs)
+        transport.AsyncTransport.request.side_effect = slow_request
+
+        async def get_twice():
+            return await asyncio.gather(cs.shares.get('1'),
+                                        cs.shares.get('1'))
+
+        first, second = self.run_coroutine(get_twice())
+
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(1, cs.client.coalesced_requests)
+        self.assertEqual(1, second.size)
+        self.assertIsNot(first._info, second._info)
+
+    def test_delete_metadata(self):
+        self.responses = [(200, None), (200, None)]
+
+        self.run_coroutine(self.cs.shares.delete_metadata('1', ['a', 'b']))
+
+        self.assertEqual([ENDPOINT + '/shares/1/metadata/a',
+                          ENDPOINT + '/shares/1/metadata/b'],
+                         [r[1] for r in self.requests])
+
+    def test_find(self):
+        self.responses = [(200, {'shares': [{'id': '1', 'name': 'a'},
+                                            {'id': '2', 'name': 'b'}]})]
+
+        share = self.run_coroutine(self.cs.shares.find(name='b'))
+
+        self.assertEqual('2', share.id)
+
+    def test_share_server_get(self):
+        self.responses = [(200, {'share_server': {
+            'id': '1', 'backend_details': {'ip': '1.1.1.1'}}})]
+
+        server = self.run_coroutine(self.cs.share_servers.get('1'))
+
+        self.assertIsInstance(server, share_servers.ShareServer)
+        self.assertEqual('1.1.1.1', server._info['details:ip'])
+
+    def test_share_type_get_keys(self):
+        self.responses = [(200, {'share_type': {'id': '1'}}),
+                          (200, {'extra_specs': {'a': 'b'}})]
+
+        share_type = self.run_coroutine(self.cs.share_types.get('1'))
+        keys = self.run_coroutine(share_type.get_keys())
+
+        self.assertEqual({'a': 'b'}, keys)
+        self.assertEqual(ENDPOINT + '/types/1/extra_specs',
+                         self.requests[1][1])
+
+    def test_versioned_method(self):
+        self.responses = [(200, {'consistency_groups': [{'id': '1'}]})]
+
+        result = self.run_coroutine(
+            self.cs.consistency_groups.list(detailed=False))
+
+        self.assertIsInstance(result[0], consistency_groups.ConsistencyGroup)
+
+    def test_versioned_method_unsupported_version(self):
+        cs = self._get_client(api_versions.APIVersion('2.3'))
+
+        self.assertRaises(exceptions.UnsupportedVersion,
+                          cs.consistency_groups.list)
+
+    def test_experimental_api(self):
+        self.responses = [(200, {'consistency_groups': []})]
+
+        @api_versions.experimental_api
+        async def list_groups(cs):
+            return await cs.consistency_groups.list()
+
+        self.run_coroutine(list_groups(self.cs))
+
+        self.assertEqual('true',
+                         self.requests[0][2][
+                             constants.EXPERIMENTAL_HTTP_HEADER])
+
+    def test_retry(self):
+        self.responses = [(503, None), (200, {'share': {'id': '1'}})]
+
+        share = self.run_coroutine(self.cs.shares.get('1'))
+
+        self.assertEqual('1', share.id)
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual(1, asyncio.sleep.call_count)
+
+    def test_endpoint_failover(self):
+        other_endpoint = 'http://manila2.example.com/v2/project'
+        cs = client.Client(input_auth_token='token',
+                           service_catalog_url=[ENDPOINT, other_endpoint],
+                           api_version=manilaclient.API_MAX_VERSION)
+        self.responses = [(503, None), (200, {'share': {'id': '1'}})]
+
+        share = self.run_coroutine(cs.shares.get('1'))
+
+        self.assertEqual('1', share.id)
+        self.assertEqual(
+            [ENDPOINT + '/shares/1', other_endpoint + '/shares/1'],
+            [request[1] for request in self.requests])
+        self.assertFalse(asyncio.sleep.called)
+        self.assertFalse(cs.get_endpoint_states()[ENDPOINT]['healthy'])
+
+    def test_hedged_get(self):
+        other_endpoint = 'http://manila2.example.com/v2/project'
+        policy = hedging.HedgingPolicy(min_samples=1, max_extra_load=1)
+        policy.record_latency('shares.get', 0.01)
+        cs = client.Client(input_auth_token='token',
+                           service_catalog_url=[ENDPOINT, other_endpoint],
+                           api_version=manilaclient.API_MAX_VERSION,
+                           hedging_policy=policy)
+        slow_response = self.loop.create_future()
+
+        async def request(method, url, headers=None, **kwargs):
+            self.requests.append((method, url, headers, kwargs.get('data')))
+            if url.startswith(ENDPOINT):
+                return await slow_response
+            return utils.TestResponse({
+                'status_code': 200, 'text': '{"share": {"id": "2"}}'})
+        transport.AsyncTransport.request.side_effect = request
+
+        share = self.run_coroutine(cs.shares.get('1'))
+
+        self.assertEqual('2', share.id)
+        self.assertEqual(2, len(self.requests))
+        self.assertTrue(slow_response.cancelled())
+        self.assertEqual(1, policy.hedged)
+
+    def test_deadline_stops_retries(self):
+        self.responses = [(503, None), (200, {'share': {'id': '1'}})]
+        self.cs.client.retry_policy.jitter = False
+
+        async def get_share(cs):
+            with cs.deadline(0.5):
+                return await cs.shares.get('1')
+
+        self.assertRaises(exceptions.ServiceUnavailable, self.run_coroutine,
+                          get_share(self.cs))
+        self.assertEqual(1, len(self.requests))
+
+    def test_reauthenticate_on_401(self):
+        self.responses = [(401, {'error': {'message': 'expired'}}),
+                          (200, {'share': {'id': '1'}})]
+        provider = mock.Mock(spec=tokens.TokenProvider)
+        provider.get_token.side_effect = ['token1', 'token2']
+        self.cs.client.token_provider = provider
+
+        share = self.run_coroutine(self.cs.shares.get('1'))
+
+        self.assertEqual('1', share.id)
+        self.assertEqual(['token1', 'token2'],
+                         [r[2]['X-Auth-Token'] for r in self.requests])
+        provider.invalidate.assert_called_once_with()
+
+    def test_error(self):
+        self.responses = [(404, {'itemNotFound': {'message': 'gone'}})]
+
+        self.assertRaises(exceptions.NotFound, self.run_coroutine,
+                          self.cs.shares.get('1'))
+
+    def test_async_context_manager(self):
+        self.mock_object(transport.AsyncTransport, 'close')
+
+        async def use_client():
+            async with self.cs as cs:
+                return cs
+
+        self.assertIs(self.cs, self.run_coroutine(use_client()))
+        transport.AsyncTransport.close.assert_called_once_with()
@@ -0,0 +1,71 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+
+from manilaclient.aio import singleflight
+from manilaclient.tests.unit import utils
+
+
+class AsyncSingleFlightTest(utils.TestCase):
+
+    def setUp(self):
+        super(AsyncSingleFlightTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+
+    def test_concurrent_calls_coalesced(self):
+        flight = singleflight.AsyncSingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        async def run():
+            return await asyncio.gather(flight.do('key', func),
+                                        flight.do('key', func))
+
+        results = self.loop.run_until_complete(run())
+
+        self.assertEqual([('result', False), ('result', True)], results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(1, flight.coalesced)
+
+    def test_leader_cancelled(self):
+        flight = singleflight.AsyncSingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result %d' % len(calls)
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do('key', func))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(flight.do('key', func))
+                         for i in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            self.assertTrue(leader.cancelled())
+            return results
+
+        results = self.loop.run_until_complete(run())
+
+        self.assertEqual([('result 2', False), ('result 2', True)], results)
+        self.assertEqual(2, len(calls))
+        self.assertEqual({}, flight._calls)
@@ -0,0 +1,373 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import zlib
+
+import fixtures
+import mock
+import requests
+
+from manilaclient.aio import transport
+from manilaclient.common import timings
+from manilaclient.tests.unit import utils
+
+
+class FakeServer(object):
+    """Local HTTP server answering requests with queued raw responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = 'http://127.0.0.1:%s' % port
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while self.responses:
+                head = await reader.readuntil(b'\r\n\r\n')
+                lines = head.decode('latin-1').split('\r\n')
+                headers = dict(
+                    line.split(': ', 1) for line in lines[1:] if line)
+                body = await reader.readexactly(
+                    int(headers.get('Content-Length', 0)))
+                self.requests.append((lines[0], headers, body))
+
+                response = self.responses.pop(0)
+                if response is None:
+                    # Never answer, wait for the client to give up
+                    await reader.read()
+                    break
+                if not response:
+                    # Close the connection without answering
+                    break
+                writer.write(response)
+                await writer.drain()
+                if b'Connection: close' in response or b'X-Drop' in response:
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+
+def response(body=b'{}', headers=None, status='200 OK'):
+    lines = ['HTTP/1.1 %s' % status, 'Content-Length: %d' % len(body)]
+    lines.extend('%s: %s' % h for h in (headers or {}).items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+class AsyncTransportTest(utils.TestCase):
+
+    def setUp(self):
+        super(AsyncTransportTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.transport = transport.AsyncTransport()
+        for name in ('HTTP_PROXY', 'HTTPS_PROXY', 'ALL_PROXY', 'NO_PROXY'):
+            for variable in (name, name.lower()):
+                self.useFixture(fixtures.EnvironmentVariable(variable))
+
+    def _run(self, server, coro_func):
+        async def run():
+            await server.start()
+            try:
+                return await coro_func(server.url)
+            finally:
+                self.transport.close()
+                await server.stop()
+        return self.loop.run_until_complete(run())
+
+    def test_keep_alive(self):
+        server = FakeServer([response(b'{"a": 1}'), response(b'{"a": 2}')])
+
+        async def run(url):
+            first = await self.transport.request('GET', url + '/v2/shares')
+            second = await self.transport.request(
+                'GET', url + '/v2/shares?limit=1',
+                headers={'X-Auth-Token': 'token'})
+            return first, second
+
+        first, second = self._run(server, run)
+
+        self.assertEqual(200, first.status_code)
+        self.assertEqual({"a": 1}, first.json())
+        self.assertEqual({"a": 2}, second.json())
+        self.assertEqual(1, server.connections)
+        self.assertEqual('GET /v2/shares HTTP/1.1', server.requests[0][0])
+        self.assertEqual('GET /v2/shares?limit=1 HTTP/1.1',
+                         server.requests[1][0])
+        self.assertEqual('token', server.requests[1][1]['X-Auth-Token'])
+
+    def test_connection_reuse_reported(self):
+        server = FakeServer([response(b'{"a": 1}'), response(b'{"a": 2}')])
+        phases = [{}, {}]
+
+        async def run(url):
+            for request_phases in phases:
+                with timings.collect_phases(request_phases):
+                    await self.transport.request('GET', url + '/v2/shares')
+
+        self._run(server, run)
+
+        self.assertEqual([False, True], [p['reused'] for p in phases])
+
+    def test_post_body(self):
+        server = FakeServer([response(status='202 Accepted')])
+
+        async def run(url):
+            return await self.transport.request(
+                'POST', url + '/v2/shares', data='{"share": {}}')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(202, resp.status_code)
+        self.assertEqual('Accepted', resp.reason)
+        self.assertEqual(b'{"share": {}}', server.requests[0][2])
+        self.assertEqual('13', server.requests[0][1]['Content-Length'])
+
+    def test_chunked_gzip_response(self):
+        body = b'{"shares": []}'
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        gzipped = compressor.compress(body) + compressor.flush()
+        raw = (b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n'
+               b'Content-Encoding: gzip\r\n\r\n' +
+               b'%x\r\n' % 5 + gzipped[:5] + b'\r\n' +
+               b'%x\r\n' % (len(gzipped) - 5) + gzipped[5:] + b'\r\n' +
+               b'0\r\n\r\n')
+        server = FakeServer([raw])
+
+        async def run(url):
+            return await self.transport.request('GET', url + '/v2/shares')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(body, resp.content)
+        self.assertEqual(len(gzipped), resp.raw.tell())
+
+    def test_connection_close(self):
+        server = FakeServer([response(headers={'Connection': 'close'}),
+                             response()])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares')
+            await self.transport.request('GET', url + '/v2/shares')
+
+        self._run(server, run)
+
+        self.assertEqual(2, server.connections)
+
+    def test_closed_idle_connection_is_replaced(self):
+        server = FakeServer([response(headers={'X-Drop': '1'}), response()])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares')
+            # Let the server close its side of the pooled connection
+            await asyncio.sleep(0.05)
+            return await self.transport.request('GET', url + '/v2/shares')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(2, server.connections)
+
+    def test_timeout(self):
+        server = FakeServer([None])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares',
+                                         timeout=0.05)
+
+        self.assertRaises(requests.exceptions.Timeout,
+                          self._run, server, run)
+
+    def test_read_timeout(self):
+        server = FakeServer([None])
+
+        async def run(url):
+            try:
+                await self.transport.request('GET', url + '/v2/shares',
+                                             timeout=(1, 0.05))
+            finally:
+                # Let the server see the connection closed
+                await asyncio.sleep(0.05)
+
+        self.assertRaises(requests.exceptions.ReadTimeout,
+                          self._run, server, run)
+
+    def test_connect_timeout(self):
+        server = FakeServer([])
+
+        async def connect(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        async def run(url):
+            with mock.patch.object(asyncio, 'open_connection',
+                                   mock.Mock(side_effect=connect)):
+                await self.transport.request('GET', url + '/v2/shares',
+                                             timeout=(0.05, None))
+
+        self.assertRaises(requests.exceptions.ConnectTimeout,
+                          self._run, server, run)
+
+    def test_connection_refused(self):
+        server = FakeServer([])
+
+        async def run(url):
+            await self.transport.request('GET', 'http://127.0.0.1:1/')
+
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          self._run, server, run)
+
+    def test_closed_reused_connection_resends_idempotent(self):
+        server = FakeServer([response(), b'', response()])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares')
+            return await self.transport.request('DELETE',
+                                                url + '/v2/shares/1')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(3, len(server.requests))
+        self.assertEqual(2, server.connections)
+
+    def test_closed_reused_connection_not_idempotent(self):
+        server = FakeServer([response(), b'', response()])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares')
+            await self.transport.request('POST', url + '/v2/shares',
+                                         data='{"share": {}}')
+
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          self._run, server, run)
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(1, server.connections)
+
+    def test_truncated_chunked_response(self):
+        raw = (b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n'
+               b'Connection: close\r\n\r\n5\r\n{"sha')
+        server = FakeServer([raw])
+
+        async def run(url):
+            await self.transport.request('GET', url + '/v2/shares')
+
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          self._run, server, run)
+
+    def test_http_proxy(self):
+        server = FakeServer([response()])
+
+        async def run(url):
+            self.useFixture(fixtures.EnvironmentVariable('HTTP_PROXY', url))
+            return await self.transport.request(
+                'GET', 'http://manila.example.com:8786/v2/shares?limit=1')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            'GET http://manila.example.com:8786/v2/shares?limit=1 HTTP/1.1',
+            server.requests[0][0])
+        self.assertEqual('manila.example.com:8786',
+                         server.requests[0][1]['Host'])
+
+    def test_http_proxy_credentials(self):
+        server = FakeServer([response()])
+
+        async def run(url):
+            self.useFixture(fixtures.EnvironmentVariable(
+                'HTTP_PROXY', url.replace('://', '://user:secret@')))
+            return await self.transport.request(
+                'GET', 'http://manila.example.com/v2/shares')
+
+        self._run(server, run)
+
+        self.assertEqual('Basic dXNlcjpzZWNyZXQ=',
+                         server.requests[0][1]['Proxy-Authorization'])
+
+    def test_no_proxy(self):
+        server = FakeServer([response()])
+
+        async def run(url):
+            self.useFixture(fixtures.EnvironmentVariable(
+                'HTTP_PROXY', 'http://127.0.0.1:1'))
+            self.useFixture(fixtures.EnvironmentVariable(
+                'NO_PROXY', '127.0.0.1'))
+            return await self.transport.request('GET', url + '/v2/shares')
+
+        resp = self._run(server, run)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual('GET /v2/shares HTTP/1.1', server.requests[0][0])
+
+    def test_https_proxy_refused(self):
+        server = FakeServer([])
+
+        async def run(url):
+            self.useFixture(fixtures.EnvironmentVariable(
+                'HTTPS_PROXY', 'http://127.0.0.1:1'))
+            await self.transport.request('GET', 'https://manila.example.com/')
+
+        self.assertRaises(requests.exceptions.ProxyError,
+                          self._run, server, run)
+
+    def test_https_proxy_server_refused(self):
+        server = FakeServer([])
+
+        async def run(url):
+            self.useFixture(fixtures.EnvironmentVariable(
+                'HTTP_PROXY', 'https://127.0.0.1:1'))
+            await self.transport.request('GET', 'http://manila.example.com/')
+
+        self.assertRaises(requests.exceptions.ProxyError,
+                          self._run, server, run)
+
+    def test_header_value_with_line_break(self):
+        server = FakeServer([])
+
+        async def run(url):
+            await self.transport.request(
+                'GET', url, headers={'X-Auth-Token': 'a\r\nX-Injected: 1'})
+
+        self.assertRaises(requests.exceptions.InvalidHeader,
+                          self._run, server, run)
+        self.assertEqual([], server.requests)
+
+    def test_header_name_with_colon(self):
+        server = FakeServer([])
+
+        async def run(url):
+            await self.transport.request('GET', url, headers={'X-A: b': 'c'})
+
+        self.assertRaises(requests.exceptions.InvalidHeader,
+                          self._run, server, run)
+
+    def test_url_with_line_break(self):
+        server = FakeServer([])
+
+        async def run(url):
+            await self.transport.request('GET', url + 'a\nb')
+
+        self.assertRaises(requests.exceptions.InvalidURL,
+                          self._run, server, run)
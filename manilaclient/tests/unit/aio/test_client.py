@@ -0,0 +1,29 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Tests of manilaclient.aio.client, run on Python 3.5 or newer.
+
+The tests are kept in a separate module, as importing them is a syntax
+error for older interpreters, which would break test discovery.
+"""
+
+import sys
+
+from manilaclient.tests.unit import utils
+
+if sys.version_info >= (3, 5):
+    from manilaclient.tests.unit.aio._client_tests import *  # noqa
+else:
+    class AsyncClientTest(utils.TestCase):
+
+        def test_requires_python_35(self):
+            self.skipTest("manilaclient.aio requires Python 3.5 or newer.")
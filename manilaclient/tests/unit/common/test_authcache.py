@@ -0,0 +1,172 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+import hashlib
+import json
+import os
+import stat
+import time
+
+import fixtures
+import mock
+
+from manilaclient.common import authcache
+from manilaclient.tests.unit import utils
+from manilaclient import utils as utils_module
+
+
+class AuthCacheTest(utils.TestCase):
+
+    def setUp(self):
+        super(AuthCacheTest, self).setUp()
+        self.directory = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'auth')
+        self.cache = authcache.AuthCache(self.directory, stale_duration=60)
+        self.key = self.cache.make_key(auth_url='http://keystone',
+                                       username='user', password='secret')
+        self.expires_at = time.time() + 3600
+
+    def test_set_and_get(self):
+        self.cache.set(self.key, 'token', self.expires_at, 'sharev2',
+                       'http://manila/v2/1234')
+
+        self.assertEqual(('token', self.expires_at, 'http://manila/v2/1234'),
+                         self.cache.get(self.key, 'sharev2'))
+        self.assertIsNone(self.cache.get(self.key, 'share'))
+
+    def test_permissions(self):
+        self.cache.set(self.key, 'token', self.expires_at, 'sharev2',
+                       'http://manila/v2/1234')
+
+        path = os.path.join(self.directory, self.key + '.json')
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEqual(0o700,
+                         stat.S_IMODE(os.stat(self.directory).st_mode))
+        self.assertEqual(sorted([self.key + '.json', 'secret']),
+                         sorted(os.listdir(self.directory)))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(
+            os.path.join(self.directory, 'secret')).st_mode))
+        with open(path) as f:
+            content = f.read()
+        self.assertNotIn('secret', content)
+        self.assertNotIn('user', content)
+
+    def test_get_stale_token(self):
+        self.cache.set(self.key, 'token', time.time() + 30, 'sharev2',
+                       'http://manila/v2/1234')
+
+        self.assertIsNone(self.cache.get(self.key, 'sharev2'))
+
+    def test_get_missing_or_corrupt(self):
+        self.assertIsNone(self.cache.get(self.key, 'sharev2'))
+
+        with open(os.path.join(self.directory, self.key + '.json'),
+                  'w') as f:
+            f.write('{not json')
+
+        self.assertIsNone(self.cache.get(self.key, 'sharev2'))
+
+    def test_endpoints_kept_for_same_token(self):
+        self.cache.set(self.key, 'token', self.expires_at, 'share',
+                       'http://manila/v1/1234')
+        self.cache.set(self.key, 'token', self.expires_at, 'sharev2',
+                       ['http://a/v2/1234', 'http://b/v2/1234'])
+
+        self.assertEqual('http://manila/v1/1234',
+                         self.cache.get(self.key, 'share')[2])
+        self.assertEqual(['http://a/v2/1234', 'http://b/v2/1234'],
+                         self.cache.get(self.key, 'sharev2')[2])
+
+        self.cache.set(self.key, 'new_token', self.expires_at, 'sharev2',
+                       'http://manila/v2/1234')
+
+        self.assertIsNone(self.cache.get(self.key, 'share'))
+
+    def test_set_failure_ignored(self):
+        self.mock_object(utils_module.tempfile, 'mkstemp',
+                         mock.Mock(side_effect=OSError()))
+
+        self.cache.set(self.key, 'token', self.expires_at, 'sharev2',
+                       'http://manila/v2/1234')
+
+        self.assertIsNone(self.cache.get(self.key, 'sharev2'))
+
+    def test_delete(self):
+        self.cache.set(self.key, 'token', self.expires_at, 'sharev2',
+                       'http://manila/v2/1234')
+
+        self.cache.delete(self.key)
+        self.cache.delete(self.key)
+
+        self.assertIsNone(self.cache.get(self.key, 'sharev2'))
+
+    def test_make_key(self):
+        self.assertEqual(self.key, self.cache.make_key(
+            password='secret', username='user', auth_url='http://keystone'))
+        self.assertNotEqual(self.key, self.cache.make_key(
+            auth_url='http://keystone', username='user', password='other'))
+
+    def test_make_key_shares_secret(self):
+        other_cache = authcache.AuthCache(self.directory)
+
+        self.assertEqual(self.key, other_cache.make_key(
+            auth_url='http://keystone', username='user', password='secret'))
+
+    def test_make_key_keyed_by_secret(self):
+        other_directory = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'auth')
+        other_cache = authcache.AuthCache(other_directory)
+
+        self.assertNotEqual(self.key, other_cache.make_key(
+            auth_url='http://keystone', username='user', password='secret'))
+        self.assertNotEqual(self.key, hashlib.sha256(json.dumps(
+            {'auth_url': 'http://keystone', 'username': 'user',
+             'password': 'secret'}, sort_keys=True).encode()).hexdigest())
+
+    def test_make_key_corrupt_secret_replaced(self):
+        path = os.path.join(self.directory, 'secret')
+        with open(path, 'rb') as f:
+            secret = f.read()
+        with open(path, 'wb') as f:
+            f.write(secret[:5])
+        cache = authcache.AuthCache(self.directory)
+
+        key = cache.make_key(auth_url='http://keystone', username='user',
+                             password='secret')
+
+        self.assertIsNotNone(key)
+        self.assertNotEqual(self.key, key)
+        self.assertEqual(key, authcache.AuthCache(self.directory).make_key(
+            auth_url='http://keystone', username='user', password='secret'))
+        with open(path, 'rb') as f:
+            self.assertEqual(authcache.SECRET_SIZE, len(f.read()))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_make_key_secret_failure(self):
+        self.mock_object(authcache.tempfile, 'mkstemp',
+                         mock.Mock(side_effect=OSError()))
+        cache = authcache.AuthCache(self.directory + '2')
+
+        key = cache.make_key(auth_url='http://keystone')
+        cache.set(key, 'token', self.expires_at, 'sharev2',
+                  'http://manila/v2/1234')
+
+        self.assertIsNone(key)
+        self.assertIsNone(cache.get(key, 'sharev2'))
+        cache.delete(key)
+
+    def test_get_expiry(self):
+        auth_ref = mock.Mock(expires=datetime.datetime(1970, 1, 1, 1))
+
+        self.assertEqual(3600, authcache.get_expiry(auth_ref))
+        self.assertIsNone(authcache.get_expiry(mock.Mock(expires=None)))
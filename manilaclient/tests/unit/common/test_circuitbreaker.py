@@ -0,0 +1,126 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from manilaclient.common import circuitbreaker
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+class CircuitBreakerTest(utils.TestCase):
+
+    def setUp(self):
+        super(CircuitBreakerTest, self).setUp()
+        self.now = 1000
+        self.mock_object(circuitbreaker.time, 'time',
+                         mock.Mock(side_effect=lambda: self.now))
+        self.breaker = circuitbreaker.CircuitBreaker(
+            'http://host/', failure_threshold=2, reset_timeout=10)
+
+    def _open(self):
+        self.breaker.record_failure(1)
+        self.breaker.record_failure(1)
+
+    def test_invalid_threshold(self):
+        self.assertRaises(ValueError, circuitbreaker.CircuitBreaker,
+                          'http://host/', failure_threshold=0)
+
+    def test_closed(self):
+        self.breaker.record_failure(1)
+        self.breaker.record_success(1)
+        self.breaker.record_failure(1)
+
+        self.breaker.before_request()
+        self.assertEqual(circuitbreaker.STATE_CLOSED, self.breaker.state)
+
+    def test_opens_after_consecutive_failures(self):
+        self._open()
+
+        self.assertEqual(circuitbreaker.STATE_OPEN, self.breaker.state)
+        error = self.assertRaises(exceptions.CircuitBreakerOpen,
+                                  self.breaker.before_request)
+        self.assertEqual('http://host/', error.endpoint)
+        self.assertEqual(10, error.retry_after)
+        self.assertEqual(1, self.breaker.rejected)
+
+    def test_half_open_probe_success(self):
+        self._open()
+        self.now += 10
+
+        self.breaker.before_request()
+
+        self.assertEqual(circuitbreaker.STATE_HALF_OPEN, self.breaker.state)
+        # Only one probe at a time
+        self.assertRaises(exceptions.CircuitBreakerOpen,
+                          self.breaker.before_request)
+
+        self.breaker.record_success(1)
+
+        self.assertEqual(circuitbreaker.STATE_CLOSED, self.breaker.state)
+        self.breaker.before_request()
+
+    def test_half_open_probe_failure(self):
+        self._open()
+        self.now += 10
+        self.breaker.before_request()
+
+        self.breaker.record_failure(1)
+
+        self.assertEqual(circuitbreaker.STATE_OPEN, self.breaker.state)
+        self.assertEqual(1010, self.breaker.opened_at)
+        self.assertRaises(exceptions.CircuitBreakerOpen,
+                          self.breaker.before_request)
+
+    def test_slow_call_counts_as_failure(self):
+        breaker = circuitbreaker.CircuitBreaker(
+            'http://host/', failure_threshold=1, slow_call_threshold=5)
+
+        breaker.record_success(4)
+        self.assertEqual(circuitbreaker.STATE_CLOSED, breaker.state)
+
+        breaker.record_success(6)
+        self.assertEqual(circuitbreaker.STATE_OPEN, breaker.state)
+
+    def test_latency(self):
+        self.breaker.record_success(1)
+        self.breaker.record_success(2)
+
+        state = self.breaker.to_dict()
+
+        self.assertEqual(2, state['last_latency'])
+        self.assertAlmostEqual(1.2, state['average_latency'])
+        self.assertEqual(2, state['successes'])
+
+
+class CircuitBreakerRegistryTest(utils.TestCase):
+
+    def test_get(self):
+        registry = circuitbreaker.CircuitBreakerRegistry(failure_threshold=3)
+
+        breaker = registry.get('http://host1/')
+
+        self.assertIs(breaker, registry.get('http://host1/'))
+        self.assertIsNot(breaker, registry.get('http://host2/'))
+        self.assertEqual(3, breaker.failure_threshold)
+
+    def test_get_states(self):
+        registry = circuitbreaker.CircuitBreakerRegistry(failure_threshold=1)
+        registry.get('http://host1/').record_failure(1)
+        registry.get('http://host2/')
+
+        states = registry.get_states()
+
+        self.assertEqual(circuitbreaker.STATE_OPEN,
+                         states['http://host1/']['state'])
+        self.assertEqual(circuitbreaker.STATE_CLOSED,
+                         states['http://host2/']['state'])
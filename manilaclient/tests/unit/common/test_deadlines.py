@@ -0,0 +1,66 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+import mock
+
+from manilaclient.common import deadlines
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+class DeadlineTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(DeadlineTestCase, self).setUp()
+        self.now = 100
+        self.mock_object(time, 'time', mock.Mock(side_effect=lambda: self.now))
+
+    def test_no_deadline(self):
+        self.assertIsNone(deadlines.get_remaining())
+        deadlines.check()
+        self.assertTrue(deadlines.allows(1000))
+        self.assertEqual(5, deadlines.clamp_timeout(5))
+        self.assertIsNone(deadlines.clamp_timeout(None))
+
+    def test_deadline(self):
+        with deadlines.deadline(10) as expires_at:
+            self.assertEqual(110, expires_at)
+            self.now += 4
+            self.assertEqual(6, deadlines.get_remaining())
+            self.assertTrue(deadlines.allows(5))
+            self.assertFalse(deadlines.allows(6))
+            self.now += 6
+            self.assertRaises(exceptions.DeadlineExceeded, deadlines.check)
+
+        self.assertIsNone(deadlines.get_remaining())
+
+    def test_nested_deadline_only_shortens(self):
+        with deadlines.deadline(10):
+            with deadlines.deadline(20):
+                self.assertEqual(10, deadlines.get_remaining())
+            with deadlines.deadline(5):
+                self.assertEqual(5, deadlines.get_remaining())
+            with deadlines.deadline(None):
+                self.assertEqual(10, deadlines.get_remaining())
+
+    def test_clamp_timeout(self):
+        with deadlines.deadline(3):
+            self.assertEqual(3, deadlines.clamp_timeout(None))
+            self.assertEqual(2, deadlines.clamp_timeout(2))
+            self.assertEqual(3, deadlines.clamp_timeout(5))
+            self.assertEqual((1, 3), deadlines.clamp_timeout((1, 5)))
+            self.assertEqual((3, 3), deadlines.clamp_timeout((None, None)))
+            self.now += 5
+            self.assertEqual(deadlines.MIN_TIMEOUT,
+                             deadlines.clamp_timeout(5))
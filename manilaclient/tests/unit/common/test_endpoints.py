@@ -0,0 +1,137 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import errno
+import time
+
+import ddt
+import mock
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+
+from manilaclient.common import endpoints
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+@ddt.ddt
+class EndpointPoolTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(EndpointPoolTestCase, self).setUp()
+        self.now = 100
+        self.mock_object(time, 'time', mock.Mock(side_effect=lambda: self.now))
+        self.urls = ['http://a', 'http://b', 'http://c']
+
+    def _choose_urls(self, pool, count):
+        return [pool.choose().url for i in range(count)]
+
+    def test_invalid_strategy(self):
+        self.assertRaises(ValueError, endpoints.EndpointPool, self.urls,
+                          strategy='random')
+
+    def test_no_endpoints(self):
+        self.assertRaises(ValueError, endpoints.EndpointPool, [])
+
+    def test_round_robin(self):
+        pool = endpoints.EndpointPool(self.urls)
+
+        self.assertEqual(self.urls * 2, self._choose_urls(pool, 6))
+
+    def test_least_outstanding(self):
+        pool = endpoints.EndpointPool(
+            self.urls, strategy=endpoints.STRATEGY_LEAST_OUTSTANDING)
+        a, b, c = pool.endpoints
+        a.outstanding = 2
+        b.outstanding = 1
+
+        self.assertEqual(['http://c', 'http://b', 'http://c'],
+                         self._choose_urls(pool, 3))
+        self.assertEqual([2, 2, 2], [e.outstanding for e in pool.endpoints])
+
+    def test_unhealthy_endpoint_skipped_until_recovered(self):
+        pool = endpoints.EndpointPool(self.urls, recovery_time=30)
+
+        pool.release(pool.choose(), success=False)
+
+        self.assertEqual({'http://b', 'http://c'},
+                         set(self._choose_urls(pool, 4)))
+        self.now += 30
+        self.assertIn('http://a', self._choose_urls(pool, 3))
+
+    def test_failure_threshold(self):
+        pool = endpoints.EndpointPool(self.urls, failure_threshold=2)
+        a = pool.endpoints[0]
+
+        pool.release(pool.choose(), success=False)
+        self.assertTrue(pool.get_states()['http://a']['healthy'])
+        a.outstanding += 1
+        pool.release(a, success=True)
+        a.outstanding += 1
+        pool.release(a, success=False)
+        self.assertTrue(pool.get_states()['http://a']['healthy'])
+        a.outstanding += 1
+        pool.release(a, success=False)
+
+        state = pool.get_states()['http://a']
+        self.assertFalse(state['healthy'])
+        self.assertEqual(3, state['failures'])
+        self.assertEqual(2, state['consecutive_failures'])
+        self.assertEqual(0, state['outstanding'])
+
+    def test_all_unhealthy(self):
+        pool = endpoints.EndpointPool(self.urls)
+        for i, endpoint in enumerate(pool.endpoints):
+            self.now = 100 - i
+            endpoint.outstanding += 1
+            pool.release(endpoint, success=False)
+
+        # The endpoint failing the longest time ago is probed
+        self.assertEqual('http://c', pool.choose().url)
+
+    def test_choose_exclude(self):
+        pool = endpoints.EndpointPool(self.urls)
+
+        self.assertEqual('http://c',
+                         pool.choose(exclude=pool.endpoints[:2]).url)
+        self.assertIsNone(pool.choose(exclude=pool.endpoints))
+
+    @ddt.data(
+        (exceptions.InternalServerError(500), True),
+        (exceptions.BadRequest(400), False),
+        (requests.exceptions.ConnectionError(), True),
+        (requests.exceptions.ReadTimeout(), True),
+        (exceptions.CircuitBreakerOpen('http://a'), True),
+        (ValueError(), False),
+    )
+    @ddt.unpack
+    def test_is_endpoint_failure(self, error, expected):
+        self.assertEqual(expected, endpoints.is_endpoint_failure(error))
+
+    @ddt.data(
+        (requests.exceptions.ConnectTimeout(), True),
+        (requests.exceptions.ReadTimeout(), False),
+        (requests.exceptions.ConnectionError(
+            urllib3_exceptions.MaxRetryError(
+                None, '/', urllib3_exceptions.NewConnectionError(
+                    None, 'refused'))), True),
+        (requests.exceptions.ConnectionError(
+            OSError(errno.ECONNREFUSED, 'refused')), True),
+        (requests.exceptions.ConnectionError(
+            OSError(errno.ECONNRESET, 'reset')), False),
+        (requests.exceptions.ConnectionError(), False),
+        (exceptions.CircuitBreakerOpen('http://a'), True),
+        (exceptions.InternalServerError(500), False),
+    )
+    @ddt.unpack
+    def test_is_connect_error(self, error, expected):
+        self.assertEqual(expected, endpoints.is_connect_error(error))
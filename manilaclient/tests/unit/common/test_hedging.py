@@ -0,0 +1,59 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from manilaclient.common import hedging
+from manilaclient.tests.unit import utils
+
+
+class HedgingPolicyTestCase(utils.TestCase):
+
+    def test_no_delay_without_samples(self):
+        policy = hedging.HedgingPolicy(min_samples=3)
+
+        self.assertIsNone(policy.get_delay('shares.get'))
+        policy.record_latency('shares.get', 0.1)
+        policy.record_latency('shares.get', 0.1)
+        self.assertIsNone(policy.get_delay('shares.get'))
+
+    def test_delay_is_percentile_of_operation(self):
+        policy = hedging.HedgingPolicy(percentile=90, min_samples=10)
+        for i in range(1, 11):
+            policy.record_latency('shares.get', i / 10.0)
+            policy.record_latency('shares.list', 5)
+
+        self.assertEqual(0.9, policy.get_delay('shares.get'))
+        self.assertEqual(5, policy.get_delay('shares.list'))
+
+    def test_min_delay(self):
+        policy = hedging.HedgingPolicy(min_samples=1, min_delay=0.5)
+        policy.record_latency('shares.get', 0.01)
+
+        self.assertEqual(0.5, policy.get_delay('shares.get'))
+
+    def test_window(self):
+        policy = hedging.HedgingPolicy(min_samples=1, window=2)
+        for latency in (10, 1, 1):
+            policy.record_latency('shares.get', latency)
+
+        self.assertEqual(1, policy.get_delay('shares.get'))
+
+    def test_extra_load_capped(self):
+        policy = hedging.HedgingPolicy(max_extra_load=0.25)
+
+        for i in range(3):
+            policy.get_delay('shares.get')
+        self.assertFalse(policy.try_hedge())
+        policy.get_delay('shares.get')
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        self.assertEqual(4, policy.requests)
+        self.assertEqual(1, policy.hedged)
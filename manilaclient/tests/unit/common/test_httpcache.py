@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from manilaclient.common import httpcache
+from manilaclient.tests.unit import utils
+
+
+class ResponseCacheTest(utils.TestCase):
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, httpcache.ResponseCache, 0)
+
+    def test_store_and_get(self):
+        cache = httpcache.ResponseCache(2)
+
+        cache.store(('http://h/v2/types', '2.6', None), b'{}', etag='"1"')
+        entry = cache.get(('http://h/v2/types', '2.6', None))
+
+        self.assertEqual(b'{}', entry.content)
+        self.assertEqual({'If-None-Match': '"1"'},
+                         entry.conditional_headers())
+        self.assertIsNone(cache.get(('http://h/v2/types', '2.5', None)))
+
+    def test_store_last_modified(self):
+        cache = httpcache.ResponseCache(2)
+
+        cache.store(('u', None, None), b'{}', last_modified='fake_date')
+
+        self.assertEqual({'If-Modified-Since': 'fake_date'},
+                         cache.get(('u', None, None)).conditional_headers())
+
+    def test_store_without_validators(self):
+        cache = httpcache.ResponseCache(2)
+        cache.store(('u', None, None), b'{"a": 1}', etag='"1"')
+
+        cache.store(('u', None, None), b'{"a": 2}')
+
+        self.assertIsNone(cache.get(('u', None, None)))
+
+    def test_lru_eviction(self):
+        cache = httpcache.ResponseCache(2)
+        cache.store(('a', None, None), b'a', etag='a')
+        cache.store(('b', None, None), b'b', etag='b')
+        cache.get(('a', None, None))
+
+        cache.store(('c', None, None), b'c', etag='c')
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNotNone(cache.get(('a', None, None)))
+        self.assertIsNone(cache.get(('b', None, None)))
+        self.assertIsNotNone(cache.get(('c', None, None)))
+
+    def test_invalidate(self):
+        cache = httpcache.ResponseCache(10)
+        urls = ('http://h/v2/shares', 'http://h/v2/shares/detail?a=b',
+                'http://h/v2/shares?is_public=True', 'http://h/v2/shares/1',
+                'http://h/v2/share-networks', 'http://h/v2/sharesx')
+        for url in urls:
+            cache.store((url, '2.6', None), b'{}', etag='"1"')
+
+        cache.invalidate('http://h/v2/shares')
+
+        self.assertEqual(
+            ['http://h/v2/share-networks', 'http://h/v2/sharesx'],
+            sorted(key[0] for key in cache._entries))
+
+    def test_clear(self):
+        cache = httpcache.ResponseCache(10)
+        cache.store(('a', None, None), b'a', etag='a')
+
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
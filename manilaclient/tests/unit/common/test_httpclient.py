@@ -10,11 +10,33 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import errno
+import ssl
+import threading
+import time
+import zlib
+
+import ddt
 import mock
 import requests
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
 
 import manilaclient
+from manilaclient.common import circuitbreaker
+from manilaclient.common import constants
+from manilaclient.common import deadlines
+from manilaclient.common import hedging
 from manilaclient.common import httpclient
+from manilaclient.common import jsoncodec
+from manilaclient.common import metrics
+from manilaclient.common import ratelimit
+from manilaclient.common import requestcontext
+from manilaclient.common import retry
+from manilaclient.common import timings
+from manilaclient.common import tokens
+from manilaclient.common import tracing
+from manilaclient.common import transports
 from manilaclient import exceptions
 from manilaclient.tests.unit import utils
 
@@ -78,17 +100,19 @@ def get_authed_client(retries=0):
     return cl
 
 
+@ddt.ddt
 class ClientTest(utils.TestCase):
 
     def setUp(self):
         super(ClientTest, self).setUp()
         self.max_version = manilaclient.API_MAX_VERSION
         self.max_version_str = self.max_version.get_string()
+        self.mock_object(httpclient, 'sleep')
 
     def test_get(self):
         cl = get_authed_client()
 
-        @mock.patch.object(requests, "request", mock_request)
+        @mock.patch.object(requests.Session, "request", mock_request)
         @mock.patch('time.time', mock.Mock(return_value=1234))
         def test_get_call():
             resp, body = cl.get("/hi")
@@ -97,6 +121,7 @@ class ClientTest(utils.TestCase):
                 "User-Agent": fake_user_agent,
                 cl.API_VERSION_HEADER: self.max_version_str,
                 'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
             }
             mock_request.assert_called_with(
                 "GET",
@@ -117,7 +142,7 @@ class ClientTest(utils.TestCase):
             next_request = self.requests.pop(0)
             return next_request(*args, **kwargs)
 
-        @mock.patch.object(requests, "request", request)
+        @mock.patch.object(requests.Session, "request", request)
         @mock.patch('time.time', mock.Mock(return_value=1234))
         def test_get_call():
             resp, body = cl.get("/hi")
@@ -134,7 +159,7 @@ class ClientTest(utils.TestCase):
             next_request = self.requests.pop(0)
             return next_request(*args, **kwargs)
 
-        @mock.patch.object(requests, "request", request)
+        @mock.patch.object(requests.Session, "request", request)
         @mock.patch('time.time', mock.Mock(return_value=1234))
         def test_get_call():
             resp, body = cl.get("/hi")
@@ -151,7 +176,7 @@ class ClientTest(utils.TestCase):
             next_request = self.requests.pop(0)
             return next_request(*args, **kwargs)
 
-        @mock.patch.object(requests, "request", request)
+        @mock.patch.object(requests.Session, "request", request)
         @mock.patch('time.time', mock.Mock(return_value=1234))
         def test_get_call():
             resp, body = cl.get("/hi")
@@ -159,7 +184,7 @@ class ClientTest(utils.TestCase):
         self.assertRaises(exceptions.BadRequest, test_get_call)
         self.assertEqual(self.requests, [mock_request])
 
-    def test_get_retry_400_socket(self):
+    def test_get_no_retry_400_with_retries(self):
         cl = get_authed_client(retries=1)
 
         self.requests = [bad_400_request, mock_request]
@@ -168,24 +193,86 @@ class ClientTest(utils.TestCase):
             next_request = self.requests.pop(0)
             return next_request(*args, **kwargs)
 
-        @mock.patch.object(requests, "request", request)
+        @mock.patch.object(requests.Session, "request", request)
         @mock.patch('time.time', mock.Mock(return_value=1234))
         def test_get_call():
             resp, body = cl.get("/hi")
 
+        self.assertRaises(exceptions.BadRequest, test_get_call)
+        self.assertEqual(self.requests, [mock_request])
+
+    def test_post_not_retried(self):
+        cl = get_authed_client(retries=1)
+
+        self.requests = [bad_500_request, mock_request]
+
+        def request(*args, **kwargs):
+            next_request = self.requests.pop(0)
+            return next_request(*args, **kwargs)
+
+        @mock.patch.object(requests.Session, "request", request)
+        def test_post_call():
+            cl.post("/hi", body=[1, 2, 3])
+
+        self.assertRaises(exceptions.InternalServerError, test_post_call)
+        self.assertEqual(self.requests, [mock_request])
+
+    def test_get_retry_connection_error(self):
+        cl = get_authed_client(retries=1)
+
+        self.requests = [
+            mock.Mock(side_effect=requests.exceptions.ConnectionError()),
+            mock_request,
+        ]
+
+        def request(*args, **kwargs):
+            next_request = self.requests.pop(0)
+            return next_request(*args, **kwargs)
+
+        @mock.patch.object(requests.Session, "request", request)
+        def test_get_call():
+            resp, body = cl.get("/hi")
+            self.assertEqual({"hi": "there"}, body)
+
+        test_get_call()
+        self.assertEqual(self.requests, [])
+
+    def test_get_retry_honors_retry_after(self):
+        cl = get_authed_client(retries=1)
+
+        self.requests = [retry_after_mock_request, mock_request]
+
+        def request(*args, **kwargs):
+            next_request = self.requests.pop(0)
+            return next_request(*args, **kwargs)
+
+        @mock.patch.object(requests.Session, "request", request)
+        def test_get_call():
+            cl.get("/hi")
+
         test_get_call()
         self.assertEqual(self.requests, [])
+        httpclient.sleep.assert_called_once_with(5)
+
+    def test_retry_policy_option(self):
+        policy = retry.RetryPolicy(retries=5)
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, retry_policy=policy)
+
+        self.assertIs(policy, cl.retry_policy)
 
     def test_post(self):
         cl = get_authed_client()
 
-        @mock.patch.object(requests, "request", mock_request)
+        @mock.patch.object(requests.Session, "request", mock_request)
         def test_post_call():
             cl.post("/hi", body=[1, 2, 3])
             headers = {
                 "X-Auth-Token": "token",
                 "Content-Type": "application/json",
                 'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
                 "X-Openstack-Manila-Api-Version": self.max_version_str,
                 "User-Agent": fake_user_agent
             }
@@ -193,7 +280,1149 @@ class ClientTest(utils.TestCase):
                 "POST",
                 "http://example.com/hi",
                 headers=headers,
-                data='[1, 2, 3]',
+                data=cl.codec.dumps([1, 2, 3]),
                 **self.TEST_REQUEST_BASE)
 
         test_post_call()
+
+    def test_requests_reuse_client_session(self):
+        cl = get_authed_client()
+        session = cl.http
+
+        with mock.patch.object(requests.Session, "request",
+                               mock_request):
+            cl.get("/hi")
+            cl.get("/hi")
+
+        self.assertIs(session, cl.http)
+
+    def test_connection_pool_options(self):
+        cl = httpclient.HTTPClient("https://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   pool_connections=3, pool_maxsize=7)
+
+        adapter = cl.http.get_adapter("https://example.com")
+        self.assertIsInstance(adapter, httpclient.PoolingHTTPAdapter)
+        self.assertIsNotNone(adapter.ssl_context)
+        self.assertEqual(3, adapter._pool_connections)
+        self.assertEqual(7, adapter._pool_maxsize)
+        self.assertIs(adapter, cl.http.get_adapter("http://example.com"))
+
+    def test_insecure_ssl_context(self):
+        cl = httpclient.HTTPClient("https://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   insecure=True)
+
+        ssl_context = cl.http.get_adapter("https://example.com").ssl_context
+        self.assertFalse(ssl_context.check_hostname)
+        self.assertEqual(ssl.CERT_NONE, ssl_context.verify_mode)
+
+    def test_idle_connections_dropped(self):
+        cl = httpclient.HTTPClient("http://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   pool_idle_timeout=30)
+        adapter = cl.http.get_adapter("http://example.com")
+        self.mock_object(adapter, 'close')
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            with mock.patch('time.time', mock.Mock(return_value=100)):
+                cl.get("/hi")
+            with mock.patch('time.time', mock.Mock(return_value=120)):
+                cl.get("/hi")
+            self.assertFalse(adapter.close.called)
+            with mock.patch('time.time', mock.Mock(return_value=151)):
+                cl.get("/hi")
+
+        adapter.close.assert_called_once_with()
+
+    def test_get_decodes_body_with_client_codec(self):
+        codec = mock.Mock(spec=jsoncodec.JSONCodec)
+        codec.loads.return_value = {"hi": "there"}
+        cl = httpclient.HTTPClient("http://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   json_codec=codec)
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            resp, body = cl.get("/hi")
+
+        codec.loads.assert_called_once_with(b'{"hi": "there"}')
+        self.assertEqual({"hi": "there"}, body)
+
+    def test_error_body_is_decoded_once(self):
+        cl = get_authed_client()
+        response = utils.TestResponse({
+            "status_code": 404,
+            "text": '{"itemNotFound": {"message": "Share not found."}}',
+            "headers": {"Content-Type": "application/json"},
+        })
+        self.mock_object(response, 'json')
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=response)):
+            exc = self.assertRaises(exceptions.NotFound, cl.get, "/hi")
+
+        self.assertEqual("Share not found.", exc.message)
+        self.assertFalse(response.json.called)
+
+    def test_get_stream(self):
+        cl = get_authed_client()
+        response = mock.Mock(status_code=200)
+        request = mock.Mock(return_value=response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/hi", stream=True)
+
+        self.assertIs(response, resp)
+        self.assertIsNone(body)
+        self.assertTrue(request.call_args[1]['stream'])
+
+    def test_get_stream_error(self):
+        cl = get_authed_client()
+
+        with mock.patch.object(requests.Session, "request", bad_400_request):
+            self.assertRaises(exceptions.BadRequest,
+                              cl.get, "/hi", stream=True)
+
+    def test_post_compressed_body(self):
+        cl = httpclient.HTTPClient("http://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   json_codec='json',
+                                   request_compression_threshold=100)
+        body = {'metadata': dict(('key%s' % i, 'value') for i in range(50))}
+
+        with mock.patch.object(requests.Session, "request",
+                               mock_request):
+            cl.post("/hi", body=body)
+
+        kwargs = mock_request.call_args[1]
+        self.assertEqual('gzip', kwargs['headers']['Content-Encoding'])
+        self.assertEqual(body, cl.codec.loads(
+            zlib.decompress(kwargs['data'], 31)))
+        stats = cl.transfer_stats
+        self.assertEqual(len(cl.codec.dumps(body)), stats.bytes_sent)
+        self.assertEqual(len(kwargs['data']), stats.wire_bytes_sent)
+        self.assertGreater(stats.request_compression_ratio, 1)
+
+    def test_post_small_body_not_compressed(self):
+        cl = httpclient.HTTPClient("http://example.com", "token",
+                                   fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   json_codec='json',
+                                   request_compression_threshold=100)
+
+        with mock.patch.object(requests.Session, "request",
+                               mock_request):
+            cl.post("/hi", body=[1, 2, 3])
+
+        kwargs = mock_request.call_args[1]
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+        self.assertEqual('[1, 2, 3]', kwargs['data'])
+        self.assertEqual(1.0, cl.transfer_stats.request_compression_ratio)
+
+    def test_response_compression_stats(self):
+        cl = get_authed_client()
+        response = utils.TestResponse({
+            "status_code": 200,
+            "text": '{"hi": "%s"}' % ('there' * 100),
+            "headers": {"Content-Encoding": "gzip"},
+        })
+        response.raw = mock.Mock()
+        response.raw.tell.return_value = 50
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=response)):
+            cl.get("/hi")
+
+        stats = cl.transfer_stats.to_dict()
+        self.assertEqual(1, stats['responses'])
+        self.assertEqual(len(response.content), stats['bytes_received'])
+        self.assertEqual(50, stats['wire_bytes_received'])
+        self.assertEqual(len(response.content) / 50.0,
+                         stats['response_compression_ratio'])
+
+    def _get_caching_client(self):
+        return httpclient.HTTPClient("http://example.com/v2/tenant", "token",
+                                     fake_user_agent,
+                                     api_version=manilaclient.API_MAX_VERSION,
+                                     http_cache_size=10)
+
+    def test_conditional_get(self):
+        cl = self._get_caching_client()
+        etag_response = utils.TestResponse({
+            "status_code": 200,
+            "text": '{"hi": "there"}',
+            "headers": {"ETag": '"fake-etag"'},
+        })
+        not_modified_response = utils.TestResponse({"status_code": 304})
+        request = mock.Mock(
+            side_effect=[etag_response, not_modified_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            first = cl.get("/types")
+            second = cl.get("/types")
+
+        self.assertNotIn('If-None-Match',
+                         request.call_args_list[0][1]['headers'])
+        self.assertEqual('"fake-etag"',
+                         request.call_args_list[1][1]['headers'][
+                             'If-None-Match'])
+        self.assertEqual({"hi": "there"}, first[1])
+        self.assertEqual({"hi": "there"}, second[1])
+        self.assertIsNot(first[1], second[1])
+        self.assertIs(not_modified_response, second[0])
+        self.assertEqual(1, cl.response_cache.hits)
+
+    def test_conditional_get_cache_invalidated_by_write(self):
+        cl = self._get_caching_client()
+        etag_response = utils.TestResponse({
+            "status_code": 200,
+            "text": '{"share": {}}',
+            "headers": {"ETag": '"fake-etag"'},
+        })
+        request = mock.Mock(
+            side_effect=[etag_response, fake_response, fake_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.get("/shares/1")
+            cl.post("/shares/1/action", body={"os-extend": {}})
+            cl.get("/shares/1")
+
+        self.assertEqual(0, len(cl.response_cache))
+        self.assertNotIn('If-None-Match',
+                         request.call_args_list[2][1]['headers'])
+
+    def test_conditional_get_disabled_by_default(self):
+        cl = get_authed_client()
+
+        self.assertIsNone(cl.response_cache)
+
+    def test_circuit_breaker_fails_fast(self):
+        registry = circuitbreaker.CircuitBreakerRegistry(failure_threshold=2)
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, retries=5,
+            circuit_breakers=registry)
+        request = mock.Mock(return_value=bad_500_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(exceptions.CircuitBreakerOpen, cl.get, "/hi")
+            self.assertRaises(exceptions.CircuitBreakerOpen, cl.get, "/hi")
+
+        # Two attempts opened the circuit, further retries and requests
+        # were not sent at all
+        self.assertEqual(2, request.call_count)
+        states = cl.get_circuit_breaker_states()
+        self.assertEqual(circuitbreaker.STATE_OPEN,
+                         states["http://example.com/"]["state"])
+
+    def test_circuit_breaker_ignores_client_errors(self):
+        registry = circuitbreaker.CircuitBreakerRegistry(failure_threshold=1)
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION,
+            circuit_breakers=registry)
+
+        with mock.patch.object(requests.Session, "request", bad_400_request):
+            self.assertRaises(exceptions.BadRequest, cl.get, "/hi")
+            self.assertRaises(exceptions.BadRequest, cl.get, "/hi")
+
+        self.assertEqual(
+            circuitbreaker.STATE_CLOSED,
+            cl.get_circuit_breaker_states()["http://example.com/"]["state"])
+
+    def test_circuit_breaker_connection_error(self):
+        registry = circuitbreaker.CircuitBreakerRegistry(failure_threshold=1)
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION,
+            circuit_breakers=registry)
+        request = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              cl.get, "/hi")
+            self.assertRaises(exceptions.CircuitBreakerOpen, cl.get, "/hi")
+
+        self.assertEqual(1, request.call_count)
+
+    def test_circuit_breaker_disabled_by_default(self):
+        cl = get_authed_client()
+
+        self.assertIsNone(cl.circuit_breakers)
+        self.assertEqual({}, cl.get_circuit_breaker_states())
+
+    def test_experimental_header_from_request_context(self):
+        cl = get_authed_client()
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            with requestcontext.experimental_api.enabled():
+                cl.get("/hi")
+            experimental_headers = mock_request.call_args[1]['headers']
+            cl.get("/hi")
+            headers = mock_request.call_args[1]['headers']
+
+        self.assertEqual(
+            'true', experimental_headers[constants.EXPERIMENTAL_HTTP_HEADER])
+        self.assertNotIn(constants.EXPERIMENTAL_HTTP_HEADER, headers)
+
+    def test_timings_recorded(self):
+        collector = timings.TimingCollector()
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION,
+            timing_collector=collector)
+
+        def request(*args, **kwargs):
+            timings.record_phase('connect', 0.25)
+            return fake_response
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.get("/shares/5678?all_tenants=1")
+            cl.get("/hi")
+
+        recorded = cl.get_timings()
+        self.assertEqual(2, len(recorded))
+        self.assertEqual('GET', recorded[0].method)
+        self.assertEqual('/v2/{id}/shares/{id}?all_tenants', recorded[0].url)
+        self.assertEqual(200, recorded[0].status)
+        self.assertEqual(0.25, recorded[0].connect)
+        self.assertIsNone(recorded[0].tls)
+        self.assertIsNotNone(recorded[0].decode)
+        self.assertIsNotNone(recorded[0].total)
+        self.assertEqual(len(fake_response.content),
+                         recorded[0].bytes_received)
+        summary = cl.get_timings_summary()
+        self.assertEqual(['/v2/{id}/shares/{id}?all_tenants', '/v2/{id}/hi'],
+                         [item['url'] for item in summary])
+
+        cl.reset_timings()
+        self.assertEqual([], cl.get_timings())
+
+    def test_timings_recorded_on_error(self):
+        collector = timings.TimingCollector()
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION,
+            timing_collector=collector)
+        request = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+        with mock.patch.object(requests.Session, "request", bad_400_request):
+            self.assertRaises(exceptions.BadRequest, cl.get, "/hi")
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              cl.get, "/hi")
+
+        self.assertEqual([400, None],
+                         [timing.status for timing in collector.get_timings()])
+        self.assertEqual(2, collector.summary()[0]['errors'])
+
+    def test_timings_disabled_by_default(self):
+        cl = get_authed_client()
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            cl.get("/hi")
+
+        self.assertEqual([], cl.get_timings())
+        self.assertEqual([], cl.get_timings_summary())
+
+    def test_timed_connection_pools(self):
+        cl = get_authed_client()
+
+        adapter = cl.http.get_adapter("http://example.com")
+        pool = adapter.poolmanager.connection_from_url("https://example.com")
+
+        self.assertIs(httpclient.TimedHTTPSConnection, pool.ConnectionCls)
+
+    def test_metrics_recorded(self):
+        registry = metrics.MetricsRegistry()
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, retries=1,
+            metrics=registry)
+        self.requests = [bad_500_request, mock_request, mock_request]
+
+        def request(*args, **kwargs):
+            return self.requests.pop(0)(*args, **kwargs)
+
+        with mock.patch.object(requests.Session, "request", request):
+            with requestcontext.operation.scoped('shares.get'):
+                cl.get("/shares/5678")
+            cl.get("/hi")
+
+        self.assertEqual(1, registry.requests.get(
+            operation='shares.get', method='GET', status='500'))
+        self.assertEqual(1, registry.requests.get(
+            operation='shares.get', method='GET', status='200'))
+        self.assertEqual(1, registry.retries.get(operation='shares.get'))
+        # Requests sent out of a manager operation are labelled by URL
+        self.assertEqual(1, registry.requests.get(
+            operation='/v2/{id}/hi', method='GET', status='200'))
+        # Mocked sessions do not report connection reuse
+        self.assertEqual(0, registry.connections.get(reused='true'))
+        self.assertEqual(0, registry.connections.get(reused='false'))
+
+    def test_request_spans(self):
+        tracer = tracing.InMemoryTracer()
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, retries=1,
+            tracer=tracer)
+        self.requests = [bad_500_request, mock_request]
+
+        def request(*args, **kwargs):
+            return self.requests.pop(0)(*args, **kwargs)
+
+        with mock.patch.object(requests.Session, "request", request):
+            with tracing.start_span(tracer, 'ShareManager.get') as parent:
+                cl.get("/shares/5678")
+
+        span = tracer.get_spans('GET /v2/{id}/shares/{id}')[0]
+        self.assertIs(parent, span.parent)
+        self.assertEqual({
+            'http.method': 'GET',
+            'http.url': 'http://example.com/v2/1234/shares/5678',
+            'http.status_code': 200,
+            'retry.attempts': 2,
+            'openstack.request_id': 'fake-request-id',
+        }, span.attributes)
+        self.assertEqual(['retry'], [event[0] for event in span.events])
+        self.assertEqual(1, span.events[0][1]['attempt'])
+
+    def test_request_span_error(self):
+        tracer = tracing.InMemoryTracer()
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, tracer=tracer)
+
+        with mock.patch.object(requests.Session, "request", bad_400_request):
+            self.assertRaises(exceptions.BadRequest, cl.get, "/hi")
+
+        span = tracer.get_spans()[0]
+        self.assertEqual(400, span.attributes['http.status_code'])
+        self.assertIsInstance(span.exception, exceptions.BadRequest)
+
+    def test_coalesced_requests(self):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, coalesce_requests=True)
+        bodies = []
+
+        def request(*args, **kwargs):
+            # Let the other thread join the request in progress
+            deadline = time.time() + 5
+            while cl.coalesced_requests < 1 and time.time() < deadline:
+                time.sleep(0.001)
+            return fake_response
+        request = mock.Mock(side_effect=request)
+
+        def get():
+            bodies.append(cl.get("/hi")[1])
+
+        with mock.patch.object(requests.Session, "request", request):
+            threads = [threading.Thread(target=get) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(1, request.call_count)
+        self.assertEqual(1, cl.coalesced_requests)
+        self.assertEqual([{"hi": "there"}] * 2, bodies)
+        self.assertIsNot(bodies[0], bodies[1])
+
+    def test_coalesced_requests_key(self):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, coalesce_requests=True)
+
+        key = cl._get_single_flight_key("http://example.com/hi", "GET", {})
+        with requestcontext.experimental_api.enabled():
+            experimental_key = cl._get_single_flight_key(
+                "http://example.com/hi", "GET", {})
+
+        self.assertIsNotNone(key)
+        self.assertNotEqual(key, experimental_key)
+        self.assertIsNone(cl._get_single_flight_key(
+            "http://example.com/hi", "POST", {}))
+        self.assertIsNone(cl._get_single_flight_key(
+            "http://example.com/hi", "GET", {'stream': True}))
+
+    def test_coalesced_requests_disabled_by_default(self):
+        cl = get_authed_client()
+
+        self.assertIsNone(cl._get_single_flight_key(
+            "http://example.com/hi", "GET", {}))
+        self.assertEqual(0, cl.coalesced_requests)
+
+    def test_rate_limiter(self):
+        limiter = ratelimit.RateLimiter(loader=mock.Mock(return_value=[]))
+        self.mock_object(limiter, 'get_delay', mock.Mock(return_value=2))
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, rate_limiter=limiter)
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            cl.get("/shares/detail?limit=1")
+            cl.get("/shares/detail")
+
+        limiter.loader.assert_called_once_with()
+        limiter.get_delay.assert_called_with('GET', '/shares/detail',
+                                             max_delay=None)
+        httpclient.sleep.assert_has_calls([mock.call(2), mock.call(2)])
+
+    def test_rate_limiter_load_failure(self):
+        limiter = ratelimit.RateLimiter(
+            loader=mock.Mock(side_effect=exceptions.NotFound(404)))
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, rate_limiter=limiter)
+
+        with mock.patch.object(requests.Session, "request", mock_request):
+            cl.get("/shares")
+            cl.get("/shares")
+
+        limiter.loader.assert_called_once_with()
+        self.assertFalse(httpclient.sleep.called)
+
+    def _get_multi_endpoint_client(self, **kwargs):
+        return httpclient.HTTPClient(
+            ["http://one.example.com/v2/1234",
+             "http://two.example.com/v2/1234"], "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, **kwargs)
+
+    def test_single_endpoint_not_balanced(self):
+        cl = get_authed_client()
+
+        self.assertIsNone(cl.endpoints)
+        self.assertEqual({}, cl.get_endpoint_states())
+
+    def test_endpoints_round_robin(self):
+        cl = self._get_multi_endpoint_client()
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            for i in range(3):
+                cl.get("/shares?limit=1")
+            cl.get_with_base_url("")
+
+        self.assertEqual(
+            ["http://one.example.com/v2/1234/shares?limit=1",
+             "http://two.example.com/v2/1234/shares?limit=1",
+             "http://one.example.com/v2/1234/shares?limit=1",
+             "http://two.example.com/"],
+            [c[0][1] for c in req.call_args_list])
+        self.assertEqual("http://one.example.com/v2/1234", cl.endpoint_url)
+
+    def test_set_endpoint_url_and_api_version(self):
+        cl = get_authed_client()
+
+        cl.set_endpoint_url(["http://one.example.com/v1/1234",
+                             "http://two.example.com/v1/1234"])
+        cl.set_api_version(manilaclient.API_DEPRECATED_VERSION)
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            cl.get("/shares")
+            cl.get("/shares")
+
+        self.assertEqual(
+            ["http://one.example.com/v1/1234/shares",
+             "http://two.example.com/v1/1234/shares"],
+            [c[0][1] for c in req.call_args_list])
+        self.assertEqual(
+            manilaclient.API_DEPRECATED_VERSION.get_string(),
+            req.call_args[1]['headers'][cl.API_VERSION_HEADER])
+
+        cl.set_endpoint_url("http://one.example.com/v2/1234")
+
+        self.assertIsNone(cl.endpoints)
+        self.assertEqual("http://one.example.com/", cl.base_url)
+
+    def test_endpoint_failover_on_server_error(self):
+        cl = self._get_multi_endpoint_client()
+        request = mock.Mock(side_effect=[bad_500_response, fake_response,
+                                         fake_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/shares")
+            cl.get("/shares")
+
+        self.assertEqual({"hi": "there"}, body)
+        self.assertEqual(
+            ["http://one.example.com/v2/1234/shares",
+             "http://two.example.com/v2/1234/shares",
+             "http://two.example.com/v2/1234/shares"],
+            [c[0][1] for c in request.call_args_list])
+        self.assertFalse(httpclient.sleep.called)
+        states = cl.get_endpoint_states()
+        self.assertFalse(states["http://one.example.com/v2/1234"]["healthy"])
+        self.assertEqual(
+            1, states["http://one.example.com/v2/1234"]["failures"])
+        self.assertTrue(states["http://two.example.com/v2/1234"]["healthy"])
+        self.assertEqual(
+            2, states["http://two.example.com/v2/1234"]["requests"])
+
+    def test_endpoint_failover_all_failed(self):
+        cl = self._get_multi_endpoint_client()
+        request = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              cl.get, "/shares")
+
+        self.assertEqual(2, request.call_count)
+        for state in cl.get_endpoint_states().values():
+            self.assertEqual(0, state["outstanding"])
+            self.assertFalse(state["healthy"])
+
+    def test_endpoint_no_failover_on_client_error(self):
+        cl = self._get_multi_endpoint_client()
+
+        req = mock.Mock(return_value=bad_400_response)
+
+        with mock.patch.object(requests.Session, "request", req):
+            self.assertRaises(exceptions.BadRequest, cl.get, "/shares")
+
+        self.assertEqual(1, req.call_count)
+        self.assertTrue(all(state["healthy"] for state in
+                            cl.get_endpoint_states().values()))
+
+    def test_endpoint_post_not_failed_over_on_server_error(self):
+        cl = self._get_multi_endpoint_client()
+
+        req = mock.Mock(return_value=bad_500_response)
+
+        with mock.patch.object(requests.Session, "request", req):
+            self.assertRaises(exceptions.InternalServerError,
+                              cl.post, "/shares", body={})
+
+        self.assertEqual(1, req.call_count)
+
+    def test_endpoint_post_failed_over_on_refused_connection(self):
+        cl = self._get_multi_endpoint_client()
+        refused = requests.exceptions.ConnectionError(
+            mock.Mock(reason=OSError(errno.ECONNREFUSED, "refused")))
+        request = mock.Mock(side_effect=[refused, fake_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.post("/shares", body={})
+
+        self.assertEqual("http://two.example.com/v2/1234/shares",
+                         request.call_args[0][1])
+
+    def test_endpoint_failover_span_event(self):
+        tracer = tracing.InMemoryTracer()
+        cl = self._get_multi_endpoint_client(tracer=tracer)
+        request = mock.Mock(side_effect=[bad_500_response, fake_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.get("/shares")
+
+        span = tracer.get_spans()[0]
+        self.assertEqual(1, span.attributes["retry.attempts"])
+        self.assertEqual('failover', span.events[0][0])
+        self.assertEqual("http://two.example.com/v2/1234",
+                         span.events[0][1]["next_endpoint"])
+
+    def _get_hedging_policy(self, latency=0.01, max_extra_load=1):
+        policy = hedging.HedgingPolicy(min_samples=1,
+                                       max_extra_load=max_extra_load)
+        policy.record_latency('/v2/{id}/shares/{id}', latency)
+        return policy
+
+    def _get_slow_request(self, is_slow):
+        """Returns request mock blocking until the event is set."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def request(method, url, **kwargs):
+            if is_slow(url):
+                release.wait(5)
+                return fake_response
+            return utils.TestResponse({"status_code": 200,
+                                       "text": '{"fast": true}'})
+        return mock.Mock(side_effect=request), release
+
+    def test_hedged_get(self):
+        registry = metrics.MetricsRegistry()
+        policy = self._get_hedging_policy()
+        cl = self._get_multi_endpoint_client(hedging_policy=policy,
+                                             metrics=registry)
+        request, release = self._get_slow_request(
+            lambda url: url.startswith("http://one."))
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/shares/1234")
+
+        self.assertEqual({"fast": True}, body)
+        self.assertEqual(
+            ["http://one.example.com/v2/1234/shares/1234",
+             "http://two.example.com/v2/1234/shares/1234"],
+            [c[0][1] for c in request.call_args_list])
+        self.assertEqual(1, policy.hedged)
+        self.assertEqual(
+            1, registry.hedged_requests.get(operation='/v2/{id}/shares/{id}'))
+
+    def test_hedged_get_single_endpoint(self):
+        policy = self._get_hedging_policy()
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, hedging_policy=policy)
+        calls = []
+
+        def is_slow(url):
+            calls.append(url)
+            return len(calls) == 1
+        request, release = self._get_slow_request(is_slow)
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/shares/1234")
+
+        self.assertEqual({"fast": True}, body)
+        self.assertEqual(["http://example.com/v2/1234/shares/1234"] * 2,
+                         calls)
+
+    def test_hedged_get_fast_response(self):
+        policy = self._get_hedging_policy(latency=5)
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        request = mock.Mock(return_value=fake_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.get("/shares/1234")
+
+        self.assertEqual(1, request.call_count)
+        self.assertEqual(0, policy.hedged)
+        self.assertEqual(2, len(policy._latencies['/v2/{id}/shares/{id}']))
+
+    def test_hedging_extra_load_capped(self):
+        policy = self._get_hedging_policy(max_extra_load=0)
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        request, release = self._get_slow_request(lambda url: True)
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/shares/1234")
+
+        self.assertEqual({"hi": "there"}, body)
+        self.assertEqual(1, request.call_count)
+        self.assertEqual(0, policy.hedged)
+
+    def test_hedged_get_slower_response_closed(self):
+        policy = self._get_hedging_policy()
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        slow_response = utils.TestResponse({"status_code": 200,
+                                            "text": '{"slow": true}'})
+        slow_response.close = mock.Mock()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def request(method, url, **kwargs):
+            if url.startswith("http://one."):
+                release.wait(5)
+                time.sleep(0.2)
+                return slow_response
+            return utils.TestResponse({"status_code": 200,
+                                       "text": '{"fast": true}'})
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(side_effect=request)):
+            resp, body = cl.get("/shares/1234")
+            release.set()
+            cl._hedge_executor.shutdown(wait=True)
+
+        self.assertEqual({"fast": True}, body)
+        slow_response.close.assert_called_once_with()
+        # Both requests count, the slow one included
+        latencies = policy._latencies['/v2/{id}/shares/{id}']
+        self.assertEqual(3, len(latencies))
+        self.assertGreaterEqual(max(latencies), 0.2)
+
+    def test_hedging_workers_reused(self):
+        policy = self._get_hedging_policy(latency=5)
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        threads = set()
+
+        def request(method, url, **kwargs):
+            threads.add(threading.current_thread())
+            return fake_response
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(side_effect=request)):
+            for i in range(5):
+                cl.get("/shares/1234")
+
+        self.assertEqual(1, len(threads))
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual(0, policy.hedged)
+
+    def test_hedged_get_request_context_without_contextvars(self):
+        patcher = mock.patch.object(requestcontext, 'contextvars', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        policy = self._get_hedging_policy(latency=5)
+        policy.record_latency('shares.get', 5)
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        calls = []
+
+        def request(method, url, **kwargs):
+            calls.append((threading.current_thread(), kwargs,
+                          requestcontext.operation.get()))
+            return fake_response
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(side_effect=request)):
+            with requestcontext.experimental_api.enabled():
+                with requestcontext.operation.scoped('shares.get'):
+                    with deadlines.deadline(30):
+                        cl.get("/shares/1234")
+
+        thread, kwargs, operation = calls[0]
+        self.assertNotEqual(threading.current_thread(), thread)
+        self.assertEqual(
+            'true', kwargs['headers'][constants.EXPERIMENTAL_HTTP_HEADER])
+        self.assertLessEqual(kwargs['timeout'], 30)
+        self.assertEqual('shares.get', operation)
+
+    def test_hedging_without_free_worker(self):
+        policy = self._get_hedging_policy()
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        cl._hedge_slots = threading.BoundedSemaphore(1)
+        cl._hedge_slots.acquire()
+        threads = []
+
+        def request(method, url, **kwargs):
+            threads.append(threading.current_thread())
+            return fake_response
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(side_effect=request)):
+            cl.get("/shares/1234")
+
+        self.assertEqual([threading.current_thread()], threads)
+        self.assertIsNone(cl._hedge_executor)
+
+    def test_hedged_get_both_failed(self):
+        policy = self._get_hedging_policy()
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        request = mock.Mock(return_value=bad_400_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(exceptions.BadRequest, cl.get, "/shares/1234")
+
+    def test_post_not_hedged(self):
+        policy = self._get_hedging_policy()
+        cl = self._get_multi_endpoint_client(hedging_policy=policy)
+        request = mock.Mock(return_value=fake_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            cl.post("/shares/1234", body={})
+
+        self.assertEqual(1, request.call_count)
+        self.assertEqual(0, policy.requests)
+
+    def test_connect_and_read_timeouts(self):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, timeout=30,
+            connect_timeout=5)
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            cl.get("/hi")
+
+        self.assertEqual((5, 30), req.call_args[1]["timeout"])
+
+    def test_deadline_clamps_timeout(self):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, connect_timeout=5,
+            read_timeout=60)
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            with deadlines.deadline(10):
+                cl.get("/hi")
+
+        connect, read = req.call_args[1]["timeout"]
+        self.assertEqual(5, connect)
+        self.assertTrue(9 < read <= 10)
+
+    def test_client_deadline(self):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, deadline=10)
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            cl.get("/hi")
+
+        self.assertTrue(9 < req.call_args[1]["timeout"] <= 10)
+
+    def test_deadline_exceeded(self):
+        cl = get_authed_client()
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            with deadlines.deadline(-1):
+                self.assertRaises(exceptions.DeadlineExceeded, cl.get, "/hi")
+
+        self.assertFalse(req.called)
+
+    def test_deadline_stops_retries(self):
+        cl = get_authed_client(retries=3)
+        cl.retry_policy.jitter = False
+        request = mock.Mock(return_value=bad_500_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            with deadlines.deadline(1.5):
+                self.assertRaises(exceptions.InternalServerError,
+                                  cl.get, "/hi")
+
+        # Second retry would wait 2 seconds, past the deadline
+        self.assertEqual(2, request.call_count)
+        httpclient.sleep.assert_called_once_with(1)
+
+    def test_timeout_past_deadline(self):
+        cl = get_authed_client(retries=3)
+
+        def request(*args, **kwargs):
+            self.now += 10
+            raise requests.exceptions.ReadTimeout()
+        self.now = time.time()
+        self.mock_object(time, 'time', mock.Mock(side_effect=lambda: self.now))
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(side_effect=request)):
+            with deadlines.deadline(5):
+                self.assertRaises(exceptions.DeadlineExceeded, cl.get, "/hi")
+
+    def _get_client_with_token_provider(self):
+        provider = mock.Mock(spec=tokens.TokenProvider)
+        provider.get_token.side_effect = ['token1', 'token2']
+        provider.invalidate.return_value = True
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION,
+            token_provider=provider)
+        return cl, provider
+
+    def test_token_from_provider(self):
+        cl, provider = self._get_client_with_token_provider()
+
+        with mock.patch.object(requests.Session, "request",
+                               mock.Mock(return_value=fake_response)) as req:
+            cl.get("/hi")
+
+        self.assertEqual('token1', req.call_args[1]['headers']['X-Auth-Token'])
+        self.assertFalse(provider.invalidate.called)
+
+    def test_reauthenticate_on_401(self):
+        cl, provider = self._get_client_with_token_provider()
+        request = mock.Mock(side_effect=[bad_401_response, fake_response])
+
+        with mock.patch.object(requests.Session, "request", request):
+            resp, body = cl.get("/hi")
+
+        self.assertEqual({"hi": "there"}, body)
+        self.assertEqual(['token1', 'token2'],
+                         [c[1]['headers']['X-Auth-Token']
+                          for c in request.call_args_list])
+        provider.invalidate.assert_called_once_with()
+        self.assertFalse(httpclient.sleep.called)
+
+    def test_reauthenticate_only_once(self):
+        cl, provider = self._get_client_with_token_provider()
+        request = mock.Mock(return_value=bad_401_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(exceptions.Unauthorized, cl.get, "/hi")
+
+        self.assertEqual(2, request.call_count)
+
+    def test_reauthenticate_not_possible(self):
+        cl, provider = self._get_client_with_token_provider()
+        provider.invalidate.return_value = False
+        request = mock.Mock(return_value=bad_401_response)
+
+        with mock.patch.object(requests.Session, "request", request):
+            self.assertRaises(exceptions.Unauthorized, cl.get, "/hi")
+
+        self.assertEqual(1, request.call_count)
+
+    def _start_server(self):
+        connections = []
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path.endswith('/slow'):
+                    return self._send_slowly()
+                body = b'{"hi": "there"}'
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_slowly(self):
+                chunk = b' ' * httpclient.DEADLINE_READ_CHUNK_SIZE
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(chunk) * 20))
+                self.end_headers()
+                try:
+                    for i in range(20):
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                        time.sleep(0.1)
+                except (IOError, OSError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                request = BaseHTTPServer.HTTPServer.get_request(self)
+                connections.append(request[1])
+                return request
+
+        server = Server(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return 'http://127.0.0.1:%s/v2' % server.server_port, connections
+
+    def test_warm_up_connection_reused(self):
+        url, connections = self._start_server()
+        cl = httpclient.HTTPClient(url, "token", fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION)
+
+        cl.warm_up()
+        resp, body = cl.get("/hi")
+
+        self.assertEqual({"hi": "there"}, body)
+        self.assertEqual(1, len(connections))
+
+    def test_deadline_while_reading_body(self):
+        url, connections = self._start_server()
+        cl = httpclient.HTTPClient(url, "token", fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   read_timeout=5)
+        start = time.time()
+
+        with deadlines.deadline(0.3):
+            self.assertRaises(exceptions.DeadlineExceeded, cl.get, "/slow")
+
+        self.assertLess(time.time() - start, 1)
+
+    @ddt.data(None, 'urllib3')
+    def test_connection_reuse_recorded(self, transport):
+        url, connections = self._start_server()
+        registry = metrics.MetricsRegistry()
+        if transport == 'urllib3':
+            transport = transports.Urllib3Transport()
+        cl = httpclient.HTTPClient(url, "token", fake_user_agent,
+                                   api_version=manilaclient.API_MAX_VERSION,
+                                   metrics=registry, transport=transport)
+
+        cl.get("/hi")
+        cl.get("/hi")
+
+        self.assertEqual(1, len(connections))
+        self.assertEqual(1, registry.connections.get(reused='false'))
+        self.assertEqual(1, registry.connections.get(reused='true'))
+
+    def test_warm_up_failure_ignored(self):
+        cl = get_authed_client()
+        adapter = cl.http.get_adapter("http://example.com")
+        self.mock_object(adapter, 'warm_up',
+                         mock.Mock(side_effect=requests.ConnectionError))
+
+        cl.warm_up(connections=2)
+        with mock.patch.object(requests.Session, "request", mock_request):
+            cl.get("/hi")
+
+        self.assertEqual(2, adapter.warm_up.call_count)
+
+    def test_warm_up_all_endpoints(self):
+        cl = httpclient.HTTPClient(
+            ["http://a.example.com", "http://b.example.com"], "token",
+            fake_user_agent, api_version=manilaclient.API_MAX_VERSION,
+            connect_timeout=5, read_timeout=60)
+        adapter = cl.http.get_adapter("http://a.example.com")
+        self.mock_object(adapter, 'warm_up')
+
+        cl.warm_up()
+        cl._wait_for_warm_up()
+
+        self.assertEqual(
+            ["http://a.example.com", "http://b.example.com"],
+            sorted(c[0][0] for c in adapter.warm_up.call_args_list))
+        self.assertEqual([5, 5], [c[1]['timeout']
+                                  for c in adapter.warm_up.call_args_list])
+
+    def _get_blocked_warm_up_client(self, **kwargs):
+        cl = httpclient.HTTPClient(
+            "http://example.com", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, **kwargs)
+        adapter = cl.http.get_adapter("http://example.com")
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.mock_object(adapter, 'warm_up', mock.Mock(
+            side_effect=lambda *args, **kwargs: release.wait(5)))
+        return cl
+
+    def test_wait_for_warm_up_bounded_by_connect_timeout(self):
+        cl = self._get_blocked_warm_up_client(connect_timeout=0.05)
+
+        cl.warm_up(connections=2)
+        start = time.time()
+        cl._wait_for_warm_up()
+
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual([], cl._warm_up_threads)
+
+    def test_wait_for_warm_up_without_connect_timeout(self):
+        self.mock_object(httpclient, 'DEFAULT_WARM_UP_TIMEOUT', 0.05)
+        cl = self._get_blocked_warm_up_client()
+
+        cl.warm_up()
+        start = time.time()
+        cl._wait_for_warm_up()
+
+        self.assertLess(time.time() - start, 1)
+
+    def test_open_pooled_connection_failed(self):
+        pool = mock.Mock()
+        conn = pool._get_conn.return_value
+        conn.sock = None
+        conn.connect.side_effect = OSError()
+
+        self.assertRaises(OSError, httpclient.open_pooled_connection, pool)
+
+        conn.close.assert_called_once_with()
+        pool._put_conn.assert_called_once_with(None)
+
+    def test_rate_limit_delay_past_deadline(self):
+        limiter = ratelimit.RateLimiter(loader=mock.Mock(return_value=[]))
+        self.mock_object(limiter, 'get_delay', mock.Mock(return_value=20))
+        cl = httpclient.HTTPClient(
+            "http://example.com/v2/1234", "token", fake_user_agent,
+            api_version=manilaclient.API_MAX_VERSION, rate_limiter=limiter)
+
+        with deadlines.deadline(10):
+            self.assertRaises(exceptions.DeadlineExceeded, cl.get, "/shares")
+
+        self.assertFalse(httpclient.sleep.called)
+        max_delay = limiter.get_delay.call_args[1]['max_delay']
+        self.assertTrue(0 < max_delay <= 10)
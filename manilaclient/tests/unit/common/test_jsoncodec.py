@@ -0,0 +1,116 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+
+import ddt
+import fixtures
+import mock
+
+from manilaclient.common import jsoncodec
+from manilaclient.tests.unit import utils
+
+
+@ddt.ddt
+class JSONCodecTest(utils.TestCase):
+
+    def setUp(self):
+        super(JSONCodecTest, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable(
+            jsoncodec.CODEC_ENV_VAR))
+
+    def _get_installed_codec(self, name):
+        try:
+            return jsoncodec.get_codec(name)
+        except ValueError:
+            self.skipTest("JSON backend '%s' is not installed." % name)
+
+    @ddt.data('json', 'simplejson', 'ujson', 'orjson')
+    def test_round_trip(self, name):
+        codec = self._get_installed_codec(name)
+        obj = {'share': {'id': 'fake_id', 'size': 1, 'metadata': {}}}
+
+        self.assertEqual(name, codec.name)
+        self.assertEqual(obj, codec.loads(codec.dumps(obj)))
+        self.assertEqual(obj, codec.loads(
+            b'{"share": {"id": "fake_id", "size": 1, "metadata": {}}}'))
+
+    @ddt.data('json', 'simplejson', 'ujson', 'orjson')
+    def test_loads_invalid_data(self, name):
+        codec = self._get_installed_codec(name)
+
+        self.assertRaises(ValueError, codec.loads, b'<html></html>')
+
+    @ddt.data('json', 'simplejson', 'ujson', 'orjson')
+    def test_dumps_datetime(self, name):
+        codec = self._get_installed_codec(name)
+        obj = {'created_at': datetime.datetime(2015, 11, 17, 10, 0, 0)}
+
+        result = codec.loads(codec.dumps(obj))
+
+        self.assertTrue(result['created_at'].startswith('2015-11-17'))
+
+    def test_get_codec_default_is_auto(self):
+        codec = jsoncodec.get_codec()
+
+        self.assertIn(codec.name, jsoncodec.AUTO_PREFERENCE)
+
+    @mock.patch.dict(jsoncodec._codec_instances, clear=True)
+    def test_get_codec_auto_falls_back_to_stdlib(self):
+        self.mock_object(jsoncodec.importutils, 'import_module',
+                         mock.Mock(side_effect=ImportError))
+
+        codec = jsoncodec.get_codec('auto')
+
+        self.assertIsInstance(codec, jsoncodec.StdlibJSONCodec)
+
+    def test_get_codec_from_env(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'MANILACLIENT_JSON_CODEC', 'json'))
+
+        self.assertIsInstance(jsoncodec.get_codec(),
+                              jsoncodec.StdlibJSONCodec)
+
+    def test_get_codec_instance(self):
+        codec = jsoncodec.StdlibJSONCodec()
+
+        self.assertIs(codec, jsoncodec.get_codec(codec))
+
+    def test_get_codec_unknown(self):
+        self.assertRaises(ValueError, jsoncodec.get_codec, 'fake')
+
+    @mock.patch.dict(jsoncodec._codec_instances, clear=True)
+    def test_get_codec_not_installed(self):
+        self.mock_object(jsoncodec.importutils, 'import_module',
+                         mock.Mock(side_effect=ImportError))
+
+        self.assertRaises(ValueError, jsoncodec.get_codec, 'orjson')
+
+    @mock.patch.dict(jsoncodec._codec_instances, clear=True)
+    def test_ujson_dumps_default(self):
+        ujson = mock.Mock()
+        self.mock_object(jsoncodec.importutils, 'import_module',
+                         mock.Mock(return_value=ujson))
+
+        jsoncodec.get_codec('ujson').dumps({'a': 1})
+
+        ujson.dumps.assert_called_with({'a': 1},
+                                       default=jsoncodec._to_primitive)
+
+    @mock.patch.dict(jsoncodec._codec_instances, clear=True)
+    def test_ujson_without_default_not_used(self):
+        def dumps(obj):
+            return '{}'
+        self.mock_object(jsoncodec.importutils, 'import_module',
+                         mock.Mock(return_value=mock.Mock(dumps=dumps)))
+
+        self.assertRaises(ValueError, jsoncodec.get_codec, 'ujson')
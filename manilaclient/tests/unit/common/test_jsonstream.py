@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+
+import ddt
+import mock
+
+from manilaclient.common import jsonstream
+from manilaclient.tests.unit import utils
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@ddt.ddt
+class IterArrayItemsTest(utils.TestCase):
+
+    body = {
+        'shares_links': [{'href': 'http://fake', 'rel': 'next'}],
+        'shares': [
+            {'id': 'a1', 'name': u'déjà vu', 'size': 1},
+            {'id': 'b2', 'name': 'second', 'metadata': {'k': '[]'}},
+            {'id': 'c3', 'name': None, 'size': 123},
+        ],
+    }
+
+    @ddt.data(1, 2, 7, 64, 100000)
+    def test_iter_array_items(self, chunk_size):
+        data = json.dumps(self.body, indent=2).encode('utf-8')
+
+        result = list(jsonstream.iter_array_items(
+            _chunks(data, chunk_size), 'shares'))
+
+        self.assertEqual(self.body['shares'], result)
+
+    def test_iter_array_items_objects_decoded_once(self):
+        shares = self.body['shares'] + [{'name': 'a \\ \" ] } [[ {'}]
+        data = json.dumps({'shares': shares}).encode('utf-8')
+        raw_decode = json.JSONDecoder.raw_decode
+
+        with mock.patch.object(json.JSONDecoder, 'raw_decode', autospec=True,
+                               side_effect=raw_decode) as decode:
+            result = list(jsonstream.iter_array_items(_chunks(data, 1),
+                                                      'shares'))
+
+        self.assertEqual(shares, result)
+        # One call per element and one decoding the key
+        self.assertEqual(5, decode.call_count)
+
+    @ddt.data(1, 3)
+    def test_iter_array_items_scalars(self, chunk_size):
+        data = b'{"values": [1, 23, 456, "7,8", true, null]}'
+
+        result = list(jsonstream.iter_array_items(
+            _chunks(data, chunk_size), 'values'))
+
+        self.assertEqual([1, 23, 456, "7,8", True, None], result)
+
+    @ddt.data(1, 3, 100000)
+    def test_iter_array_items_nested_key_ignored(self, chunk_size):
+        data = (b'{"links": {"shares": "nested"}, '
+                b'"note": "escaped \\" quote, \\\\ \\"shares\\": [1]", '
+                b'"list": [{"shares": []}], '
+                b'"shares" : [{"id": 1}]}')
+
+        result = list(jsonstream.iter_array_items(
+            _chunks(data, chunk_size), 'shares'))
+
+        self.assertEqual([{'id': 1}], result)
+
+    def test_iter_array_items_nested_key_only(self):
+        data = b'{"links": {"shares": [1]}, "note": "\\"shares\\": ["}'
+        items = jsonstream.iter_array_items([data], 'shares')
+
+        self.assertRaises(ValueError, list, items)
+
+    def test_iter_array_items_empty(self):
+        result = list(jsonstream.iter_array_items(
+            [b'{"shares": [ ]}'], 'shares'))
+
+        self.assertEqual([], result)
+
+    def test_iter_array_items_is_lazy(self):
+        chunks = iter([b'{"shares": [{"id": 1}, ', b'{"id": 2}]}'])
+
+        items = jsonstream.iter_array_items(chunks, 'shares')
+
+        self.assertEqual({'id': 1}, next(items))
+        self.assertEqual([b'{"id": 2}]}'], list(chunks))
+
+    def test_iter_array_items_text_chunks(self):
+        result = list(jsonstream.iter_array_items(
+            ['{"shares": [{"id": 1}]}'], 'shares'))
+
+        self.assertEqual([{'id': 1}], result)
+
+    @ddt.data(b'{"shares_links": []}', b'')
+    def test_iter_array_items_key_missing(self, data):
+        items = jsonstream.iter_array_items([data], 'shares')
+
+        self.assertRaises(ValueError, list, items)
+
+    def test_iter_array_items_not_array(self):
+        items = jsonstream.iter_array_items([b'{"shares": {}}'], 'shares')
+
+        self.assertRaises(ValueError, list, items)
+
+    @ddt.data(b'{"shares": [{"id": 1}, {"id":', b'{"shares": [{"id": 1}, "ab')
+    def test_iter_array_items_truncated(self, data):
+        items = jsonstream.iter_array_items([data], 'shares')
+
+        self.assertEqual({'id': 1}, next(items))
+        self.assertRaises(ValueError, next, items)
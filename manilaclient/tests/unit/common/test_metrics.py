@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import socket
+
+import requests
+
+from manilaclient.common import metrics
+from manilaclient.tests.unit import utils
+
+
+class MetricsRegistryTestCase(utils.TestCase):
+
+    def test_record_request(self):
+        registry = metrics.MetricsRegistry(buckets=(0.1, 1))
+
+        registry.record_request('shares.list', 'GET', 200, 0.05, False)
+        registry.record_request('shares.list', 'GET', 200, 0.5, True)
+        registry.record_request('shares.list', 'GET', None, 2, True)
+        registry.record_request('shares.get', 'GET', 404, 0.05, True)
+
+        self.assertEqual(2, registry.requests.get(
+            operation='shares.list', method='GET', status='200'))
+        self.assertEqual(1, registry.requests.get(
+            operation='shares.list', method='GET', status='error'))
+        self.assertEqual({
+            'buckets': {0.1: 1, 1: 2, float('inf'): 3},
+            'sum': 2.55,
+            'count': 3,
+        }, registry.request_duration.get(operation='shares.list'))
+        self.assertEqual(0.75, registry.connection_reuse_ratio.get())
+
+    def test_record_retry(self):
+        registry = metrics.MetricsRegistry()
+
+        registry.record_retry('shares.get')
+        registry.record_retry('shares.get')
+
+        self.assertEqual(2, registry.retries.get(operation='shares.get'))
+
+    def test_record_request_reuse_unknown(self):
+        registry = metrics.MetricsRegistry()
+
+        registry.record_request('shares.get', 'GET', 200, 0.05, None)
+
+        self.assertEqual(1, registry.requests.get(
+            operation='shares.get', method='GET', status='200'))
+        self.assertEqual(0, registry.connections.get(reused='true'))
+        self.assertEqual(0, registry.connections.get(reused='false'))
+
+    def test_render_prometheus(self):
+        registry = metrics.MetricsRegistry(buckets=(0.1,))
+        registry.record_request('shares._action:os-extend', 'POST', 202,
+                                0.05, False)
+        registry.record_completion_cache_write('uuid', 0.2)
+
+        text = registry.render_prometheus()
+
+        for line in (
+                '# TYPE manilaclient_requests_total counter',
+                'manilaclient_requests_total{operation="shares._action:'
+                'os-extend",method="POST",status="202"} 1.0',
+                '# TYPE manilaclient_request_duration_seconds histogram',
+                'manilaclient_request_duration_seconds_bucket{operation='
+                '"shares._action:os-extend",le="0.1"} 1',
+                'manilaclient_request_duration_seconds_bucket{operation='
+                '"shares._action:os-extend",le="+Inf"} 1',
+                'manilaclient_request_duration_seconds_count{operation='
+                '"shares._action:os-extend"} 1',
+                'manilaclient_connections_total{reused="false"} 1.0',
+                'manilaclient_connection_reuse_ratio 0.0',
+                'manilaclient_completion_cache_write_seconds_bucket{'
+                'cache_type="uuid",le="0.1"} 0',
+                'manilaclient_completion_cache_write_seconds_sum{'
+                'cache_type="uuid"} 0.2'):
+            self.assertIn(line + '\n', text)
+
+    def test_label_values_escaped(self):
+        registry = metrics.MetricsRegistry()
+        registry.record_retry('a"b\\c\nd')
+
+        self.assertIn('manilaclient_retries_total{operation="a\\"b\\\\c\\nd"}',
+                      registry.render_prometheus())
+
+    def test_statsd_sink(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        sink = metrics.StatsdSink('127.0.0.1', server.getsockname()[1],
+                                  prefix='test')
+        self.addCleanup(sink.close)
+        registry = metrics.MetricsRegistry()
+        registry.add_sink(sink)
+
+        registry.record_request('shares._action:os-extend', 'POST', 202,
+                                0.25, True)
+
+        received = [server.recv(1024).decode('utf-8') for i in range(3)]
+        self.assertEqual([
+            'test.requests.shares__action_os-extend.POST.202:1|c',
+            'test.request_duration.shares__action_os-extend:250.000|ms',
+            'test.connections.reused:1|c',
+        ], received)
+
+    def test_http_server(self):
+        registry = metrics.MetricsRegistry()
+        registry.record_retry('shares.list')
+        server = metrics.start_http_server(registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:%s' % server.server_port
+
+        resp = requests.get(url + '/metrics')
+        not_found = requests.get(url + '/foo')
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(metrics.PROMETHEUS_CONTENT_TYPE,
+                         resp.headers['Content-Type'])
+        self.assertEqual(registry.render_prometheus(), resp.text)
+        self.assertEqual(404, not_found.status_code)
@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+import mock
+
+from manilaclient.common import ratelimit
+from manilaclient.tests.unit import utils
+from manilaclient.v2 import limits
+
+
+class TokenBucketTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.now = 100
+        self.mock_object(time, 'time', mock.Mock(side_effect=lambda: self.now))
+
+    def test_reserve(self):
+        bucket = ratelimit.TokenBucket(rate=0.5, capacity=2)
+
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(2, bucket.reserve())
+        # Waiting callers are spread out
+        self.assertEqual(4, bucket.reserve())
+
+        self.now += 10
+        self.assertEqual(0, bucket.reserve())
+
+    def test_release(self):
+        bucket = ratelimit.TokenBucket(rate=0.5, capacity=1)
+
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(2, bucket.reserve())
+        bucket.release()
+        self.assertEqual(2, bucket.reserve())
+
+        bucket.release()
+        bucket.release()
+        bucket.release()
+        self.assertEqual(1, bucket.tokens)
+
+    def test_refill_up_to_capacity(self):
+        bucket = ratelimit.TokenBucket(rate=1, capacity=2, tokens=0)
+
+        self.now += 100
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(1, bucket.reserve())
+
+
+class RateLimiterTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(RateLimiterTestCase, self).setUp()
+        self.now = 100
+        self.mock_object(time, 'time', mock.Mock(side_effect=lambda: self.now))
+        self.rate_limits = [
+            limits.RateLimit('POST', '*', '.*', 1, 1, 'MINUTE', ''),
+            limits.RateLimit('GET', '*/shares', '^/shares', 2, 0, 'SECOND',
+                             ''),
+            limits.RateLimit('PUT', '*', '[', 1, 1, 'MINUTE', ''),
+            limits.RateLimit('DELETE', '*', '.*', 1, 1, 'FORTNIGHT', ''),
+        ]
+        self.loader = mock.Mock(return_value=self.rate_limits)
+        self.limiter = ratelimit.RateLimiter(refresh_interval=60,
+                                             loader=self.loader)
+
+    def _refresh(self):
+        if self.limiter.start_refresh():
+            self.limiter.finish_refresh(self.limiter.loader())
+
+    def test_get_delay(self):
+        self._refresh()
+
+        self.assertEqual(0, self.limiter.get_delay('POST', '/shares'))
+        self.assertEqual(60, self.limiter.get_delay('POST', '/snapshots'))
+        self.assertEqual(0.5, self.limiter.get_delay('GET', '/shares/1'))
+        self.assertEqual(0, self.limiter.get_delay('GET', '/snapshots'))
+        # Invalid regex and unknown unit are ignored
+        self.assertEqual(0, self.limiter.get_delay('PUT', '/shares/1'))
+        self.assertEqual(0, self.limiter.get_delay('DELETE', '/shares/1'))
+
+    def test_get_delay_longer_than_max_delay(self):
+        self._refresh()
+
+        self.assertEqual(0, self.limiter.get_delay('POST', '/shares',
+                                                   max_delay=10))
+        # No token is taken for a request which is not going to be sent
+        self.assertEqual(60, self.limiter.get_delay('POST', '/shares',
+                                                    max_delay=10))
+        self.assertEqual(60, self.limiter.get_delay('POST', '/shares'))
+        self.assertEqual(120, self.limiter.get_delay('POST', '/shares'))
+
+    def test_no_delay_before_limits_loaded(self):
+        self.assertEqual(0, self.limiter.get_delay('POST', '/shares'))
+
+    def test_refresh_interval(self):
+        self.assertTrue(self.limiter.start_refresh())
+        # Limits are loaded by one caller at a time
+        self.assertFalse(self.limiter.start_refresh())
+        self.limiter.finish_refresh(self.rate_limits)
+        self.now += 59
+        self.assertFalse(self.limiter.start_refresh())
+        self.now += 1
+        self.assertTrue(self.limiter.start_refresh())
+
+    def test_failed_refresh_keeps_limits(self):
+        self._refresh()
+        self.now += 60
+        self.assertTrue(self.limiter.start_refresh())
+        self.limiter.finish_refresh(None)
+
+        self.assertEqual(0, self.limiter.get_delay('POST', '/shares'))
+        self.assertEqual(60, self.limiter.get_delay('POST', '/shares'))
+        self.assertFalse(self.limiter.start_refresh())
+
+    def test_no_refresh_without_loader(self):
+        self.assertFalse(ratelimit.RateLimiter().start_refresh())
@@ -0,0 +1,126 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import ddt
+import mock
+import requests
+
+from manilaclient.common import retry
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+@ddt.ddt
+class RetryPolicyTest(utils.TestCase):
+
+    @ddt.data(
+        ('GET', exceptions.InternalServerError(), True),
+        ('PUT', exceptions.ServiceUnavailable(), True),
+        ('DELETE', exceptions.GatewayTimeout(), True),
+        ('get', exceptions.BadGateway(), True),
+        ('GET', exceptions.RequestEntityTooLarge(), True),
+        ('GET', exceptions.HTTPClientError(http_status=429), True),
+        ('GET', requests.exceptions.ConnectionError(), True),
+        ('GET', requests.exceptions.Timeout(), True),
+        ('GET', exceptions.ConnectionRefused(), True),
+        ('GET', exceptions.BadRequest(), False),
+        ('GET', exceptions.NotFound(), False),
+        ('GET', exceptions.HttpNotImplemented(), False),
+        ('GET', exceptions.CommandError(), False),
+        ('POST', exceptions.InternalServerError(), False),
+        ('POST', requests.exceptions.ConnectionError(), False),
+    )
+    @ddt.unpack
+    def test_is_retryable(self, method, error, expected):
+        policy = retry.RetryPolicy(retries=1)
+
+        self.assertEqual(expected, policy.is_retryable(method, error))
+
+    def test_is_retryable_connection_errors_disabled(self):
+        policy = retry.RetryPolicy(retries=1, retry_connection_errors=False)
+
+        self.assertFalse(policy.is_retryable(
+            'GET', requests.exceptions.ConnectionError()))
+
+    def test_get_backoff_without_jitter(self):
+        policy = retry.RetryPolicy(backoff_base=1, backoff_max=5,
+                                   jitter=False)
+
+        self.assertEqual([1, 2, 4, 5, 5],
+                         [policy.get_backoff(i) for i in range(1, 6)])
+
+    @mock.patch('random.uniform', mock.Mock(return_value=0.5))
+    def test_get_backoff_with_jitter(self):
+        policy = retry.RetryPolicy(backoff_base=1, backoff_max=5)
+
+        self.assertEqual(0.5, policy.get_backoff(3))
+        retry.random.uniform.assert_called_once_with(0, 4)
+
+    def test_get_retry_delay_limit(self):
+        policy = retry.RetryPolicy(retries=2, jitter=False)
+        error = exceptions.InternalServerError()
+
+        self.assertEqual(1, policy.get_retry_delay('GET', error, 1))
+        self.assertEqual(2, policy.get_retry_delay('GET', error, 2))
+        self.assertIsNone(policy.get_retry_delay('GET', error, 3))
+
+    def test_get_retry_delay_not_retryable(self):
+        policy = retry.RetryPolicy(retries=2)
+
+        self.assertIsNone(policy.get_retry_delay(
+            'POST', exceptions.InternalServerError(), 1))
+
+    def test_get_retry_delay_retry_after(self):
+        policy = retry.RetryPolicy(retries=1)
+        error = exceptions.ServiceUnavailable()
+        error.retry_after = 7
+
+        self.assertEqual(7, policy.get_retry_delay('GET', error, 1))
+
+    def test_get_retry_delay_retry_after_too_long(self):
+        policy = retry.RetryPolicy(retries=1, max_retry_after=10)
+        error = exceptions.ServiceUnavailable()
+        error.retry_after = 11
+
+        self.assertIsNone(policy.get_retry_delay('GET', error, 1))
+
+    def test_get_retry_delay_budget_exhausted(self):
+        budget = retry.RetryBudget(ratio=0.5, max_tokens=1)
+        policy = retry.RetryPolicy(retries=5, budget=budget)
+        error = exceptions.InternalServerError()
+
+        self.assertIsNotNone(policy.get_retry_delay('GET', error, 1))
+        self.assertIsNone(policy.get_retry_delay('GET', error, 2))
+
+        policy.request_started()
+        policy.request_started()
+
+        self.assertIsNotNone(policy.get_retry_delay('GET', error, 1))
+
+
+class RetryBudgetTest(utils.TestCase):
+
+    def test_withdraw(self):
+        budget = retry.RetryBudget(ratio=0.1, max_tokens=2)
+
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+    def test_deposit_is_capped(self):
+        budget = retry.RetryBudget(ratio=1, max_tokens=1)
+
+        for i in range(5):
+            budget.deposit()
+
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
@@ -0,0 +1,108 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import copy
+import threading
+import time
+
+from manilaclient.common import deadlines
+from manilaclient.common import singleflight
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+class SingleFlightTestCase(utils.TestCase):
+
+    def _run_concurrently(self, flight, func, key='key', callers=3):
+        results = []
+        errors = []
+
+        def caller():
+            try:
+                results.append(flight.do(key, func))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=caller) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def _wait_for_waiters(self, flight, count):
+        deadline = time.time() + 5
+        while flight.coalesced < count and time.time() < deadline:
+            time.sleep(0.001)
+
+    def _wait_for_call(self, flight, key):
+        deadline = time.time() + 5
+        while key not in flight._calls and time.time() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_calls_coalesced(self):
+        flight = singleflight.SingleFlight(copy_result=copy.deepcopy)
+        calls = []
+
+        def func():
+            calls.append(1)
+            self._wait_for_waiters(flight, 2)
+            return {'share': {'id': 'fake'}}
+
+        results, errors = self._run_concurrently(flight, func)
+
+        self.assertEqual([], errors)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(2, flight.coalesced)
+        self.assertEqual([False, True, True],
+                         sorted(shared for _result, shared in results))
+        bodies = [result for result, _shared in results]
+        self.assertEqual([{'share': {'id': 'fake'}}] * 3, bodies)
+        # Every caller got its own copy
+        self.assertEqual(3, len(set(id(body) for body in bodies)))
+
+    def test_error_raised_to_all_callers(self):
+        flight = singleflight.SingleFlight()
+
+        def func():
+            self._wait_for_waiters(flight, 2)
+            raise ValueError()
+
+        results, errors = self._run_concurrently(flight, func)
+
+        self.assertEqual([], results)
+        self.assertEqual(3, len(errors))
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    def test_sequential_calls_not_coalesced(self):
+        flight = singleflight.SingleFlight(copy_result=copy.deepcopy)
+        result = {'a': 1}
+
+        self.assertEqual((result, False), flight.do('key', lambda: result))
+        self.assertIs(result, flight.do('key', lambda: result)[0])
+        self.assertEqual(0, flight.coalesced)
+
+    def test_waiting_bounded_by_deadline(self):
+        flight = singleflight.SingleFlight()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        leader = threading.Thread(
+            target=flight.do, args=('key', lambda: release.wait(5)))
+        leader.start()
+        self._wait_for_call(flight, 'key')
+
+        with deadlines.deadline(0.05):
+            self.assertRaises(exceptions.DeadlineExceeded,
+                              flight.do, 'key', lambda: None)
+
+        release.set()
+        leader.join()
@@ -0,0 +1,97 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import ddt
+import mock
+
+from manilaclient.common import timings
+from manilaclient.tests.unit import utils
+
+
+@ddt.ddt
+class TimingsTestCase(utils.TestCase):
+
+    @ddt.data(
+        ('http://host/v2/1234', '/v2/{id}'),
+        ('http://host:8786/v2/c0a5f3bc3b2e4f53a5a8b0b2d1f8cd10/shares/detail',
+         '/v2/{id}/shares/detail'),
+        ('http://host/v2/1/shares/9e5cc2ea-6f77-4b8e-a0b7-e1a1a6b4c7d3/action',
+         '/v2/{id}/shares/{id}/action'),
+        ('http://host/v2/1/shares?name=foo&limit=5&name=bar',
+         '/v2/{id}/shares?limit&name'),
+        ('http://host/v2/1/types/default/extra_specs',
+         '/v2/{id}/types/default/extra_specs'),
+    )
+    @ddt.unpack
+    def test_get_url_template(self, url, expected):
+        self.assertEqual(expected, timings.get_url_template(url))
+
+    @ddt.data((50, 5), (90, 9), (99, 10), (100, 10), (0, 1))
+    @ddt.unpack
+    def test_percentile(self, percent, expected):
+        values = [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+        self.assertEqual(expected, timings.percentile(values, percent))
+
+    def test_percentile_no_values(self):
+        self.assertIsNone(timings.percentile([], 50))
+
+    def test_record_phase(self):
+        # Nothing is recorded outside of a request
+        timings.record_phase('connect', 1)
+
+        with timings.collect_phases({}) as phases:
+            timings.record_phase('connect', 1)
+            timings.record_phase('connect', 2)
+            timings.record_phase('tls', 0.5)
+
+        self.assertEqual({'connect': 3, 'tls': 0.5}, phases)
+
+    def test_collector(self):
+        collector = timings.TimingCollector(max_timings=3)
+        for i in range(4):
+            collector.record(timings.RequestTiming('GET', '/%s' % i))
+
+        self.assertEqual(['/1', '/2', '/3'],
+                         [t.url for t in collector.get_timings()])
+        collector.reset()
+        self.assertEqual([], collector.get_timings())
+
+    def test_summary(self):
+        collector = timings.TimingCollector()
+        for total in (0.1, 0.3, 0.2):
+            collector.record(timings.RequestTiming(
+                'GET', '/shares', status=200, bytes_received=10,
+                connect=0.01, first_byte=total / 2, total=total))
+        collector.record(timings.RequestTiming('POST', '/shares', total=1.0))
+
+        summary = collector.summary(percentiles=(50, 99))
+
+        self.assertEqual(2, len(summary))
+        self.assertEqual({
+            'method': 'GET',
+            'url': '/shares',
+            'count': 3,
+            'errors': 0,
+            'bytes_sent': 0,
+            'bytes_received': 30,
+            'p50': 0.2,
+            'p99': 0.3,
+            'max': 0.3,
+            'dns': None,
+            'connect': 0.01,
+            'tls': None,
+            'first_byte': mock.ANY,
+            'decode': None,
+        }, summary[0])
+        self.assertAlmostEqual(0.1, summary[0]['first_byte'])
+        self.assertEqual(1, summary[1]['errors'])
+        self.assertEqual(1.0, summary[1]['p50'])
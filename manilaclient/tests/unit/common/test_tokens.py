@@ -0,0 +1,110 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from manilaclient.common import tokens
+from manilaclient.tests.unit import utils
+
+
+class SessionTokenProviderTest(utils.TestCase):
+
+    def test_get_token(self):
+        session = mock.Mock()
+        auth = mock.Mock()
+        provider = tokens.SessionTokenProvider(session, auth)
+
+        self.assertEqual(session.get_token.return_value,
+                         provider.get_token())
+        session.get_token.assert_called_once_with(auth)
+
+    def test_invalidate(self):
+        session = mock.Mock()
+        session.invalidate.return_value = False
+        provider = tokens.SessionTokenProvider(session)
+
+        self.assertFalse(provider.invalidate())
+        session.invalidate.assert_called_once_with(None)
+
+
+class KeystoneClientTokenProviderTest(utils.TestCase):
+
+    def setUp(self):
+        super(KeystoneClientTokenProviderTest, self).setUp()
+        self.keystone_client = mock.Mock(auth_token='token',
+                                         force_new_token=False)
+        self.auth_ref = self.keystone_client.auth_ref
+        self.auth_ref.will_expire_soon.return_value = False
+        self.provider = tokens.KeystoneClientTokenProvider(
+            self.keystone_client, stale_duration=60)
+
+    def test_get_token(self):
+        self.assertEqual('token', self.provider.get_token())
+
+        self.auth_ref.will_expire_soon.assert_called_once_with(60)
+        self.assertFalse(self.keystone_client.authenticate.called)
+
+    def test_get_token_expiring(self):
+        self.auth_ref.will_expire_soon.return_value = True
+
+        def authenticate():
+            self.assertTrue(self.keystone_client.force_new_token)
+            self.keystone_client.auth_token = 'new_token'
+        self.keystone_client.authenticate.side_effect = authenticate
+
+        self.assertEqual('new_token', self.provider.get_token())
+
+        self.keystone_client.authenticate.assert_called_once_with()
+        self.assertFalse(self.keystone_client.force_new_token)
+
+    def test_invalidate(self):
+        self.assertTrue(self.provider.invalidate())
+
+        self.provider.get_token()
+        self.provider.get_token()
+
+        self.keystone_client.authenticate.assert_called_once_with()
+
+
+class CachedTokenProviderTest(utils.TestCase):
+
+    def setUp(self):
+        super(CachedTokenProviderTest, self).setUp()
+        self.now = 1000
+        self.mock_object(tokens.time, 'time',
+                         mock.Mock(side_effect=lambda: self.now))
+        self.next_provider = mock.Mock()
+        self.next_provider.get_token.return_value = 'new_token'
+        self.authenticate = mock.Mock(return_value=self.next_provider)
+        self.provider = tokens.CachedTokenProvider(
+            'token', 1500, self.authenticate, stale_duration=300)
+
+    def test_get_token(self):
+        self.assertEqual('token', self.provider.get_token())
+        self.assertFalse(self.authenticate.called)
+
+    def test_get_token_expiring(self):
+        self.now = 1200
+
+        self.assertEqual('new_token', self.provider.get_token())
+        self.assertEqual('new_token', self.provider.get_token())
+
+        self.authenticate.assert_called_once_with()
+
+    def test_invalidate(self):
+        self.assertTrue(self.provider.invalidate())
+
+        self.assertEqual('new_token', self.provider.get_token())
+        self.provider.invalidate()
+
+        self.authenticate.assert_called_once_with()
+        self.next_provider.invalidate.assert_called_once_with()
@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+from oslo_utils import importutils
+
+from manilaclient.common import tracing
+from manilaclient.tests.unit import utils
+from manilaclient.v2 import shares
+
+
+class TracingTestCase(utils.TestCase):
+
+    def test_start_span_nesting(self):
+        tracer = tracing.InMemoryTracer()
+
+        with tracing.start_span(tracer, 'outer') as outer:
+            with tracing.start_span(tracer, 'inner', {'a': 1}) as inner:
+                self.assertIs(inner, tracing.get_current_span())
+            self.assertIs(outer, tracing.get_current_span())
+
+        self.assertIsNone(tracing.get_current_span())
+        self.assertEqual([inner, outer], tracer.get_spans())
+        self.assertIs(outer, inner.parent)
+        self.assertEqual({'a': 1}, inner.attributes)
+        self.assertEqual([inner], tracer.get_children(outer))
+        self.assertIsNotNone(outer.duration)
+
+    def test_start_span_records_exception(self):
+        tracer = tracing.InMemoryTracer()
+        error = ValueError()
+
+        def fail():
+            with tracing.start_span(tracer, 'failing'):
+                raise error
+
+        self.assertRaises(ValueError, fail)
+        self.assertIs(error, tracer.get_spans('failing')[0].exception)
+
+    def test_start_span_without_tracer(self):
+        with tracing.start_span(None, 'name') as span:
+            span.set_attribute('a', 1)
+            self.assertIsNone(tracing.get_current_span())
+
+    def test_noop_tracer(self):
+        span = tracing.Tracer().start_span('name')
+        span.set_attribute('a', 1)
+        span.add_event('event')
+        span.end()
+
+    def test_manager_methods_traced(self):
+        tracer = tracing.InMemoryTracer()
+        api = mock.Mock()
+        api.client.tracer = tracer
+        api.client.get.return_value = (None, {'share': {'id': 'fake'}})
+        manager = shares.ShareManager(api)
+
+        manager.get('fake')
+
+        self.assertEqual(['ShareManager.get'],
+                         [span.name for span in tracer.get_spans()])
+
+    def test_manager_methods_not_traced_without_tracer(self):
+        api = mock.Mock()
+        api.client.tracer = None
+        api.client.get.return_value = (None, {'share': {'id': 'fake'}})
+
+        self.assertEqual('fake', shares.ShareManager(api).get('fake').id)
+
+    def test_manager_method_error(self):
+        tracer = tracing.InMemoryTracer()
+        api = mock.Mock()
+        api.client.tracer = tracer
+        api.client.get.side_effect = ValueError
+
+        self.assertRaises(ValueError, shares.ShareManager(api).get, 'fake')
+        self.assertIsInstance(
+            tracer.get_spans('ShareManager.get')[0].exception, ValueError)
+
+
+class OpenTelemetryTracerTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(OpenTelemetryTracerTestCase, self).setUp()
+        self.trace = mock.Mock()
+        self.mock_object(importutils, 'import_module',
+                         mock.Mock(return_value=self.trace))
+
+    def test_default_tracer(self):
+        tracing.OpenTelemetryTracer()
+
+        importutils.import_module.assert_called_once_with(
+            'opentelemetry.trace')
+        self.trace.get_tracer.assert_called_once_with('manilaclient')
+
+    def test_not_installed(self):
+        importutils.import_module.side_effect = ImportError
+
+        self.assertRaises(ValueError, tracing.OpenTelemetryTracer)
+
+    def test_spans(self):
+        otel_tracer = mock.Mock()
+        tracer = tracing.OpenTelemetryTracer(otel_tracer)
+
+        parent = tracer.start_span('parent')
+        child = tracer.start_span('child', parent=parent,
+                                  attributes={'a': 1, 'b': None})
+        child.set_attribute('c', 'd')
+        child.record_exception(ValueError('fake'))
+        child.end()
+
+        self.assertIsNone(otel_tracer.start_span.call_args_list[0][1][
+            'context'])
+        self.trace.set_span_in_context.assert_called_once_with(parent.span)
+        otel_tracer.start_span.assert_called_with(
+            'child', context=self.trace.set_span_in_context.return_value,
+            attributes={'a': 1})
+        child.span.set_attribute.assert_called_once_with('c', 'd')
+        self.trace.Status.assert_called_once_with(
+            self.trace.StatusCode.ERROR, 'fake')
+        child.span.end.assert_called_once_with()
@@ -0,0 +1,252 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import json
+import zlib
+
+import ddt
+import mock
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+from requests.packages.urllib3 import response as urllib3_response
+
+import manilaclient
+from manilaclient.common import httpclient
+from manilaclient.common import metrics
+from manilaclient.common import transports
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+def echo_app(environ, start_response):
+    body = environ['wsgi.input'].read(int(environ['CONTENT_LENGTH'] or 0))
+    start_response('200 OK', [('Content-Type', 'application/json'),
+                              ('X-Echo', 'a'), ('X-Echo', 'b')])
+    return [json.dumps({
+        'method': environ['REQUEST_METHOD'],
+        'path': environ['PATH_INFO'],
+        'query': environ['QUERY_STRING'],
+        'host': environ['HTTP_HOST'],
+        'token': environ.get('HTTP_X_AUTH_TOKEN'),
+        'content_type': environ.get('CONTENT_TYPE'),
+        'body': body.decode('utf-8'),
+    }).encode('utf-8')]
+
+
+class WSGITransportTest(utils.TestCase):
+
+    def test_request(self):
+        transport = transports.WSGITransport(echo_app)
+
+        resp = transport.request(
+            'POST', 'http://manila:8786/v2/shares%20x?all_tenants=1',
+            headers={'X-Auth-Token': 'token',
+                     'Content-Type': 'application/json'},
+            data='{"share": {}}')
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual('OK', resp.reason)
+        self.assertEqual('a, b', resp.headers['x-echo'])
+        self.assertEqual({
+            'method': 'POST',
+            'path': '/v2/shares x',
+            'query': 'all_tenants=1',
+            'host': 'manila:8786',
+            'token': 'token',
+            'content_type': 'application/json',
+            'body': '{"share": {}}',
+        }, resp.json())
+        self.assertEqual(len(resp.content), resp.raw.tell())
+
+    def test_request_compressed_response(self):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        body = compressor.compress(b'{"shares": []}') + compressor.flush()
+
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Encoding', 'gzip')])
+            return [body]
+        transport = transports.WSGITransport(app)
+
+        resp = transport.request('GET', 'http://manila/v2/shares')
+
+        self.assertEqual({'shares': []}, resp.json())
+        self.assertEqual(len(body), resp.raw.tell())
+
+    def test_result_closed(self):
+        result = mock.MagicMock()
+        result.__iter__.return_value = iter([b'{}'])
+
+        def app(environ, start_response):
+            start_response('204 No Content', [])
+            return result
+        transport = transports.WSGITransport(app)
+
+        resp = transport.request('DELETE', 'http://manila/v2/shares/1')
+
+        self.assertEqual(204, resp.status_code)
+        result.close.assert_called_once_with()
+
+    def test_client_over_wsgi_transport(self):
+        def app(environ, start_response):
+            if environ['PATH_INFO'] == '/v2/1234/shares/missing':
+                start_response('404 Not Found',
+                               [('Content-Type', 'application/json')])
+                return [b'{"itemNotFound": {"message": "Not found"}}']
+            return echo_app(environ, start_response)
+        cl = httpclient.HTTPClient(
+            "http://manila/v2/1234", "token", "fake",
+            api_version=manilaclient.API_MAX_VERSION,
+            transport=transports.WSGITransport(app))
+
+        resp, body = cl.get("/shares/1")
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual('/v2/1234/shares/1', body['path'])
+        self.assertEqual('token', body['token'])
+        self.assertRaises(exceptions.NotFound, cl.get, "/shares/missing")
+
+    def test_connection_reuse_not_recorded(self):
+        registry = metrics.MetricsRegistry()
+        cl = httpclient.HTTPClient(
+            "http://manila/v2/1234", "token", "fake",
+            api_version=manilaclient.API_MAX_VERSION, metrics=registry,
+            transport=transports.WSGITransport(echo_app))
+
+        cl.get("/shares/1")
+
+        self.assertEqual(1, registry.requests.get(
+            operation='/v2/{id}/shares/{id}', method='GET', status='200'))
+        self.assertEqual(0, registry.connections.get(reused='true'))
+        self.assertEqual(0, registry.connections.get(reused='false'))
+
+
+@ddt.ddt
+class Urllib3TransportTest(utils.TestCase):
+
+    def setUp(self):
+        super(Urllib3TransportTest, self).setUp()
+        self.transport = transports.Urllib3Transport()
+
+    def _mock_urlopen(self, **kwargs):
+        urlopen = mock.Mock(**kwargs)
+        pool = mock.Mock(urlopen=urlopen)
+        self.mock_object(self.transport.pool_manager, 'connection_from_url',
+                         mock.Mock(return_value=pool))
+        return urlopen
+
+    def test_request(self):
+        raw = urllib3_response.HTTPResponse(
+            body=io.BytesIO(b'{"share": {"id": "1"}}'), status=200,
+            reason='OK', headers={'Content-Type': 'application/json'},
+            preload_content=False)
+        urlopen = self._mock_urlopen(return_value=raw)
+
+        resp = self.transport.request(
+            'GET', 'https://manila/v2/shares/1?x=1', headers={'A': 'b'},
+            timeout=(5, 30), verify='/ca.pem')
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual({'share': {'id': '1'}}, resp.json())
+        self.assertEqual('application/json', resp.headers['content-type'])
+        connection_from_url = self.transport.pool_manager.connection_from_url
+        connection_from_url.assert_called_once_with(
+            'https://manila/v2/shares/1?x=1',
+            pool_kwargs={'cert_reqs': 'CERT_REQUIRED',
+                         'ca_certs': '/ca.pem'})
+        args, kwargs = urlopen.call_args
+        self.assertEqual(('GET', '/v2/shares/1?x=1'), args)
+        self.assertEqual({'A': 'b'}, kwargs['headers'])
+        self.assertEqual(5, kwargs['timeout'].connect_timeout)
+        self.assertEqual(30, kwargs['timeout'].read_timeout)
+        self.assertFalse(kwargs['retries'])
+        self.assertFalse(kwargs['redirect'])
+
+    def test_request_stream(self):
+        raw = urllib3_response.HTTPResponse(
+            body=io.BytesIO(b'abcdef'), status=200, preload_content=False)
+        self._mock_urlopen(return_value=raw)
+
+        resp = self.transport.request('GET', 'http://manila/v2/shares',
+                                      verify=False, stream=True)
+
+        self.assertEqual([b'abc', b'def'], list(resp.iter_content(3)))
+        connection_from_url = self.transport.pool_manager.connection_from_url
+        connection_from_url.assert_called_once_with(
+            'http://manila/v2/shares', pool_kwargs=None)
+
+    def test_request_insecure(self):
+        self._mock_urlopen(return_value=urllib3_response.HTTPResponse(
+            body=io.BytesIO(b''), status=204, preload_content=False))
+
+        self.transport.request('DELETE', 'https://manila/v2/shares/1',
+                               verify=False)
+
+        connection_from_url = self.transport.pool_manager.connection_from_url
+        connection_from_url.assert_called_once_with(
+            'https://manila/v2/shares/1',
+            pool_kwargs={'cert_reqs': 'CERT_NONE'})
+
+    @ddt.data(
+        (urllib3_exceptions.NewConnectionError(None, 'refused'),
+         requests.exceptions.ConnectionError),
+        (urllib3_exceptions.ConnectTimeoutError(),
+         requests.exceptions.ConnectTimeout),
+        (urllib3_exceptions.ReadTimeoutError(None, '/', 'timed out'),
+         requests.exceptions.ReadTimeout),
+        (urllib3_exceptions.SSLError(), requests.exceptions.SSLError),
+        (urllib3_exceptions.ProtocolError(),
+         requests.exceptions.ConnectionError),
+    )
+    @ddt.unpack
+    def test_request_error(self, error, expected):
+        self._mock_urlopen(side_effect=error)
+
+        self.assertRaises(expected, self.transport.request,
+                          'GET', 'http://manila/v2/shares')
+
+    def test_close(self):
+        self.mock_object(self.transport.pool_manager, 'clear')
+
+        self.transport.close()
+
+        self.transport.pool_manager.clear.assert_called_once_with()
+
+    def test_warm_up(self):
+        self.mock_object(httpclient, 'open_pooled_connection')
+        self.mock_object(self.transport.pool_manager, 'connection_from_url')
+
+        self.transport.warm_up('https://manila/v2', verify=False, timeout=5)
+
+        httpclient.open_pooled_connection.assert_called_once_with(
+            self.transport.pool_manager.connection_from_url.return_value, 5)
+
+    def test_pool_classes(self):
+        pool = self.transport.pool_manager.connection_from_url(
+            'https://manila/v2')
+
+        self.assertIsInstance(pool, httpclient.TimedHTTPSConnectionPool)
+
+
+class BuildResponseTest(utils.TestCase):
+
+    def test_build_response(self):
+        resp = transports.build_response(
+            'http://manila/v2', 200, 'OK',
+            {'Content-Type': 'application/json; charset=utf-8'},
+            content=b'{}', raw=transports.RawBody(10))
+
+        self.assertEqual({}, resp.json())
+        self.assertEqual('utf-8', resp.encoding)
+        self.assertEqual(10, resp.raw.tell())
+        self.assertEqual('application/json; charset=utf-8',
+                         resp.headers['content-type'])
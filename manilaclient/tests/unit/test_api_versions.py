@@ -12,14 +12,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+import os
+import threading
+
 import ddt
+import fixtures
 import mock
 
 import manilaclient
 from manilaclient import api_versions
+from manilaclient.common import constants
+from manilaclient.common import requestcontext
 from manilaclient import exceptions
 from manilaclient.openstack.common import cliutils
 from manilaclient.tests.unit import utils
+from manilaclient.v2 import client
 
 
 @ddt.ddt
@@ -228,6 +236,60 @@ class WrapsTestCase(utils.TestCase):
         self.assertEqual(args_2, some_func_2.arguments)
 
 
+class ExperimentalAPITestCase(utils.TestCase):
+
+    def _get_client(self):
+        return client.Client(input_auth_token='token',
+                             service_catalog_url='http://1.2.3.4/v2',
+                             api_version=manilaclient.API_MAX_VERSION)
+
+    def test_experimental_api_scoped_to_call(self):
+        cs = self._get_client()
+        calls = []
+
+        @api_versions.experimental_api
+        def some_func(cs, arg):
+            calls.append((arg, requestcontext.experimental_api.get()))
+            return arg
+
+        self.assertEqual('fake', some_func(cs, 'fake'))
+
+        self.assertEqual([('fake', True)], calls)
+        self.assertFalse(requestcontext.experimental_api.get())
+        self.assertNotIn(constants.EXPERIMENTAL_HTTP_HEADER,
+                         cs.client.default_headers)
+
+    def test_experimental_api_not_a_client(self):
+        @api_versions.experimental_api
+        def some_func(obj):
+            return requestcontext.experimental_api.get()
+
+        self.assertFalse(some_func(mock.Mock()))
+
+    def test_experimental_api_other_threads_not_affected(self):
+        cs = self._get_client()
+        entered = threading.Event()
+        release = threading.Event()
+        seen_by_other_thread = []
+
+        @api_versions.experimental_api
+        def some_func(cs):
+            entered.set()
+            release.wait(5)
+
+        def other_thread():
+            entered.wait(5)
+            seen_by_other_thread.append(requestcontext.experimental_api.get())
+            release.set()
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        some_func(cs)
+        thread.join()
+
+        self.assertEqual([False], seen_by_other_thread)
+
+
 class DiscoverVersionTestCase(utils.TestCase):
     def setUp(self):
         super(DiscoverVersionTestCase, self).setUp()
@@ -326,3 +388,127 @@ class DiscoverVersionTestCase(utils.TestCase):
                                 api_versions.discover_version,
                                 self.fake_client,
                                 api_versions.APIVersion("1.0"))
+
+    def test_version_range_cached(self):
+        self._mock_returned_server_version('2.7', '2.4')
+        self.fake_client.client.endpoint_url = 'http://manila/v2/1234'
+        manilaclient.API_MAX_VERSION = api_versions.APIVersion("2.11")
+        manilaclient.API_MIN_VERSION = api_versions.APIVersion("2.1")
+        cache = api_versions.VersionCache()
+
+        for requested_version in ('2.7', '2.5'):
+            discovered_version = api_versions.discover_version(
+                self.fake_client, api_versions.APIVersion(requested_version),
+                cache=cache)
+
+        self.assertEqual('2.5', discovered_version.get_string())
+        self.fake_client.services.server_api_version.assert_called_once_with(
+            '')
+        self.assertEqual((api_versions.APIVersion('2.4'),
+                          api_versions.APIVersion('2.7')),
+                         cache.get('http://manila/v2/1234'))
+
+    def test_version_range_not_cached_without_endpoint(self):
+        self._mock_returned_server_version('2.7', '2.4')
+        manilaclient.API_MAX_VERSION = api_versions.APIVersion("2.11")
+        manilaclient.API_MIN_VERSION = api_versions.APIVersion("2.1")
+        cache = api_versions.VersionCache()
+
+        for i in range(2):
+            api_versions.discover_version(
+                self.fake_client, api_versions.APIVersion('2.7'), cache=cache)
+
+        self.assertEqual(
+            2, self.fake_client.services.server_api_version.call_count)
+
+
+class VersionCacheTestCase(utils.TestCase):
+
+    def setUp(self):
+        super(VersionCacheTestCase, self).setUp()
+        self.now = 1000
+        self.mock_object(api_versions.time, 'time',
+                         mock.Mock(side_effect=lambda: self.now))
+        self.path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'cache', 'versions.json')
+        self.endpoint = 'http://manila/v2/1234'
+
+    def test_ttl(self):
+        cache = api_versions.VersionCache(ttl=60)
+        cache.set(self.endpoint, api_versions.APIVersion('2.0'),
+                  api_versions.APIVersion('2.6'))
+
+        self.now += 59
+        self.assertEqual((api_versions.APIVersion('2.0'),
+                          api_versions.APIVersion('2.6')),
+                         cache.get(self.endpoint))
+        self.now += 1
+        self.assertIsNone(cache.get(self.endpoint))
+        self.assertIsNone(cache.get('http://other/v2/1234'))
+
+    def test_persisted(self):
+        api_versions.VersionCache(path=self.path).set(
+            self.endpoint, api_versions.APIVersion(),
+            api_versions.APIVersion())
+
+        with open(self.path) as f:
+            self.assertEqual({self.endpoint: [None, None, 1000]},
+                             json.load(f))
+        min_version, max_version = api_versions.VersionCache(
+            path=self.path).get(self.endpoint)
+        self.assertTrue(min_version.is_null())
+        self.assertTrue(max_version.is_null())
+
+    def test_invalidate(self):
+        cache = api_versions.VersionCache(path=self.path)
+        cache.set(self.endpoint, api_versions.APIVersion('2.0'),
+                  api_versions.APIVersion('2.6'))
+
+        cache.invalidate(self.endpoint)
+
+        self.assertIsNone(cache.get(self.endpoint))
+        self.assertIsNone(
+            api_versions.VersionCache(path=self.path).get(self.endpoint))
+
+    def test_entries_of_other_processes_kept(self):
+        first = api_versions.VersionCache(path=self.path)
+        second = api_versions.VersionCache(path=self.path)
+        self.assertIsNone(first.get(self.endpoint))
+        self.assertIsNone(second.get('http://other/v2/1234'))
+
+        first.set(self.endpoint, api_versions.APIVersion('2.0'),
+                  api_versions.APIVersion('2.6'))
+        second.set('http://other/v2/1234', api_versions.APIVersion('2.0'),
+                   api_versions.APIVersion('2.7'))
+        second.invalidate('http://unknown/v2/1234')
+
+        cache = api_versions.VersionCache(path=self.path)
+        self.assertIsNotNone(cache.get(self.endpoint))
+        self.assertIsNotNone(cache.get('http://other/v2/1234'))
+
+    def test_corrupt_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+
+        cache = api_versions.VersionCache(path=self.path)
+
+        self.assertIsNone(cache.get(self.endpoint))
+        cache.set(self.endpoint, api_versions.APIVersion('2.0'),
+                  api_versions.APIVersion('2.6'))
+        self.assertIsNotNone(
+            api_versions.VersionCache(path=self.path).get(self.endpoint))
+
+
+@ddt.ddt
+class IsVersionErrorTestCase(utils.TestCase):
+
+    @ddt.data(exceptions.UnsupportedVersion(),
+              exceptions.VersionNotFoundForAPIMethod('2.0', 'list'),
+              exceptions.NotAcceptable())
+    def test_version_error(self, error):
+        self.assertTrue(api_versions.is_version_error(error))
+
+    @ddt.data(exceptions.NotFound(), ValueError())
+    def test_other_error(self, error):
+        self.assertFalse(api_versions.is_version_error(error))
@@ -10,6 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
+import mock
+
+from manilaclient import base
+from manilaclient.common import metrics
+from manilaclient.common import requestcontext
 from manilaclient import exceptions
 from manilaclient.openstack.common.apiclient import base as common_base
 from manilaclient.tests.unit import utils
@@ -51,3 +58,169 @@ class BaseTest(utils.TestCase):
         self.assertRaises(exceptions.NotFound,
                           cs.shares.find,
                           vegetable='carrot')
+
+    def test_completion_cache_per_thread(self):
+        manager = base.Manager(mock.Mock())
+        manager.resource_class = shares.Share
+        cache = mock.Mock()
+        other_thread_cache = []
+        self.mock_object(base, 'open', mock.Mock(return_value=cache),
+                         create=True)
+
+        def other_thread():
+            other_thread_cache.append(getattr(
+                manager._completion_caches, '_uuid_cache', None))
+            manager.write_to_completion_cache('uuid', 'other')
+
+        with manager.completion_cache('uuid', shares.Share, mode='w'):
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+            manager.write_to_completion_cache('uuid', 'fake_id')
+
+        self.assertEqual([None], other_thread_cache)
+        cache.write.assert_called_once_with('fake_id\n')
+        cache.close.assert_called_once_with()
+
+    def test_completion_cache_write_metrics(self):
+        registry = metrics.MetricsRegistry()
+        api = mock.Mock()
+        api.client.metrics = registry
+        manager = base.Manager(api)
+        self.mock_object(base, 'open', mock.Mock(), create=True)
+
+        with manager.completion_cache('uuid', shares.Share, mode='w'):
+            manager.write_to_completion_cache('uuid', 'fake_id')
+
+        self.assertEqual(
+            1, registry.completion_cache_write.get(cache_type='uuid')['count'])
+
+    def test_operation_labels_requests(self):
+        operations = []
+
+        def get(url):
+            operations.append(requestcontext.operation.get())
+            return None, {'share': {'id': 'fake'}}
+
+        api = mock.Mock()
+        api.client.get.side_effect = get
+        api.shares = shares.ShareManager(api)
+
+        api.shares.get('fake')
+
+        self.assertEqual(['shares.get'], operations)
+        self.assertIsNone(requestcontext.operation.get())
+
+    def test_operation_labels_actions(self):
+        def post(url, body):
+            return requestcontext.operation.get()
+
+        api = mock.Mock()
+        api.client.post.side_effect = post
+        manager = shares.ShareManager(api)
+
+        self.assertEqual('ShareManager._action:os-extend',
+                         manager._action('os-extend', 'fake', {}))
+
+    def _get_streaming_manager(self, chunks):
+        resp = mock.Mock()
+        resp.iter_content.return_value = iter(chunks)
+        api = mock.Mock()
+        api.client.get.return_value = (resp, None)
+        manager = base.Manager(api)
+        manager.resource_class = shares.Share
+        return manager, resp
+
+    def test_list_stream(self):
+        chunks = [b'{"shares": [{"id": "1", "na', b'me": "a"}, ',
+                  b'{"id": "2", "name": "b"}', b'], "shares_links": []}']
+        manager, resp = self._get_streaming_manager(chunks)
+
+        result = manager._list_stream('/shares/detail', 'shares')
+
+        manager.api.client.get.assert_called_once_with(
+            '/shares/detail', stream=True)
+        first = next(result)
+        self.assertIsInstance(first, shares.Share)
+        self.assertEqual('a', first.name)
+        self.assertFalse(resp.close.called)
+        self.assertEqual(['2'], [share.id for share in result])
+        resp.close.assert_called_once_with()
+
+    def test_list_stream_closed_early(self):
+        chunks = [b'{"shares": [{"id": "1"}, {"id": "2"}]}']
+        manager, resp = self._get_streaming_manager(chunks)
+
+        result = manager._list_stream('/shares/detail', 'shares')
+        next(result)
+        result.close()
+
+        resp.close.assert_called_once_with()
+
+    def test_list_stream_dropped_before_iterating(self):
+        manager, resp = self._get_streaming_manager([b'{"shares": []}'])
+
+        result = manager._list_stream('/shares/detail', 'shares')
+        self.assertFalse(resp.close.called)
+        del result
+
+        resp.close.assert_called_once_with()
+
+    def test_list_stream_error_closes_response(self):
+        manager, resp = self._get_streaming_manager([b'{"shares": [{"id'])
+
+        result = manager._list_stream('/shares/detail', 'shares')
+
+        self.assertRaises(ValueError, list, result)
+        resp.close.assert_called_once_with()
+
+    def test_list_streams_interleaved(self):
+        caches = []
+
+        def open_cache(path, mode):
+            caches.append(mock.Mock())
+            return caches[-1]
+
+        class CachedShare(shares.Share):
+            def __init__(self, manager, info, loaded=False):
+                super(CachedShare, self).__init__(manager, info, loaded)
+                manager.write_to_completion_cache('uuid', self.id)
+
+        self.mock_object(base, 'open', mock.Mock(side_effect=open_cache),
+                         create=True)
+        manager, resp = self._get_streaming_manager(
+            [b'{"shares": [{"id": "1"}, {"id": "2"}]}'])
+        other = self._get_streaming_manager(
+            [b'{"shares": [{"id": "3"}, {"id": "4"}]}'])[1]
+        manager.api.client.get.side_effect = [(resp, None), (other, None)]
+        first = manager._list_stream('/shares/detail', 'shares',
+                                     obj_class=CachedShare)
+        second = manager._list_stream('/shares/detail', 'shares',
+                                      obj_class=CachedShare)
+
+        next(first)
+        next(second)
+        list(first)
+        list(second)
+
+        # human_id and uuid caches of every listing
+        self.assertEqual(4, len(caches))
+        written = [[c[0][0] for c in cache.write.call_args_list]
+                   for cache in caches]
+        self.assertEqual([[], ['1\n', '2\n'], [], ['3\n', '4\n']], written)
+        self.assertIsNone(getattr(manager._completion_caches, '_uuid_cache',
+                                  None))
+
+    def test_list_stream_with_decoded_body(self):
+        api = mock.Mock()
+        api.client.post.return_value = (
+            mock.Mock(), {'shares': [{'id': '1'}, {}]})
+        manager = base.Manager(api)
+        manager.resource_class = shares.Share
+
+        result = list(manager._list_stream(
+            '/shares/detail', 'shares', body={'fake': 'body'}))
+
+        api.client.post.assert_called_once_with(
+            '/shares/detail', body={'fake': 'body'}, stream=True)
+        self.assertEqual(['1'], [share.id for share in result])
@@ -0,0 +1,59 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import ddt
+
+from manilaclient import exceptions
+from manilaclient.tests.unit import utils
+
+
+@ddt.ddt
+class FromResponseTest(utils.TestCase):
+
+    def _get_response(self, status_code, text='', headers=None):
+        return utils.TestResponse({'status_code': status_code, 'text': text,
+                                   'headers': headers or {}})
+
+    @ddt.data((503, exceptions.ServiceUnavailable),
+              (413, exceptions.RequestEntityTooLarge),
+              (403, exceptions.Forbidden),
+              (599, exceptions.HttpServerError))
+    @ddt.unpack
+    def test_retry_after(self, status_code, cls):
+        resp = self._get_response(status_code, headers={'retry-after': '5'})
+
+        error = exceptions.from_response(resp, 'GET', 'http://manila/v2')
+
+        self.assertIsInstance(error, cls)
+        self.assertEqual(5, error.retry_after)
+
+    @ddt.data({}, {'retry-after': 'Fri, 31 Dec 1999 23:59:59 GMT'})
+    def test_retry_after_missing_or_date(self, headers):
+        resp = self._get_response(503, headers=headers)
+
+        error = exceptions.from_response(resp, 'GET', 'http://manila/v2')
+
+        self.assertEqual(0, error.retry_after)
+
+    def test_decoded_body(self):
+        resp = self._get_response(
+            400, text='not decoded',
+            headers={'Content-Type': 'application/json'})
+        body = {'badRequest': {'message': 'Invalid share', 'details': 'x'}}
+
+        error = exceptions.from_response(resp, 'POST', 'http://manila/v2',
+                                         body=body)
+
+        self.assertIsInstance(error, exceptions.BadRequest)
+        self.assertEqual('Invalid share', error.message)
+        self.assertEqual('x', error.details)
+        self.assertEqual(400, error.http_status)
@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import subprocess
+import sys
+
+import ddt
+import testtools
+
+from manilaclient.tests.unit import utils
+
+# Seconds importing a module may take, far above the usual cost so that
+# only eagerly imported heavy dependencies exceed it
+IMPORT_TIME_BUDGET = 0.25
+
+# Modules only needed once a client is created, or a command is run
+DEFERRED_MODULES = (
+    'keystoneclient',
+    'oslo_serialization.jsonutils',
+    'oslo_utils.strutils',
+    'pbr.packaging',
+    'prettytable',
+    'requests',
+    'manilaclient.v2.client',
+    'manilaclient.v2.shell',
+)
+
+
+def get_import_times(statement):
+    """Returns cumulative import time, in seconds, by module name."""
+    command = [sys.executable, '-X', 'importtime', '-c', statement]
+    # The first run compiles modules
+    subprocess.check_output(command, stderr=subprocess.STDOUT)
+    output = subprocess.check_output(command, stderr=subprocess.STDOUT)
+
+    import_times = {}
+    for line in output.decode('utf-8').splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if cumulative_us.strip().isdigit():
+            import_times[name.strip()] = int(cumulative_us) / 1000000.0
+    return import_times
+
+
+@ddt.ddt
+@testtools.skipIf(sys.version_info < (3, 7),
+                  "'-X importtime' requires Python 3.7")
+class ImportTimeTest(utils.TestCase):
+
+    @ddt.data('manilaclient', 'manilaclient.shell')
+    def test_import_time(self, module):
+        import_times = get_import_times('import %s' % module)
+
+        self.assertLess(import_times[module], IMPORT_TIME_BUDGET)
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, import_times)
+
+    def test_manager_modules_deferred(self):
+        import_times = get_import_times('import manilaclient.v2.client')
+
+        self.assertNotIn('keystoneclient', import_times)
+        self.assertNotIn('manilaclient.v2.shares', import_times)
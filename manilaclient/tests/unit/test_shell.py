@@ -10,8 +10,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
 import re
 import sys
+import types
 
 import ddt
 import fixtures
@@ -20,8 +22,13 @@ from six import moves
 from testtools import matchers
 
 import manilaclient
+from manilaclient import api_versions
+from manilaclient.common import authcache
 from manilaclient.common import constants
+from manilaclient.common import deadlines
+from manilaclient.common import timings
 from manilaclient import exceptions
+from manilaclient.openstack.common import cliutils
 from manilaclient import shell
 from manilaclient.tests.unit import utils
 
@@ -36,6 +43,15 @@ class OpenstackManilaShellTest(utils.TestCase):
         'OS_AUTH_URL': 'http://no.where',
     }
 
+    def setUp(self):
+        super(OpenstackManilaShellTest, self).setUp()
+        # Discovering extensions freezes the registry of hooks
+        for attr_name, value in (('_hooks_map', {}), ('_hooks_frozen', False)):
+            patcher = mock.patch.object(manilaclient.utils.HookableMixin,
+                                        attr_name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     # Patch os.environ to avoid required auth info.
     def set_env_vars(self, env_vars):
         for k, v in env_vars.items():
@@ -129,6 +145,211 @@ class OpenstackManilaShellTest(utils.TestCase):
                 cert=env_vars['OS_CERT'],
             )
 
+    def test_main_timings(self):
+        self.set_env_vars(self.FAKE_ENV)
+        with mock.patch.object(shell, 'client') as mock_client:
+
+            out = self.shell('--timings list')
+
+            collector = mock_client.Client.call_args[1]['timing_collector']
+        self.assertIsInstance(collector, timings.TimingCollector)
+        self.assertIn('First byte', out)
+        self.assertIn('p90', out)
+
+    def test_main_deadline(self):
+        self.set_env_vars(self.FAKE_ENV)
+        remaining = []
+        with mock.patch.object(shell, 'client') as mock_client:
+            cs = mock_client.Client.return_value
+            cs.shares.list.side_effect = (
+                lambda *args, **kwargs: remaining.append(
+                    deadlines.get_remaining()) or [])
+
+            self.shell('--deadline 30 list')
+
+        self.assertTrue(0 < remaining[0] <= 30)
+        self.assertIsNone(deadlines.get_remaining())
+
+    def test_main_warm_up(self):
+        self.set_env_vars(self.FAKE_ENV)
+        with mock.patch.object(shell, 'client') as mock_client:
+
+            self.shell('--warm-up list')
+
+            self.assertEqual(
+                1, mock_client.Client.call_args[1]['warm_up_connections'])
+
+    def test_main_os_cache(self):
+        self.set_env_vars(self.FAKE_ENV)
+        with mock.patch.object(shell, 'client') as mock_client:
+
+            self.shell('--os-cache list')
+
+            kwargs = mock_client.Client.call_args[1]
+        self.assertIsInstance(kwargs['auth_cache'], authcache.AuthCache)
+        self.assertTrue(kwargs['use_keyring'])
+
+    def test_main_version_cache(self):
+        self.set_env_vars(self.FAKE_ENV)
+        _shell = shell.OpenStackManilaShell()
+        with mock.patch.object(shell, 'client') as mock_client:
+            mock_client.Client.return_value.client.endpoint_url = (
+                'http://manila/v2/1234')
+            self.mock_object(_shell, '_discover_client', mock.Mock(
+                return_value=(mock_client.Client.return_value,
+                              manilaclient.API_MAX_VERSION)))
+
+            _shell.main(['--version-cache-ttl', '60', 'list'])
+
+        self.assertEqual(60, _shell.version_cache.ttl)
+        self.assertEqual(os.path.expanduser(shell.DEFAULT_VERSION_CACHE_PATH),
+                         _shell.version_cache.path)
+
+    def test_main_version_cache_invalidated(self):
+        self.set_env_vars(self.FAKE_ENV)
+        _shell = shell.OpenStackManilaShell()
+        self.mock_object(api_versions.VersionCache, 'invalidate')
+        with mock.patch.object(shell, 'client') as mock_client:
+            cs = mock_client.Client.return_value
+            cs.client.endpoint_url = 'http://manila/v2/1234'
+            cs.shares.list.side_effect = exceptions.NotAcceptable()
+            self.mock_object(_shell, '_discover_client', mock.Mock(
+                return_value=(cs, manilaclient.API_MAX_VERSION)))
+
+            self.assertRaises(exceptions.NotAcceptable, _shell.main, ['list'])
+
+        api_versions.VersionCache.invalidate.assert_called_once_with(
+            'http://manila/v2/1234')
+
+    def test_main_version_cache_disabled(self):
+        self.set_env_vars(self.FAKE_ENV)
+        _shell = shell.OpenStackManilaShell()
+        with mock.patch.object(shell, 'client') as mock_client:
+            self.mock_object(_shell, '_discover_client', mock.Mock(
+                return_value=(mock_client.Client.return_value,
+                              manilaclient.API_MAX_VERSION)))
+
+            _shell.main(['--version-cache-ttl', '0', 'list'])
+
+        self.assertIsNone(_shell.version_cache)
+
+    def test_discover_client_retargets_client(self):
+        current_client = mock.Mock(api_version=manilaclient.API_MAX_VERSION)
+        self.mock_object(api_versions, 'discover_version', mock.Mock(
+            return_value=manilaclient.API_MAX_VERSION))
+
+        with mock.patch.object(shell, 'client') as mock_client:
+            cs, version = shell.OpenStackManilaShell()._discover_client(
+                current_client, manilaclient.API_MAX_VERSION, None, None, {})
+
+        self.assertIs(current_client, cs)
+        self.assertEqual(manilaclient.API_MAX_VERSION, version)
+        self.assertFalse(mock_client.Client.called)
+        current_client.retarget.assert_called_once_with(
+            manilaclient.API_MAX_VERSION,
+            service_type=constants.V2_SERVICE_TYPE,
+            endpoint_type=shell.DEFAULT_MANILA_ENDPOINT_TYPE)
+
+    def test_discover_client_deprecated_version(self):
+        current_client = mock.Mock(api_version=manilaclient.API_MAX_VERSION)
+
+        with mock.patch.object(shell, 'client') as mock_client:
+            cs, version = shell.OpenStackManilaShell()._discover_client(
+                current_client, manilaclient.API_DEPRECATED_VERSION, None,
+                None, {})
+
+        self.assertEqual(mock_client.Client.return_value, cs)
+        mock_client.Client.assert_called_once_with(
+            manilaclient.API_DEPRECATED_VERSION,
+            version=manilaclient.API_DEPRECATED_VERSION,
+            service_type=constants.V1_SERVICE_TYPE,
+            endpoint_type=shell.DEFAULT_MANILA_ENDPOINT_TYPE)
+        self.assertFalse(current_client.retarget.called)
+
+    def test_subcommand_parsers_built_lazily(self):
+        _shell = shell.OpenStackManilaShell()
+        _shell.extensions = []
+        parser = _shell.get_subcommand_parser('2')
+
+        self.assertIn('list', _shell.subcommands)
+        self.assertIn('list', _shell.commands)
+        self.assertEqual({}, dict(_shell.subcommands))
+
+        args = parser.parse_args(['list', '--all-tenants', '1'])
+
+        self.assertEqual(_shell.commands['list'], args.func)
+        self.assertEqual(['list'], list(dict(_shell.subcommands)))
+        self.assertIn('create', list(_shell.subcommands))
+
+    def test_arguments_filtered_by_version(self):
+        @cliutils.arg('--old', start_version='2.0', end_version='2.3')
+        @cliutils.arg('--new', start_version='2.4')
+        @cliutils.arg('--any')
+        def do_fake(cs, args):
+            """Fake command."""
+        _shell = shell.OpenStackManilaShell()
+        _shell.extensions = [mock.Mock(module=mock.Mock(
+            spec=['do_fake'], do_fake=do_fake))]
+
+        parser = _shell.get_subcommand_parser(
+            '2', api_versions.APIVersion('2.3'))
+        args = parser.parse_args(['fake', '--old', 'a', '--any', 'b'])
+
+        self.assertEqual(('a', 'b', None), (args.old, args.any, args.new))
+        self.assertRaises(SystemExit, parser.parse_args,
+                          ['fake', '--new', 'c'])
+        self.assertEqual(
+            ['--any', '--old'],
+            sorted(args[0][0] for args in _shell._get_arguments(
+                do_fake, api_versions.APIVersion('2.3'))))
+        self.assertEqual(
+            ['--any', '--new', '--old'],
+            sorted(args[0][0] for args in _shell._get_arguments(do_fake)))
+
+    @ddt.data(('2.3', None), ('2.4', 'fake_cg'))
+    @ddt.unpack
+    def test_consistency_group_argument_versions(self, version,
+                                                 consistency_group):
+        _shell = shell.OpenStackManilaShell()
+        _shell.extensions = []
+        parser = _shell.get_subcommand_parser(
+            '2', api_versions.APIVersion(version))
+
+        args = parser.parse_args(['list'])
+        self.assertIsNone(args.consistency_group)
+        if consistency_group is None:
+            self.assertRaises(SystemExit, parser.parse_args,
+                              ['list', '--consistency-group', 'fake_cg'])
+        else:
+            args = parser.parse_args(['list', '--cg', 'fake_cg'])
+            self.assertEqual(consistency_group, args.consistency_group)
+
+    def test_extension_hooks_frozen(self):
+        module = types.ModuleType('fake_python_manilaclient_ext')
+        module.__pre_parse_args__ = mock.Mock()
+        _shell = shell.OpenStackManilaShell()
+        self.mock_object(_shell, '_discover_via_python_path',
+                         mock.Mock(return_value=[(module.__name__, module)]))
+
+        extensions = _shell._discover_extensions(
+            api_versions.APIVersion('2.0'))
+        _shell.extensions = extensions
+        _shell._run_extension_hooks('__pre_parse_args__')
+
+        self.assertTrue(module.__pre_parse_args__.called)
+        self.assertRaises(RuntimeError, extensions[0].add_hook,
+                          '__pre_parse_args__', mock.Mock())
+
+    def test_bash_completion(self):
+        out = self.shell('bash-completion')
+
+        words = out.split()
+        self.assertIn('list', words)
+        self.assertIn('--all-tenants', words)
+        self.assertIn('--help', words)
+        self.assertNotIn('bash-completion', words)
+        self.assertNotIn('bash_completion', words)
+
     def test_help_unknown_command(self):
         self.assertRaises(exceptions.CommandError, self.shell, 'help foofoo')
 
@@ -164,7 +385,8 @@ class OpenstackManilaShellTest(utils.TestCase):
             '--os-project-domain-id', '--os-project-domain-name',
             '--os-auth-url', '--os-region-name', '--service-type',
             '--service-name', '--share-service-name', '--endpoint-type',
-            '--os-share-api-version', '--os-cacert', '--retries', '--os-cert',
+            '--os-share-api-version', '--os-cacert', '--retries', '--timings',
+            '--deadline', '--warm-up', '--version-cache-ttl', '--os-cert',
         )
 
         help_text = self.shell('help')
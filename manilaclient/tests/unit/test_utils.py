@@ -0,0 +1,117 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import stat
+
+import fixtures
+import mock
+
+from manilaclient.common import constants
+from manilaclient.tests.unit import utils as test_utils
+from manilaclient import utils
+
+
+class FakeHookable(utils.HookableMixin):
+    _hooks_map = {}
+    _hooks_frozen = False
+
+
+class FakeHookableChild(FakeHookable):
+    pass
+
+
+class HookableMixinTest(test_utils.TestCase):
+
+    def setUp(self):
+        super(HookableMixinTest, self).setUp()
+        self.addCleanup(setattr, FakeHookable, '_hooks_map', {})
+        self.addCleanup(setattr, FakeHookable, '_hooks_frozen', False)
+
+    def test_run_hooks(self):
+        hook_1 = mock.Mock()
+        hook_2 = mock.Mock()
+        FakeHookable.add_hook('fake_hook', hook_1)
+        FakeHookableChild.add_hook('fake_hook', hook_2)
+
+        FakeHookableChild.run_hooks('fake_hook', 'arg', key='value')
+        FakeHookable.run_hooks('unknown_hook')
+
+        hook_1.assert_called_once_with('arg', key='value')
+        hook_2.assert_called_once_with('arg', key='value')
+
+    def test_add_hook_replaces_registry(self):
+        FakeHookable.add_hook('fake_hook', mock.Mock())
+        hooks_map = FakeHookable._hooks_map
+
+        FakeHookableChild.add_hook('fake_hook', mock.Mock())
+
+        self.assertEqual(1, len(hooks_map['fake_hook']))
+        self.assertEqual(2, len(FakeHookable._hooks_map['fake_hook']))
+        self.assertNotIn('_hooks_map', vars(FakeHookableChild))
+
+    def test_freeze_hooks(self):
+        FakeHookable.add_hook('fake_hook', mock.Mock())
+
+        FakeHookableChild.freeze_hooks()
+
+        self.assertRaises(RuntimeError, FakeHookable.add_hook,
+                          'fake_hook', mock.Mock())
+        self.assertEqual(1, len(FakeHookable._hooks_map['fake_hook']))
+
+
+class WritePrivateJsonTest(test_utils.TestCase):
+
+    def setUp(self):
+        super(WritePrivateJsonTest, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+
+    def test_write(self):
+        path = os.path.join(self.directory, 'cache', 'data.json')
+
+        utils.write_private_json(path, {'a': 1})
+
+        with open(path) as f:
+            self.assertEqual({'a': 1}, json.load(f))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEqual(0o700, stat.S_IMODE(
+            os.stat(os.path.dirname(path)).st_mode))
+
+    def test_write_file_name_only(self):
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+
+        utils.write_private_json('data.json', {'a': 1})
+
+        self.assertEqual(['data.json'], os.listdir(self.directory))
+
+
+class LazyModuleTest(test_utils.TestCase):
+
+    def test_imported_on_first_use(self):
+        self.mock_object(utils.importlib, 'import_module',
+                         mock.Mock(return_value=mock.Mock(value=1)))
+        module = utils.LazyModule('fake_module')
+
+        self.assertFalse(utils.importlib.import_module.called)
+        self.assertEqual(1, module.value)
+        self.assertEqual(1, module.value)
+        utils.importlib.import_module.assert_called_once_with('fake_module')
+
+    def test_attributes_set_on_module(self):
+        module = utils.LazyModule('manilaclient.common.constants')
+
+        with mock.patch.object(module, 'V1_SERVICE_TYPE', 'fake'):
+            self.assertEqual('fake', constants.V1_SERVICE_TYPE)
+        self.assertEqual('share', constants.V1_SERVICE_TYPE)
+        self.assertIn('V2_SERVICE_TYPE', dir(module))
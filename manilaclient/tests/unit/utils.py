@@ -15,6 +15,7 @@ import os
 import fixtures
 import mock
 import requests
+import six
 import testtools
 
 
@@ -76,3 +77,9 @@ class TestResponse(requests.Response):
     @property
     def text(self):
         return self._text
+
+    @property
+    def content(self):
+        if isinstance(self._text, six.text_type):
+            return self._text.encode('utf-8')
+        return self._text
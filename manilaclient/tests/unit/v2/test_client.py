@@ -10,15 +10,24 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import uuid
 
 import ddt
+import fixtures
 import mock
 
 import manilaclient
+from manilaclient.common import authcache
+from manilaclient.common import circuitbreaker
+from manilaclient.common import deadlines
+from manilaclient.common import ratelimit
+from manilaclient.common import tokens
 from manilaclient import exceptions
 from manilaclient.tests.unit import utils
 from manilaclient.v2 import client
+from manilaclient.v2 import scheduler_stats
+from manilaclient.v2 import shares
 
 
 @ddt.ddt
@@ -45,6 +54,97 @@ class ClientTest(utils.TestCase):
         self.assertEqual(base_url, c.client.endpoint_url)
         self.assertEqual(retries, c.client.retries)
 
+    def test_managers_created_on_first_use(self):
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        self.assertNotIn('shares', vars(c))
+        manager = c.shares
+        self.assertIsInstance(manager, shares.ShareManager)
+        self.assertIs(manager, c.shares)
+        self.assertIs(c, manager.api)
+        self.assertIsInstance(c.pools, scheduler_stats.PoolManager)
+        self.assertRaises(AttributeError, getattr, c, 'fake_manager')
+
+    def test_get_circuit_breaker_states(self):
+        registry = circuitbreaker.CircuitBreakerRegistry()
+        registry.get('http://1.2.3.4/')
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION,
+                          circuit_breakers=registry)
+
+        states = c.get_circuit_breaker_states()
+
+        self.assertEqual(['http://1.2.3.4/'], list(states))
+        self.assertEqual(circuitbreaker.STATE_CLOSED,
+                         states['http://1.2.3.4/']['state'])
+
+    def test_rate_limiter_loads_limits(self):
+        limiter = ratelimit.RateLimiter()
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION,
+                          rate_limiter=limiter)
+        self.mock_object(c.client, 'get', mock.Mock(return_value=(None, {
+            'limits': {'rate': [{
+                'uri': '*', 'regex': '.*',
+                'limit': [{'verb': 'POST', 'value': 10, 'remaining': 2,
+                           'unit': 'MINUTE', 'next-available': ''}],
+            }], 'absolute': {}},
+        })))
+
+        rate_limits = limiter.loader()
+
+        c.client.get.assert_called_once_with('/limits')
+        self.assertEqual(['POST'], [limit.verb for limit in rate_limits])
+
+    def test_deadline(self):
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        with c.deadline(10):
+            self.assertTrue(9 < deadlines.get_remaining() <= 10)
+        self.assertIsNone(deadlines.get_remaining())
+
+    def test_auth_via_token_not_renewed(self):
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        self.assertIsNone(c.client.token_provider)
+
+    @ddt.data(True, False)
+    def test_auth_via_session_renews_token(self, reauthenticate):
+        sess = mock.Mock()
+        sess.get_token.return_value = 'token'
+        sess.get_endpoint.return_value = 'http://1.2.3.4/v2'
+        auth = mock.Mock()
+
+        c = client.Client(session=sess, auth=auth,
+                          api_version=manilaclient.API_MAX_VERSION,
+                          reauthenticate=reauthenticate)
+
+        if reauthenticate:
+            self.assertIsInstance(c.client.token_provider,
+                                  tokens.SessionTokenProvider)
+            self.assertIs(sess, c.client.token_provider.session)
+            self.assertIs(auth, c.client.token_provider.auth)
+        else:
+            self.assertIsNone(c.client.token_provider)
+
+    def test_warm_up_connections(self):
+        self.mock_object(client.httpclient, 'HTTPClient')
+
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION,
+                          warm_up_connections=2)
+
+        c.client.warm_up.assert_called_once_with(2)
+
     def test_auth_via_token_invalid(self):
         self.assertRaises(exceptions.ClientException, client.Client,
                           api_version=manilaclient.API_MAX_VERSION,
@@ -90,7 +190,27 @@ class ClientTest(utils.TestCase):
             timeout=None,
             retries=None,
             http_log_debug=False,
-            api_version=manilaclient.API_DEPRECATED_VERSION)
+            api_version=manilaclient.API_DEPRECATED_VERSION,
+            pool_connections=10,
+            pool_maxsize=10,
+            pool_idle_timeout=None,
+            json_codec=None,
+            request_compression_threshold=None,
+            http_cache_size=None,
+            retry_policy=None,
+            circuit_breakers=None,
+            timing_collector=None,
+            metrics=None,
+            tracer=None,
+            coalesce_requests=False,
+            rate_limiter=None,
+            endpoint_strategy='round-robin',
+            hedging_policy=None,
+            connect_timeout=None,
+            read_timeout=None,
+            deadline=None,
+            transport=None,
+            token_provider=mock.ANY)
         self.assertIsNotNone(c.client)
 
     @mock.patch.object(client.Client, '_get_keystone_client', mock.Mock())
@@ -131,7 +251,27 @@ class ClientTest(utils.TestCase):
             timeout=None,
             retries=None,
             http_log_debug=False,
-            api_version=manilaclient.API_MIN_VERSION)
+            api_version=manilaclient.API_MIN_VERSION,
+            pool_connections=10,
+            pool_maxsize=10,
+            pool_idle_timeout=None,
+            json_codec=None,
+            request_compression_threshold=None,
+            http_cache_size=None,
+            retry_policy=None,
+            circuit_breakers=None,
+            timing_collector=None,
+            metrics=None,
+            tracer=None,
+            coalesce_requests=False,
+            rate_limiter=None,
+            endpoint_strategy='round-robin',
+            hedging_policy=None,
+            connect_timeout=None,
+            read_timeout=None,
+            deadline=None,
+            transport=None,
+            token_provider=mock.ANY)
         self.assertIsNotNone(c.client)
 
     def _get_client_args(self, **kwargs):
@@ -209,7 +349,24 @@ class ClientTest(utils.TestCase):
         client.httpclient.HTTPClient.assert_called_with(
             'http://3.3.3.3', mock.ANY, 'python-manilaclient', insecure=False,
             cacert=None, timeout=None, retries=None, http_log_debug=False,
-            api_version=manilaclient.API_MIN_VERSION)
+            api_version=manilaclient.API_MIN_VERSION, pool_connections=10,
+            pool_maxsize=10, pool_idle_timeout=None, json_codec=None,
+            request_compression_threshold=None,
+            http_cache_size=None,
+            retry_policy=None,
+            circuit_breakers=None,
+            timing_collector=None,
+            metrics=None,
+            tracer=None,
+            coalesce_requests=False,
+            rate_limiter=None,
+            endpoint_strategy='round-robin',
+            hedging_policy=None,
+            connect_timeout=None,
+            read_timeout=None,
+            deadline=None,
+            transport=None,
+            token_provider=mock.ANY)
 
         client.ks_client.Client.assert_called_with(
             version=(3, 0), auth_url='url_v3.0',
@@ -264,7 +421,24 @@ class ClientTest(utils.TestCase):
         client.httpclient.HTTPClient.assert_called_with(
             'http://3.3.3.3', mock.ANY, 'python-manilaclient', insecure=False,
             cacert=None, timeout=None, retries=None, http_log_debug=False,
-            api_version=manilaclient.API_MIN_VERSION)
+            api_version=manilaclient.API_MIN_VERSION, pool_connections=10,
+            pool_maxsize=10, pool_idle_timeout=None, json_codec=None,
+            request_compression_threshold=None,
+            http_cache_size=None,
+            retry_policy=None,
+            circuit_breakers=None,
+            timing_collector=None,
+            metrics=None,
+            tracer=None,
+            coalesce_requests=False,
+            rate_limiter=None,
+            endpoint_strategy='round-robin',
+            hedging_policy=None,
+            connect_timeout=None,
+            read_timeout=None,
+            deadline=None,
+            transport=None,
+            token_provider=mock.ANY)
         client.ks_client.Client.assert_called_with(
             version=(2, 0), auth_url='url_v2.0',
             username=client_args['username'],
@@ -278,6 +452,206 @@ class ClientTest(utils.TestCase):
             client_args['service_type'])
         mocked_ks_client.authenticate.assert_called_with()
 
+    def _get_auth_cache(self):
+        directory = self.useFixture(fixtures.TempDir()).path
+        return authcache.AuthCache(directory)
+
+    def _mock_keystone(self, catalog):
+        self.mock_object(client.httpclient, 'HTTPClient')
+        self.mock_object(client.ks_client, 'Client')
+        self.mock_object(client.discover, 'Discover')
+        self.mock_object(client.session, 'Session')
+        client.discover.Discover.return_value.url_for.side_effect = (
+            lambda v: 'url_v3.0' if v == 'v3.0' else None)
+        mocked_ks_client = client.ks_client.Client.return_value
+        mocked_ks_client.auth_token = 'fake_token'
+        mocked_ks_client.auth_ref.expires = (
+            datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+        mocked_ks_client.auth_ref.will_expire_soon.return_value = False
+        mocked_ks_client.service_catalog.get_endpoints.return_value = catalog
+        return mocked_ks_client
+
+    def test_client_init_auth_cache(self):
+        mocked_ks_client = self._mock_keystone({
+            'sharev2': [{'region': 'SecondRegion', 'interface': 'public',
+                         'url': 'http://3.3.3.3'}],
+        })
+        auth_cache = self._get_auth_cache()
+        client_args = self._get_client_args(
+            password='foo', tenant_id='bar', auth_cache=auth_cache)
+
+        client.Client(**client_args)
+
+        self.assertEqual(1, mocked_ks_client.authenticate.call_count)
+        self.assertEqual('http://3.3.3.3',
+                         client.httpclient.HTTPClient.call_args[0][0])
+
+        # Second client uses the token and the endpoint of the first one
+        c = client.Client(**client_args)
+
+        self.assertEqual(1, mocked_ks_client.authenticate.call_count)
+        self.assertIsNone(c.keystone_client)
+        args, kwargs = client.httpclient.HTTPClient.call_args
+        self.assertEqual(('http://3.3.3.3', 'fake_token'), args[:2])
+        provider = kwargs['token_provider']
+        self.assertIsInstance(provider, tokens.CachedTokenProvider)
+
+        # Rejected token is replaced by authenticating again
+        provider.invalidate()
+        self.assertEqual('fake_token', provider.get_token())
+        self.assertEqual(2, mocked_ks_client.authenticate.call_count)
+
+        # Different credentials do not share the entry
+        client.Client(**dict(client_args, password='bar'))
+
+        self.assertEqual(3, mocked_ks_client.authenticate.call_count)
+
+    def test_client_init_auth_cache_force_new_token(self):
+        mocked_ks_client = self._mock_keystone({
+            'sharev2': [{'region': 'SecondRegion', 'interface': 'public',
+                         'url': 'http://3.3.3.3'}],
+        })
+        client_args = self._get_client_args(
+            password='foo', tenant_id='bar',
+            auth_cache=self._get_auth_cache(), force_new_token=True)
+
+        client.Client(**client_args)
+        client.Client(**client_args)
+
+        self.assertEqual(2, mocked_ks_client.authenticate.call_count)
+
+    def test_retarget(self):
+        mocked_ks_client = self._mock_keystone({
+            'share': [{'region': 'SecondRegion', 'interface': 'public',
+                       'url': 'http://3.3.3.3/v1'}],
+            'sharev2': [{'region': 'SecondRegion', 'interface': 'public',
+                         'url': 'http://3.3.3.3/v2'}],
+        })
+        c = client.Client(**self._get_client_args(
+            password='foo', tenant_id='bar', service_type='share',
+            api_version=manilaclient.API_MAX_VERSION))
+        http_client = c.client
+
+        c.retarget(manilaclient.API_MIN_VERSION, service_type='sharev2')
+
+        self.assertIs(http_client, c.client)
+        self.assertEqual(manilaclient.API_MIN_VERSION, c.api_version)
+        self.assertEqual('sharev2', c.service_type)
+        http_client.set_endpoint_url.assert_called_once_with(
+            'http://3.3.3.3/v2')
+        http_client.set_api_version.assert_called_once_with(
+            manilaclient.API_MIN_VERSION)
+        mocked_ks_client.authenticate.assert_called_once_with()
+
+    def test_retarget_same_endpoint(self):
+        self._mock_keystone({})
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        c.retarget(manilaclient.API_MIN_VERSION, service_type='sharev2',
+                   endpoint_type='publicURL')
+
+        self.assertFalse(c.client.set_endpoint_url.called)
+        c.client.set_api_version.assert_called_once_with(
+            manilaclient.API_MIN_VERSION)
+
+    def test_retarget_token_without_catalog(self):
+        self._mock_keystone({})
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v1',
+                          service_type='share',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        c.retarget(manilaclient.API_MIN_VERSION, service_type='sharev2')
+
+        self.assertFalse(c.client.set_endpoint_url.called)
+        self.assertEqual('sharev2', c.service_type)
+
+    def test_retarget_other_major_version(self):
+        self._mock_keystone({})
+        c = client.Client(input_auth_token='token',
+                          service_catalog_url='http://1.2.3.4/v2',
+                          api_version=manilaclient.API_MAX_VERSION)
+
+        self.assertRaises(exceptions.UnsupportedVersion, c.retarget,
+                          manilaclient.API_DEPRECATED_VERSION)
+        self.assertEqual(manilaclient.API_MAX_VERSION, c.api_version)
+
+    def test_retarget_auth_cache(self):
+        mocked_ks_client = self._mock_keystone({
+            'share': [{'region': 'SecondRegion', 'interface': 'public',
+                       'url': 'http://3.3.3.3/v1'}],
+            'sharev2': [{'region': 'SecondRegion', 'interface': 'public',
+                         'url': 'http://3.3.3.3/v2'}],
+        })
+        client_args = self._get_client_args(
+            password='foo', tenant_id='bar', service_type='share',
+            api_version=manilaclient.API_MAX_VERSION,
+            auth_cache=self._get_auth_cache())
+        client.Client(**client_args)
+
+        # The endpoint of sharev2 is looked up in the catalog of the token
+        c = client.Client(**client_args)
+        c.retarget(manilaclient.API_MAX_VERSION, service_type='sharev2')
+
+        self.assertEqual(2, mocked_ks_client.authenticate.call_count)
+        c.client.set_endpoint_url.assert_called_once_with(
+            'http://3.3.3.3/v2')
+
+        # Both endpoints are cached now
+        c = client.Client(**client_args)
+        c.retarget(manilaclient.API_MAX_VERSION, service_type='sharev2')
+
+        self.assertEqual(2, mocked_ks_client.authenticate.call_count)
+        c.client.set_endpoint_url.assert_called_with('http://3.3.3.3/v2')
+
+    def test_client_init_keeps_all_matching_endpoints(self):
+        self.mock_object(client.httpclient, 'HTTPClient')
+        self.mock_object(client.ks_client, 'Client')
+        self.mock_object(client.discover, 'Discover')
+        self.mock_object(client.session, 'Session')
+        client_args = self._get_client_args(
+            password='foo', tenant_id='bar',
+            endpoint_strategy='least-outstanding')
+        catalog = {
+            'sharev2': [
+                {'region': 'FirstRegion', 'interface': 'public',
+                 'url': 'http://1.1.1.1'},
+                {'region': 'SecondRegion', 'interface': 'public',
+                 'url': 'http://3.3.3.3'},
+                {'region': 'SecondRegion', 'interface': 'internal',
+                 'url': 'http://3.3.3.1'},
+                {'region': 'SecondRegion', 'interface': 'public',
+                 'url': 'http://3.3.3.4'},
+                {'region': 'SecondRegion', 'interface': 'public',
+                 'url': 'http://3.3.3.3'},
+            ],
+        }
+        client.discover.Discover.return_value.url_for.side_effect = (
+            lambda v: 'url_v3.0' if v == 'v3.0' else None)
+        mocked_ks_client = client.ks_client.Client.return_value
+        mocked_ks_client.service_catalog.get_endpoints.return_value = catalog
+
+        c = client.Client(**client_args)
+
+        client.httpclient.HTTPClient.assert_called_with(
+            ['http://3.3.3.3', 'http://3.3.3.4'], mock.ANY,
+            'python-manilaclient', insecure=False, cacert=None, timeout=None,
+            retries=None, http_log_debug=False,
+            api_version=manilaclient.API_DEPRECATED_VERSION,
+            pool_connections=10, pool_maxsize=10, pool_idle_timeout=None,
+            json_codec=None, request_compression_threshold=None,
+            http_cache_size=None, retry_policy=None, circuit_breakers=None,
+            timing_collector=None, metrics=None, tracer=None,
+            coalesce_requests=False, rate_limiter=None,
+            endpoint_strategy='least-outstanding', hedging_policy=None,
+            connect_timeout=None, read_timeout=None, deadline=None,
+            transport=None,
+            token_provider=mock.ANY)
+        self.assertEqual(c.client.get_endpoint_states.return_value,
+                         c.get_endpoint_states())
+
     @mock.patch.object(client.ks_client, 'Client', mock.Mock())
     @mock.patch.object(client.discover, 'Discover', mock.Mock())
     @mock.patch.object(client.session, 'Session', mock.Mock())
@@ -89,6 +89,14 @@ class ShareNetworkTest(utils.TestCase):
                 share_networks.RESOURCES_PATH + '/detail',
                 share_networks.RESOURCES_NAME)
 
+    def test_list_stream(self):
+        with mock.patch.object(self.manager, '_list_stream',
+                               mock.Mock(return_value=None)):
+            self.manager.list(stream=True)
+            self.manager._list_stream.assert_called_once_with(
+                share_networks.RESOURCES_PATH + '/detail',
+                share_networks.RESOURCES_NAME)
+
     def test_list_with_filters(self):
         filters = {'all_tenants': 1, 'status': 'ERROR'}
         expected_path = ("%s/detail?all_tenants=1&status="
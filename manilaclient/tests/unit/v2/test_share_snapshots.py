@@ -103,3 +103,11 @@ class ShareSnapshotsTest(utils.TestCase):
     def test_list_share_snapshots_detail(self):
         cs.share_snapshots.list(detailed=True)
         cs.assert_called('GET', '/snapshots/detail')
+
+    def test_list_share_snapshots_detail_stream(self):
+        snapshots = cs.share_snapshots.list(detailed=True, stream=True)
+
+        cs.assert_called('GET', '/snapshots/detail')
+        snapshots = list(snapshots)
+        self.assertEqual(1, len(snapshots))
+        self.assertIsInstance(snapshots[0], share_snapshots.ShareSnapshot)
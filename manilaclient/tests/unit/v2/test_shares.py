@@ -239,6 +239,15 @@ class SharesTest(utils.TestCase):
         cs.shares.list(detailed=True)
         cs.assert_called('GET', '/shares/detail?is_public=True')
 
+    def test_list_shares_detailed_stream(self):
+        result = cs.shares.list(detailed=True, stream=True)
+
+        cs.assert_called('GET', '/shares/detail?is_public=True')
+        self.assertNotIsInstance(result, list)
+        result = list(result)
+        self.assertEqual(1, len(result))
+        self.assertIsInstance(result[0], shares.Share)
+
     def test_list_shares_detailed_with_search_opts(self):
         search_opts = {
             'fake_str': 'fake_str_value',
@@ -10,19 +10,53 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import importlib
+import json
+import os
+import tempfile
+import threading
+
 import six
 
 
 class HookableMixin(object):
-    """Mixin so classes can register and run hooks."""
+    """Mixin so classes can register and run hooks.
+
+    Hooks are registered while setting up, e.g. when loading extensions,
+    and may then be run by many threads at once. The registry is never
+    modified in place, each registration replaces it with an updated copy,
+    so running hooks needs no locking. After freeze_hooks() is called no
+    more hooks can be registered, the shell does so once it discovered the
+    extensions.
+    """
     _hooks_map = {}
+    _hooks_frozen = False
+    _hooks_lock = threading.Lock()
+
+    @classmethod
+    def _get_hooks_owner(cls):
+        """Returns the class holding the registry used by 'cls'."""
+        for klass in cls.__mro__:
+            if '_hooks_map' in vars(klass):
+                return klass
 
     @classmethod
     def add_hook(cls, hook_type, hook_func):
-        if hook_type not in cls._hooks_map:
-            cls._hooks_map[hook_type] = []
+        with cls._hooks_lock:
+            owner = cls._get_hooks_owner()
+            if owner._hooks_frozen:
+                raise RuntimeError("Hooks can not be added after the hook "
+                                   "registry is frozen.")
+            hooks_map = dict(owner._hooks_map)
+            hooks_map[hook_type] = (
+                tuple(hooks_map.get(hook_type, ())) + (hook_func,))
+            owner._hooks_map = hooks_map
 
-        cls._hooks_map[hook_type].append(hook_func)
+    @classmethod
+    def freeze_hooks(cls):
+        """Makes the hook registry read-only."""
+        with cls._hooks_lock:
+            cls._get_hooks_owner()._hooks_frozen = True
 
     @classmethod
     def run_hooks(cls, hook_type, *args, **kwargs):
@@ -51,3 +85,62 @@ def get_function_name(func):
             return "%s.%s" % (func.__module__, func.__name__)
     else:
         return "%s.%s" % (func.__module__, func.__qualname__)
+
+
+def write_private_json(path, data):
+    """Writes data as JSON to a file only its owner may access.
+
+    The file is replaced at once, so concurrent readers never see it half
+    written. Missing directories are created accessible only by the owner.
+    """
+    directory = os.path.dirname(path) or os.curdir
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+class LazyModule(object):
+    """Module imported on first access of one of its attributes.
+
+    Stands in for modules that are expensive to import and not needed by
+    every use of the module importing them, e.g. 'manila --version' needs
+    neither keystoneclient nor oslo_utils.strutils::
+
+        strutils = utils.LazyModule('oslo_utils.strutils')
+
+    Setting and deleting attributes, e.g. when mocking them, changes the
+    module itself.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return '<LazyModule %r>' % self.__dict__['_name']
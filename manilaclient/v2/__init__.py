@@ -14,4 +14,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from manilaclient.v2.client import Client    # noqa
+import sys
+
+
+# Importing manager modules, e.g. by the shell, does not import the client
+# with all of its dependencies.
+def __getattr__(name):
+    if name != 'Client':
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    from manilaclient.v2 import client
+    return client.Client
+
+
+# Module level __getattr__ is not supported before Python 3.7
+if sys.version_info < (3, 7):
+    from manilaclient.v2.client import Client    # noqa
@@ -10,33 +10,48 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import importlib
+import threading
 import warnings
 
-from keystoneclient import adapter
-from keystoneclient import client as ks_client
-from keystoneclient import discover
-from keystoneclient import session
 import six
 
 import manilaclient
+from manilaclient.common import authcache
 from manilaclient.common import constants
+from manilaclient.common import deadlines
+from manilaclient.common import endpoints
 from manilaclient.common import httpclient
+from manilaclient.common import tokens
 from manilaclient import exceptions
-from manilaclient.v2 import consistency_group_snapshots as cg_snapshots
-from manilaclient.v2 import consistency_groups
-from manilaclient.v2 import limits
-from manilaclient.v2 import quota_classes
-from manilaclient.v2 import quotas
-from manilaclient.v2 import scheduler_stats
-from manilaclient.v2 import security_services
-from manilaclient.v2 import services
-from manilaclient.v2 import share_instances
-from manilaclient.v2 import share_networks
-from manilaclient.v2 import share_servers
-from manilaclient.v2 import share_snapshots
-from manilaclient.v2 import share_type_access
-from manilaclient.v2 import share_types
-from manilaclient.v2 import shares
+from manilaclient import utils
+
+# Only clients authenticating themselves need keystoneclient
+adapter = utils.LazyModule('keystoneclient.adapter')
+ks_client = utils.LazyModule('keystoneclient.client')
+discover = utils.LazyModule('keystoneclient.discover')
+session = utils.LazyModule('keystoneclient.session')
+
+# Modules and classes of managers by their attribute names, managers are
+# created on first use
+MANAGERS = {
+    'limits': ('limits', 'LimitsManager'),
+    'services': ('services', 'ServiceManager'),
+    'security_services': ('security_services', 'SecurityServiceManager'),
+    'share_networks': ('share_networks', 'ShareNetworkManager'),
+    'quota_classes': ('quota_classes', 'QuotaClassSetManager'),
+    'quotas': ('quotas', 'QuotaSetManager'),
+    'shares': ('shares', 'ShareManager'),
+    'share_instances': ('share_instances', 'ShareInstanceManager'),
+    'share_snapshots': ('share_snapshots', 'ShareSnapshotManager'),
+    'share_types': ('share_types', 'ShareTypeManager'),
+    'share_type_access': ('share_type_access', 'ShareTypeAccessManager'),
+    'share_servers': ('share_servers', 'ShareServerManager'),
+    'pools': ('scheduler_stats', 'PoolManager'),
+    'consistency_groups': ('consistency_groups', 'ConsistencyGroupManager'),
+    'cg_snapshots': ('consistency_group_snapshots',
+                     'ConsistencyGroupSnapshotManager'),
+}
 
 
 class Client(object):
@@ -82,8 +97,31 @@ class Client(object):
                  project_domain_name=None,
                  cert=None,
                  password=None,
+                 pool_connections=httpclient.DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=httpclient.DEFAULT_POOL_MAXSIZE,
+                 pool_idle_timeout=None,
+                 json_codec=None,
+                 request_compression_threshold=None,
+                 http_cache_size=None,
+                 retry_policy=None,
+                 circuit_breakers=None,
+                 timing_collector=None,
+                 metrics=None,
+                 tracer=None,
+                 coalesce_requests=False,
+                 rate_limiter=None,
+                 endpoint_strategy=endpoints.STRATEGY_ROUND_ROBIN,
+                 hedging_policy=None,
+                 connect_timeout=None,
+                 read_timeout=None,
+                 deadline=None,
+                 transport=None,
+                 reauthenticate=True,
+                 warm_up_connections=0,
+                 auth_cache=None,
                  **kwargs):
 
+        self._managers_lock = threading.RLock()
         self.username = username
         self.password = password or api_key
         self.tenant_id = tenant_id or project_id
@@ -108,6 +146,7 @@ class Client(object):
         self.use_keyring = use_keyring
         self.force_new_token = force_new_token
         self.cached_token_lifetime = cached_token_lifetime
+        self.auth_cache = auth_cache
 
         service_name = kwargs.get("share_service_name", service_name)
 
@@ -149,6 +188,7 @@ class Client(object):
         # NOTE(u_glide): token authorization has highest priority.
         # That's why session and/or password will be ignored
         # if token is provided.
+        token_provider = None
         if not input_auth_token:
             if session:
                 self.keystone_client = adapter.LegacyJsonAdapter(
@@ -159,71 +199,192 @@ class Client(object):
                     service_name=service_name,
                     region_name=region_name)
                 input_auth_token = self.keystone_client.session.get_token(auth)
+                token_provider = tokens.SessionTokenProvider(
+                    self.keystone_client.session, auth)
 
             else:
-                self.keystone_client = self._get_keystone_client()
-                input_auth_token = self.keystone_client.auth_token
+                cached_auth = self._get_cached_auth(service_type)
+                if cached_auth is not None:
+                    input_auth_token, expires_at, cached_url = cached_auth
+                    service_catalog_url = service_catalog_url or cached_url
+                    token_provider = tokens.CachedTokenProvider(
+                        input_auth_token, expires_at,
+                        self._authenticate_again,
+                        stale_duration=cached_token_lifetime)
+                else:
+                    self.keystone_client = self._get_keystone_client()
+                    input_auth_token = self.keystone_client.auth_token
+                    token_provider = tokens.KeystoneClientTokenProvider(
+                        self.keystone_client,
+                        stale_duration=cached_token_lifetime)
+
+        # Tokens obtained here are renewed before they expire, and once
+        # more when the API rejects them.
+        if not reauthenticate:
+            token_provider = None
 
         if not input_auth_token:
             raise RuntimeError("Not Authorized")
 
-        if session and not service_catalog_url:
-            service_catalog_url = self.keystone_client.session.get_endpoint(
-                auth, interface=endpoint_type,
-                service_type=service_type)
-        elif not service_catalog_url:
-            catalog = self.keystone_client.service_catalog.get_endpoints(
-                service_type)
-            for catalog_entry in catalog.get(service_type, []):
-                if (catalog_entry.get("interface") == (
-                        endpoint_type.lower().split("url")[0]) or
-                        catalog_entry.get(endpoint_type)):
-                    if (region_name and not region_name == (
-                            catalog_entry.get(
-                                "region",
-                                catalog_entry.get("region_id")))):
-                        continue
-                    service_catalog_url = catalog_entry.get(
-                        "url", catalog_entry.get(endpoint_type))
-                    break
+        self.auth = auth
+        self.service_type = service_type
+        if not service_catalog_url:
+            service_catalog_url = self._get_service_catalog_url(
+                service_type, endpoint_type)
 
         if not service_catalog_url:
             raise RuntimeError("Could not find Manila endpoint in catalog")
 
-        self.api_version = api_version
-        self.client = httpclient.HTTPClient(service_catalog_url,
-                                            input_auth_token,
-                                            user_agent,
-                                            insecure=insecure,
-                                            cacert=cacert,
-                                            timeout=timeout,
-                                            retries=retries,
-                                            http_log_debug=http_log_debug,
-                                            api_version=self.api_version)
-
-        self.limits = limits.LimitsManager(self)
-        self.services = services.ServiceManager(self)
-        self.security_services = security_services.SecurityServiceManager(self)
-        self.share_networks = share_networks.ShareNetworkManager(self)
-
-        self.quota_classes = quota_classes.QuotaClassSetManager(self)
-        self.quotas = quotas.QuotaSetManager(self)
-
-        self.shares = shares.ShareManager(self)
-        self.share_instances = share_instances.ShareInstanceManager(self)
-        self.share_snapshots = share_snapshots.ShareSnapshotManager(self)
-
-        self.share_types = share_types.ShareTypeManager(self)
-        self.share_type_access = share_type_access.ShareTypeAccessManager(self)
-        self.share_servers = share_servers.ShareServerManager(self)
-        self.pools = scheduler_stats.PoolManager(self)
-        self.consistency_groups = (
-            consistency_groups.ConsistencyGroupManager(self))
-        self.cg_snapshots = (
-            cg_snapshots.ConsistencyGroupSnapshotManager(self))
+        self.service_catalog_url = service_catalog_url
+        if self.keystone_client is not None and not session:
+            self._cache_auth()
 
+        self.api_version = api_version
+        self.client = self._create_http_client(
+            service_catalog_url,
+            input_auth_token,
+            user_agent,
+            insecure=insecure,
+            cacert=cacert,
+            timeout=timeout,
+            retries=retries,
+            http_log_debug=http_log_debug,
+            api_version=self.api_version,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_idle_timeout=pool_idle_timeout,
+            json_codec=json_codec,
+            request_compression_threshold=request_compression_threshold,
+            http_cache_size=http_cache_size,
+            retry_policy=retry_policy,
+            circuit_breakers=circuit_breakers,
+            timing_collector=timing_collector,
+            metrics=metrics,
+            tracer=tracer,
+            coalesce_requests=coalesce_requests,
+            rate_limiter=rate_limiter,
+            endpoint_strategy=endpoint_strategy,
+            hedging_policy=hedging_policy,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            deadline=deadline,
+            transport=transport,
+            token_provider=token_provider)
+        # Handshakes overlap with setting up managers and extensions
+        if warm_up_connections:
+            self.client.warm_up(warm_up_connections)
+
+        self._create_managers()
         self._load_extensions(extensions)
 
+        if rate_limiter is not None and rate_limiter.loader is None:
+            rate_limiter.loader = self._load_rate_limits
+
+    def _get_service_catalog_url(self, service_type, endpoint_type):
+        if self.session:
+            return self.keystone_client.session.get_endpoint(
+                self.auth, interface=endpoint_type,
+                service_type=service_type)
+
+        catalog = self.keystone_client.service_catalog.get_endpoints(
+            service_type)
+        # All matching endpoints are used, requests are load balanced
+        # across them and fail over between them.
+        service_catalog_urls = []
+        for catalog_entry in catalog.get(service_type, []):
+            if (catalog_entry.get("interface") == (
+                    endpoint_type.lower().split("url")[0]) or
+                    catalog_entry.get(endpoint_type)):
+                if (self.region_name and not self.region_name == (
+                        catalog_entry.get(
+                            "region",
+                            catalog_entry.get("region_id")))):
+                    continue
+                url = catalog_entry.get(
+                    "url", catalog_entry.get(endpoint_type))
+                if url not in service_catalog_urls:
+                    service_catalog_urls.append(url)
+        if len(service_catalog_urls) == 1:
+            return service_catalog_urls[0]
+        return service_catalog_urls
+
+    def retarget(self, api_version, service_type=None, endpoint_type=None):
+        """Switches the client to another API version and endpoint.
+
+        The token, connections and everything else set up for the client
+        are kept, so that switching is cheaper than creating a new client.
+        The endpoint of the service and endpoint type is looked up in the
+        service catalog the client was authenticated with, clients created
+        with 'service_catalog_url' keep their endpoint.
+
+        :param api_version: APIVersion of the same major version
+        :param service_type: service type of the new endpoint, e.g. sharev2
+        :param endpoint_type: endpoint type of the new endpoint
+        """
+        if (api_version.get_major_version() !=
+                self.api_version.get_major_version()):
+            raise exceptions.UnsupportedVersion(
+                "Client of API version %s cannot be switched to %s." % (
+                    self.api_version.get_string(), api_version.get_string()))
+
+        service_type = service_type or self.service_type
+        endpoint_type = endpoint_type or self.endpoint_type
+        if (service_type != self.service_type or
+                endpoint_type != self.endpoint_type):
+            self.service_type = service_type
+            self.endpoint_type = endpoint_type
+            service_catalog_url = self._find_service_catalog_url()
+            if service_catalog_url:
+                self.service_catalog_url = service_catalog_url
+                self.client.set_endpoint_url(service_catalog_url)
+
+        self.api_version = api_version
+        self.client.set_api_version(api_version)
+
+    def _find_service_catalog_url(self):
+        if self.keystone_client is None:
+            if self.auth_cache is None:
+                # Token and endpoint were passed in
+                return None
+            cached_auth = self._get_cached_auth(self.service_type)
+            if cached_auth is not None:
+                return cached_auth[2]
+            # The catalog of the cached token is needed
+            self.keystone_client = self._get_keystone_client()
+
+        service_catalog_url = self._get_service_catalog_url(
+            self.service_type, self.endpoint_type)
+        if not service_catalog_url:
+            raise RuntimeError("Could not find Manila endpoint in catalog")
+        if not self.session:
+            self.service_catalog_url = service_catalog_url
+            self._cache_auth()
+        return service_catalog_url
+
+    def _create_http_client(self, *args, **kwargs):
+        return httpclient.HTTPClient(*args, **kwargs)
+
+    def _create_managers(self):
+        # Managers are created on first use, see __getattr__()
+        pass
+
+    def __getattr__(self, name):
+        # Only called for attributes not set yet
+        try:
+            module_name, class_name = MANAGERS[name]
+        except KeyError:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (
+                    self.__class__.__name__, name))
+        with self._managers_lock:
+            manager = self.__dict__.get(name)
+            if manager is None:
+                module = importlib.import_module(
+                    'manilaclient.v2.' + module_name)
+                manager = getattr(module, class_name)(self)
+                setattr(self, name, manager)
+        return manager
+
     def _load_extensions(self, extensions):
         if not extensions:
             return
@@ -232,6 +393,54 @@ class Client(object):
             if extension.manager_class:
                 setattr(self, extension.name, extension.manager_class(self))
 
+    def get_circuit_breaker_states(self):
+        """Returns state of circuit breakers of used Manila endpoints.
+
+        Circuit breakers are enabled by passing an instance of
+        :class:`manilaclient.common.circuitbreaker.CircuitBreakerRegistry`
+        as 'circuit_breakers' argument, otherwise an empty dict is returned.
+        """
+        return self.client.get_circuit_breaker_states()
+
+    def deadline(self, seconds):
+        """Returns context manager bounding time of calls made in it.
+
+            >>> with manila.deadline(5):
+            ...     shares = manila.shares.list()
+            ...     manila.shares.get(shares[0])
+
+        The deadline covers all requests sent by the calls, including
+        retries and delays between them, and
+        :class:`manilaclient.exceptions.DeadlineExceeded` is raised once
+        it passes. The 'deadline' argument of the client sets a deadline of
+        every request instead, its retries included.
+        """
+        return deadlines.deadline(seconds)
+
+    def get_endpoint_states(self):
+        """Returns health and load of Manila endpoints by their URLs.
+
+        Only clients with several endpoints, found in the service catalog
+        or passed as a list in 'service_catalog_url', track them, otherwise
+        an empty dict is returned.
+        """
+        return self.client.get_endpoint_states()
+
+    def _load_rate_limits(self):
+        return list(self.limits.get().rate)
+
+    def get_timings(self):
+        """Returns timings of requests sent by the client.
+
+        Timings are recorded only if an instance of
+        :class:`manilaclient.common.timings.TimingCollector` is passed as
+        'timing_collector' argument, otherwise an empty list is returned.
+        """
+        return self.client.get_timings()
+
+    def reset_timings(self):
+        self.client.reset_timings()
+
     def authenticate(self):
         """Authenticate against the server.
 
@@ -245,6 +454,45 @@ class Client(object):
                       "Client automatically makes authentication call "
                       "in the constructor.")
 
+    def _get_auth_cache_key(self):
+        return self.auth_cache.make_key(
+            auth_url=self.auth_url,
+            user_id=self.user_id,
+            username=self.username,
+            user_domain_id=self.user_domain_id,
+            user_domain_name=self.user_domain_name,
+            # Wrong password must not pass with a cached token
+            password=self.password,
+            project_id=self.project_id,
+            project_name=self.project_name,
+            project_domain_id=self.project_domain_id,
+            project_domain_name=self.project_domain_name,
+            region_name=self.region_name,
+            endpoint_type=self.endpoint_type)
+
+    def _get_cached_auth(self, service_type):
+        """Returns (token, expiry, endpoint) cached by an earlier client."""
+        if self.auth_cache is None or self.force_new_token:
+            return None
+        return self.auth_cache.get(self._get_auth_cache_key(), service_type)
+
+    def _cache_auth(self):
+        if self.auth_cache is None:
+            return
+        expires_at = authcache.get_expiry(self.keystone_client.auth_ref)
+        if expires_at is None:
+            return
+        self.auth_cache.set(self._get_auth_cache_key(),
+                            self.keystone_client.auth_token, expires_at,
+                            self.service_type, self.service_catalog_url)
+
+    def _authenticate_again(self):
+        """Replaces a cached token that expired or was rejected."""
+        self.keystone_client = self._get_keystone_client()
+        self._cache_auth()
+        return tokens.KeystoneClientTokenProvider(
+            self.keystone_client, stale_duration=self.cached_token_lifetime)
+
     def _get_keystone_client(self):
         # First create a Keystone session
         if self.insecure:
@@ -36,15 +36,15 @@ class ConsistencyGroupSnapshot(common_base.Resource):
 
     def update(self, **kwargs):
         """Update this consistency group snapshot."""
-        self.manager.update(self, **kwargs)
+        return self.manager.update(self, **kwargs)
 
     def delete(self):
         """Delete this consistency group snapshot."""
-        self.manager.delete(self)
+        return self.manager.delete(self)
 
     def reset_state(self, state):
         """Update the consistency group snapshot with the provided state."""
-        self.manager.reset_state(self, state)
+        return self.manager.reset_state(self, state)
 
 
 class ConsistencyGroupSnapshotManager(base.ManagerWithFind):
@@ -136,9 +136,10 @@ class ConsistencyGroupSnapshotManager(base.ManagerWithFind):
             body = {'os-force_delete': None}
 
         if body:
-            self.api.client.post(RESOURCE_PATH_ACTION % cg_id, body=body)
+            return self.api.client.post(RESOURCE_PATH_ACTION % cg_id,
+                                        body=body)
         else:
-            self._delete(RESOURCE_PATH % cg_id)
+            return self._delete(RESOURCE_PATH % cg_id)
 
     @api_versions.wraps("2.4")
     def members(self, cg_snapshot, search_opts=None):
@@ -35,15 +35,15 @@ class ConsistencyGroup(common_base.Resource):
 
     def update(self, **kwargs):
         """Update this consistency group."""
-        self.manager.update(self, **kwargs)
+        return self.manager.update(self, **kwargs)
 
     def delete(self):
         """Delete this consistency group."""
-        self.manager.delete(self)
+        return self.manager.delete(self)
 
     def reset_state(self, state):
         """Update the consistency group with the provided state."""
-        self.manager.reset_state(self, state)
+        return self.manager.reset_state(self, state)
 
 
 class ConsistencyGroupManager(base.ManagerWithFind):
@@ -154,9 +154,9 @@ class ConsistencyGroupManager(base.ManagerWithFind):
             body = {'os-force_delete': None}
 
         if body:
-            self.api.client.post(url + '/action', body=body)
+            return self.api.client.post(url + '/action', body=body)
         else:
-            self._delete(url)
+            return self._delete(url)
 
     @api_versions.wraps("2.4")
     def reset_state(self, consistency_group, state):
@@ -25,7 +25,7 @@ class QuotaSet(common_base.Resource):
         return self.tenant_id
 
     def update(self, *args, **kwargs):
-        self.manager.update(self.tenant_id, *args, **kwargs)
+        return self.manager.update(self.tenant_id, *args, **kwargs)
 
 
 class QuotaSetManager(base.ManagerWithFind):
@@ -75,4 +75,4 @@ class QuotaSetManager(base.ManagerWithFind):
             url = '/os-quota-sets/%s?user_id=%s' % (tenant_id, user_id)
         else:
             url = '/os-quota-sets/%s' % tenant_id
-        self._delete(url)
+        return self._delete(url)
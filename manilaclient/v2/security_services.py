@@ -41,7 +41,7 @@ class SecurityService(common_base.Resource):
 
     def delete(self):
         """"Delete this security service."""
-        self.manager.delete(self)
+        return self.manager.delete(self)
 
 
 class SecurityServiceManager(base.ManagerWithFind):
@@ -147,7 +147,8 @@ class SecurityServiceManager(base.ManagerWithFind):
 
         :param security_service: security service to be deleted.
         """
-        self._delete(RESOURCE_PATH % common_base.getid(security_service))
+        return self._delete(
+            RESOURCE_PATH % common_base.getid(security_service))
 
     def list(self, detailed=True, search_opts=None):
         """Get a list of all security services.
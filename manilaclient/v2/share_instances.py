@@ -24,11 +24,11 @@ class ShareInstance(common_base.Resource):
 
     def force_delete(self):
         """Delete the specified share ignoring its current state."""
-        self.manager.force_delete(self)
+        return self.manager.force_delete(self)
 
     def reset_state(self, state):
         """Update the share with the provided state."""
-        self.manager.reset_state(self, state)
+        return self.manager.reset_state(self, state)
 
 
 class ShareInstanceManager(base.ManagerWithFind):
@@ -59,7 +59,8 @@ class ShareInstanceManager(base.ManagerWithFind):
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/share_instances/%s/action' % common_base.getid(instance)
-        return self.api.client.post(url, body=body)
+        with self._operation('_action:%s' % action):
+            return self.api.client.post(url, body=body)
 
     def force_delete(self, instance):
         """Delete a share instance forcibly - share status will be avoided.
@@ -41,7 +41,7 @@ class ShareNetwork(common_base.Resource):
 
     def delete(self):
         """Delete this share network."""
-        self.manager.delete(self)
+        return self.manager.delete(self)
 
 
 class ShareNetworkManager(base.ManagerWithFind):
@@ -158,12 +158,14 @@ class ShareNetworkManager(base.ManagerWithFind):
 
         :param share_network: share network to be deleted.
         """
-        self._delete(RESOURCE_PATH % common_base.getid(share_network))
+        return self._delete(RESOURCE_PATH % common_base.getid(share_network))
 
-    def list(self, detailed=True, search_opts=None):
+    def list(self, detailed=True, search_opts=None, stream=False):
         """Get a list of all share network.
 
-        :rtype: list of :class:`NetworkInfo`
+        :param stream: Whether to parse the response incrementally and
+            return an iterator instead of a list.
+        :rtype: list (or iterator if 'stream' is set) of :class:`NetworkInfo`
         """
         if search_opts:
             query_string = urlencode(
@@ -178,4 +180,6 @@ class ShareNetworkManager(base.ManagerWithFind):
         else:
             path = RESOURCES_PATH + query_string
 
+        if stream:
+            return self._list_stream(path, RESOURCES_NAME)
         return self._list(path, RESOURCES_NAME)
@@ -51,6 +51,10 @@ class ShareServerManager(base.Manager):
         """
         server = self._get("%s/%s" % (RESOURCES_PATH, server_id),
                            RESOURCE_NAME)
+        return self._add_backend_details(server)
+
+    @staticmethod
+    def _add_backend_details(server):
         # Split big dict 'backend_details' to separated strings
         # as next:
         # +---------------------+------------------------------------+
@@ -76,7 +80,7 @@ class ShareServerManager(base.Manager):
 
         :param server_id: id of share server to be deleted.
         """
-        self._delete(RESOURCE_PATH % server_id)
+        return self._delete(RESOURCE_PATH % server_id)
 
     def list(self, search_opts=None):
         """Get a list of share servers.
@@ -32,19 +32,19 @@ class ShareSnapshot(common_base.Resource):
 
     def update(self, **kwargs):
         """Update this snapshot."""
-        self.manager.update(self, **kwargs)
+        return self.manager.update(self, **kwargs)
 
     def reset_state(self, state):
         """Update the snapshot with the privided state."""
-        self.manager.reset_state(self, state)
+        return self.manager.reset_state(self, state)
 
     def delete(self):
         """Delete this snapshot."""
-        self.manager.delete(self)
+        return self.manager.delete(self)
 
     def force_delete(self):
         """Delete the specified snapshot ignoring its current state."""
-        self.manager.force_delete(self)
+        return self.manager.force_delete(self)
 
 
 class ShareSnapshotManager(base.ManagerWithFind):
@@ -78,13 +78,16 @@ class ShareSnapshotManager(base.ManagerWithFind):
         return self._get('/snapshots/%s' % snapshot_id, 'snapshot')
 
     def list(self, detailed=True, search_opts=None, sort_key=None,
-             sort_dir=None):
+             sort_dir=None, stream=False):
         """Get a list of snapshots of shares.
 
         :param search_opts: Search options to filter out shares.
         :param sort_key: Key to be sorted.
         :param sort_dir: Sort direction, should be 'desc' or 'asc'.
-        :rtype: list of :class:`ShareSnapshot`
+        :param stream: Whether to parse the response incrementally and
+            return an iterator instead of a list.
+        :rtype: list (or iterator if 'stream' is set) of
+            :class:`ShareSnapshot`
         """
         if search_opts is None:
             search_opts = {}
@@ -118,6 +121,8 @@ class ShareSnapshotManager(base.ManagerWithFind):
         else:
             path = "/snapshots%s" % (query_string,)
 
+        if stream:
+            return self._list_stream(path, 'snapshots')
         return self._list(path, 'snapshots')
 
     def delete(self, snapshot):
@@ -125,7 +130,7 @@ class ShareSnapshotManager(base.ManagerWithFind):
 
         :param snapshot: The :class:`ShareSnapshot` to delete.
         """
-        self._delete("/snapshots/%s" % common_base.getid(snapshot))
+        return self._delete("/snapshots/%s" % common_base.getid(snapshot))
 
     def force_delete(self, snapshot):
         """Delete the specified snapshot ignoring its current state."""
@@ -154,4 +159,5 @@ class ShareSnapshotManager(base.ManagerWithFind):
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/snapshots/%s/action' % common_base.getid(snapshot)
-        return self.api.client.post(url, body=body)
+        with self._operation('_action:%s' % action):
+            return self.api.client.post(url, body=body)
@@ -39,16 +39,17 @@ class ShareTypeAccessManager(base.ManagerWithFind):
     def add_project_access(self, share_type, project):
         """Add a project to the given share type access list."""
         info = {'project': project}
-        self._action('addProjectAccess', share_type, info)
+        return self._action('addProjectAccess', share_type, info)
 
     def remove_project_access(self, share_type, project):
         """Remove a project from the given share type access list."""
         info = {'project': project}
-        self._action('removeProjectAccess', share_type, info)
+        return self._action('removeProjectAccess', share_type, info)
 
     def _action(self, action, share_type, info, **kwargs):
         """Perform a share type action."""
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/types/%s/action' % common_base.getid(share_type)
-        return self.api.client.post(url, body=body)
+        with self._operation('_action:%s' % action):
+            return self.api.client.post(url, body=body)
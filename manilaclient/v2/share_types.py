@@ -128,7 +128,7 @@ class ShareTypeManager(base.ManagerWithFind):
 
         :param share_type: The name or ID of the :class:`ShareType` to get.
         """
-        self._delete("/types/%s" % common_base.getid(share_type))
+        return self._delete("/types/%s" % common_base.getid(share_type))
 
     def create(self, name, spec_driver_handles_share_servers,
                spec_snapshot_support=True, is_public=True):
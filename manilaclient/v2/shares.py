@@ -35,23 +35,24 @@ class Share(common_base.Resource):
 
     def update(self, **kwargs):
         """Update this share."""
-        self.manager.update(self, **kwargs)
+        return self.manager.update(self, **kwargs)
 
     def unmanage(self, **kwargs):
         """Unmanage this share."""
-        self.manager.unmanage(self, **kwargs)
+        return self.manager.unmanage(self, **kwargs)
 
     def migrate_share(self, host, force_host_copy):
         """Migrate the share to a new host."""
-        self.manager.migrate_share(self, host, force_host_copy)
+        return self.manager.migrate_share(self, host, force_host_copy)
 
     def delete(self, consistency_group_id=None):
         """Delete this share."""
-        self.manager.delete(self, consistency_group_id=consistency_group_id)
+        return self.manager.delete(
+            self, consistency_group_id=consistency_group_id)
 
     def force_delete(self):
         """Delete the specified share ignoring its current state."""
-        self.manager.force_delete(self)
+        return self.manager.force_delete(self)
 
     def allow(self, access_type, access, access_level):
         """Allow access to a share."""
@@ -130,19 +131,19 @@ class Share(common_base.Resource):
 
     def reset_state(self, state):
         """Update the share with the provided state."""
-        self.manager.reset_state(self, state)
+        return self.manager.reset_state(self, state)
 
     def extend(self, new_size):
         """Extend the size of the specified share."""
-        self.manager.extend(self, new_size)
+        return self.manager.extend(self, new_size)
 
     def shrink(self, new_size):
         """Shrink the size of the specified share."""
-        self.manager.shrink(self, new_size)
+        return self.manager.shrink(self, new_size)
 
     def list_instances(self):
         """List instances of the specified share."""
-        self.manager.list_instances(self)
+        return self.manager.list_instances(self)
 
 
 class ShareManager(base.ManagerWithFind):
@@ -253,7 +254,7 @@ class ShareManager(base.ManagerWithFind):
         return self._update("/shares/%s" % share_id, body)
 
     def list(self, detailed=True, search_opts=None,
-             sort_key=None, sort_dir=None):
+             sort_key=None, sort_dir=None, stream=False):
         """Get a list of all shares.
 
         :param detailed: Whether to return detailed share info or not.
@@ -278,7 +279,9 @@ class ShareManager(base.ManagerWithFind):
             admin context.
         :param sort_key: Key to be sorted (i.e. 'created_at' or 'status').
         :param sort_dir: Sort direction, should be 'desc' or 'asc'.
-        :rtype: list of :class:`Share`
+        :param stream: Whether to parse the response incrementally and
+            return an iterator instead of a list.
+        :rtype: list (or iterator if 'stream' is set) of :class:`Share`
         """
         if search_opts is None:
             search_opts = {}
@@ -320,6 +323,8 @@ class ShareManager(base.ManagerWithFind):
         else:
             path = "/shares%s" % (query_string,)
 
+        if stream:
+            return self._list_stream(path, 'shares')
         return self._list(path, 'shares')
 
     def delete(self, share, consistency_group_id=None):
@@ -332,7 +337,7 @@ class ShareManager(base.ManagerWithFind):
         url = "/shares/%s" % common_base.getid(share)
         if consistency_group_id:
             url += "?consistency_group_id=%s" % consistency_group_id
-        self._delete(url)
+        return self._delete(url)
 
     def force_delete(self, share):
         """Delete a share forcibly - share status will be avoided.
@@ -349,16 +354,22 @@ class ShareManager(base.ManagerWithFind):
         :param access: string that represents access ('127.0.0.1')
         :param access_level: string that represents access level ('rw', 'ro')
         """
+        access_params = self._get_access_params(
+            access_type, access, access_level)
+        access = self._action('os-allow_access', share,
+                              access_params)[1]["access"]
+
+        return access
+
+    @staticmethod
+    def _get_access_params(access_type, access, access_level):
         access_params = {
             'access_type': access_type,
             'access_to': access,
         }
         if access_level:
             access_params['access_level'] = access_level
-        access = self._action('os-allow_access', share,
-                              access_params)[1]["access"]
-
-        return access
+        return access_params
 
     def deny(self, share, access_id):
         """Deny access to a share.
@@ -374,6 +385,10 @@ class ShareManager(base.ManagerWithFind):
         :param share: either share object or text with its ID.
         """
         access_list = self._action("os-access_list", share)[1]["access_list"]
+        return self._build_access_list(access_list)
+
+    @staticmethod
+    def _build_access_list(access_list):
         if access_list:
             t = collections.namedtuple('Access', list(access_list[0]))
             return [t(*value.values()) for value in access_list]
@@ -430,7 +445,8 @@ class ShareManager(base.ManagerWithFind):
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/shares/%s/action' % common_base.getid(share)
-        return self.api.client.post(url, body=body)
+        with self._operation('_action:%s' % action):
+            return self.api.client.post(url, body=body)
 
     def reset_state(self, share, state):
         """Update the provided share with the provided state.
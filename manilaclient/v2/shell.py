@@ -20,7 +20,6 @@ import os
 import sys
 import time
 
-from oslo_utils import strutils
 import six
 
 from manilaclient import api_versions
@@ -28,8 +27,12 @@ from manilaclient.common import constants
 from manilaclient import exceptions
 from manilaclient.openstack.common.apiclient import utils as apiclient_utils
 from manilaclient.openstack.common import cliutils
+from manilaclient import utils
 from manilaclient.v2 import quotas
 
+# Compiles lots of regular expressions, only used by a few commands
+strutils = utils.LazyModule('oslo_utils.strutils')
+
 
 def _poll_for_status(poll_fn, obj_id, action, final_ok_states,
                      poll_period=5, show_progress=True):
@@ -498,7 +501,8 @@ def do_rate_limits(cs, args):
     action='single_alias',
     help='Optional consistency group name or ID in which to create the share. '
          '(Default=None)',
-    default=None)
+    default=None,
+    start_version='2.4')
 @cliutils.service_type('sharev2')
 def do_create(cs, args):
     """Creates a new share (NFS, CIFS, GlusterFS or HDFS)."""
@@ -674,7 +678,8 @@ def do_unmanage(cs, args):
     action='single_alias',
     help='Optional consistency group name or ID which contains the share. '
          '(Default=None)',
-    default=None)
+    default=None,
+    start_version='2.4')
 @cliutils.service_type('sharev2')
 def do_delete(cs, args):
     """Remove one or more shares."""
@@ -914,7 +919,8 @@ def do_access_list(cs, args):
     type=str,
     default=None,
     action='single_alias',
-    help='Filter results by consistency group name or ID.')
+    help='Filter results by consistency group name or ID.',
+    start_version='2.4')
 @cliutils.arg(
     '--columns',
     metavar='<columns>',